@@ -28,7 +28,8 @@ from tqdm import tqdm
 from explore_database import Token, Boundary, WordOrder
 from utils.database import get_sentences
 from utils.heuristic import (
-    get_word_order_base, get_word_order_random, get_word_order_heuristic
+    get_word_order_base, get_word_order_random, get_word_order_heuristic,
+    get_word_order_batch
 )
 
 ###############################################################################
@@ -127,7 +128,7 @@ corpus = [
 
 # --------------------------------------------------------------------------- #
 
-heuristic_word_order = {}
+heuristic_sentences = {}
 for annotator_verse, verse_sentences in sentences_with_word_order.items():
     annotator_id, verse_id = annotator_verse
     extra_tokens = verse_sentences['extra']
@@ -137,11 +138,15 @@ for annotator_verse, verse_sentences in sentences_with_word_order.items():
         tokens.update(extra_tokens)
 
         aid_bid = (annotator_id, boundary_id)
-        if aid_bid not in heuristic_word_order:
-            heuristic_word_order[aid_bid] = get_word_order(tokens)
+        if aid_bid not in heuristic_sentences:
+            heuristic_sentences[aid_bid] = tokens
         else:
             print(f"Oops! {aid_bid} already present!")
 
+heuristic_word_order = get_word_order_batch(
+    heuristic_sentences, heuristic=get_word_order
+)
+
 # --------------------------------------------------------------------------- #
 
 
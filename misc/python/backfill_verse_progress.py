@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backfill the annotation progress rollup
+
+Rebuilds the `verse_progress` table (read by the progress page) from the
+submit logs. The table is maintained on every submit, so this is required
+only once, for the submits made before the table existed.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import time
+
+from flask import Flask
+
+# Local
+from settings import app
+from models_sqla import db
+
+from utils.database import backfill_verse_progress
+
+###############################################################################
+
+webapp = Flask(__name__)
+webapp.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+webapp.config['SQLALCHEMY_DATABASE_URI'] = app.sqla['database_uri']
+webapp.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    "pool_pre_ping": True,
+}
+db.init_app(webapp)
+webapp.app_context().push()
+
+###############################################################################
+
+
+if __name__ == "__main__":
+    db.create_all()
+    start_time = time.perf_counter()
+    count = backfill_verse_progress()
+    duration = time.perf_counter() - start_time
+    print(f"Rebuilt progress of {count} (annotator, verse) pairs "
+          f"in {duration:.2f}s")
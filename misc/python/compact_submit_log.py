@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact the submit log
+
+Every submit (including the ones without any changes) adds a row to the
+`submit_log` table. This collapses the rows older than the retention period
+into a single row per (annotator, verse, task), with the number of submits
+and the first and last submit time, and appends the original rows to a
+gzip compressed JSON lines archive.
+
+Can be scheduled (e.g. daily) using cron,
+
+```
+0 3 * * * cd /path/to/antarlekhaka && python3 misc/python/compact_submit_log.py --days 30
+```
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import os
+import time
+import datetime as dt
+
+from flask import Flask
+
+# Local
+from settings import app
+from models_sqla import db
+
+from utils.database import compact_submit_logs
+
+###############################################################################
+
+webapp = Flask(__name__)
+webapp.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+webapp.config['SQLALCHEMY_DATABASE_URI'] = app.sqla['database_uri']
+webapp.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    "pool_pre_ping": True,
+}
+db.init_app(webapp)
+webapp.app_context().push()
+
+###############################################################################
+
+ARCHIVE_DIR = os.path.join(app.data_dir, "archive")
+
+###############################################################################
+
+
+def compact_submit_log(days: int = 30, archive_dir: str = ARCHIVE_DIR):
+    """Compact the submit logs older than `days` days
+
+    Parameters
+    ----------
+    days : int, optional
+        Retention period (in days) of the individual submit logs.
+        The default is 30.
+    archive_dir : str, optional
+        Directory to store the archive in.
+        The default is ARCHIVE_DIR.
+    """
+    now = dt.datetime.utcnow()
+    before = now - dt.timedelta(days=days)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_path = os.path.join(
+        archive_dir, f"submit_log_{now:%Y%m%dT%H%M%S}.jsonl.gz"
+    )
+
+    start_time = time.perf_counter()
+    result = compact_submit_logs(before, archive_path)
+    duration = time.perf_counter() - start_time
+    if result["archived"]:
+        print(f"Archived {result['archived']} rows to '{archive_path}'.")
+    print(
+        f"Compacted {result['compacted']} (annotator, verse, task) groups, "
+        f"deleted {result['deleted']} rows in {duration:.2f}s"
+    )
+
+
+###############################################################################
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Compact the submit log"
+    )
+    parser.add_argument(
+        "--days", type=int, default=30,
+        help="Compact the submit logs older than these many days"
+    )
+    parser.add_argument(
+        "--archive-dir", default=ARCHIVE_DIR,
+        help="Directory to store the archive of the compacted submit logs"
+    )
+    args = vars(parser.parse_args())
+
+    compact_submit_log(days=args["days"], archive_dir=args["archive_dir"])
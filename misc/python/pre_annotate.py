@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pre-annotate chapters using heuristics
+
+Heuristic word orders and token graphs are stored as annotations of the
+auto-annotator (`AUTO_ANNOTATION_USER_ID`) on the auto-boundaries.
+Annotators can then start from these annotations by cloning them
+(Admin > Annotations > Clone), instead of computing heuristics on every view.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import Flask
+
+# Local
+from settings import app
+from models_sqla import db, Chapter, Verse, Boundary, WordOrder, TokenGraph
+from constants import (
+    AUTO_ANNOTATION_USER_ID,
+    TASK_WORD_ORDER,
+    TASK_TOKEN_GRAPH
+)
+
+from utils.registry import TASK_REGISTRY
+from utils.database import get_heuristic_inputs
+from utils.heuristic import configure_heuristics, run_heuristic_job
+
+###############################################################################
+
+webapp = Flask(__name__)
+webapp.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+webapp.config['SQLALCHEMY_DATABASE_URI'] = app.sqla['database_uri']
+webapp.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    "pool_pre_ping": True,
+}
+db.init_app(webapp)
+webapp.app_context().push()
+
+###############################################################################
+
+HEURISTIC_CONFIG = app.config.get("heuristic", {})
+
+###############################################################################
+
+
+def bulk_insert(model, rows: list, chunk_size: int = 1000):
+    """Insert rows using chunked (Core) bulk inserts"""
+    for idx in range(0, len(rows), chunk_size):
+        db.session.execute(
+            model.__table__.insert(), rows[idx:idx + chunk_size]
+        )
+
+
+def get_auto_boundary_ids(chapter_id: int) -> list:
+    return [
+        boundary_id
+        for boundary_id, in db.session.query(Boundary.id).join(Verse).filter(
+            Verse.chapter_id == chapter_id,
+            Boundary.annotator_id == AUTO_ANNOTATION_USER_ID
+        ).all()
+    ]
+
+
+def pre_annotate_chapter(
+    chapter_id: int,
+    executor: ProcessPoolExecutor,
+    overwrite: bool = False,
+    chunk_size: int = 1000
+) -> dict:
+    """Pre-annotate a single chapter
+
+    Parameters
+    ----------
+    chapter_id : int
+        Chapter ID
+    executor : ProcessPoolExecutor
+        Executor to run the heuristics
+    overwrite : bool, optional
+        If True, existing annotations of the auto-annotator are replaced.
+        Otherwise, only the boundaries without them are pre-annotated.
+        The default is False.
+    chunk_size : int, optional
+        Number of rows per insert statement.
+        The default is 1000.
+
+    Returns
+    -------
+    dict
+        Number of inserted rows per task category
+    """
+    boundary_ids = get_auto_boundary_ids(chapter_id)
+    auto_filter = {
+        WordOrder: [
+            WordOrder.boundary_id.in_(boundary_ids),
+            WordOrder.annotator_id == AUTO_ANNOTATION_USER_ID
+        ],
+        TokenGraph: [
+            TokenGraph.boundary_id.in_(boundary_ids),
+            TokenGraph.annotator_id == AUTO_ANNOTATION_USER_ID
+        ],
+    }
+    if overwrite:
+        for model, model_filter in auto_filter.items():
+            model.query.filter(*model_filter).delete(
+                synchronize_session=False
+            )
+
+    # NOTE: boundaries with an existing word order are already excluded
+    inputs = get_heuristic_inputs(chapter_id, AUTO_ANNOTATION_USER_ID)
+    if TASK_TOKEN_GRAPH in inputs:
+        annotated_boundary_ids = {
+            boundary_id
+            for boundary_id, in db.session.query(
+                TokenGraph.boundary_id
+            ).filter(*auto_filter[TokenGraph]).distinct().all()
+        }
+        for boundary_id in annotated_boundary_ids:
+            inputs[TASK_TOKEN_GRAPH].pop(boundary_id, None)
+
+    relation_map = TASK_REGISTRY.token_relation_map
+    jobs = [
+        (boundary_id, category, token_list, relation_map)
+        for category, category_inputs in inputs.items()
+        for boundary_id, token_list in category_inputs.items()
+    ]
+
+    rows = {
+        TASK_WORD_ORDER: [],
+        TASK_TOKEN_GRAPH: [],
+    }
+    task_ids = {
+        category: TASK_REGISTRY.task_id(category)
+        for category in rows
+    }
+    for boundary_id, category, _, result in executor.map(
+        run_heuristic_job, jobs, chunksize=64
+    ):
+        if category == TASK_WORD_ORDER:
+            rows[category].extend(
+                {
+                    "task_id": task_ids[category],
+                    "boundary_id": boundary_id,
+                    "token_id": token_id,
+                    "order": order_id,
+                    "annotator_id": AUTO_ANNOTATION_USER_ID,
+                }
+                for order_id, token_id in enumerate(result, start=1)
+            )
+        if category == TASK_TOKEN_GRAPH:
+            # NOTE: TokenGraph allows a single (labelled) edge per token pair
+            edges = set()
+            for relation in result:
+                edge = (relation["src_id"], relation["dst_id"])
+                if relation["label_id"] is None or edge in edges:
+                    continue
+                edges.add(edge)
+                rows[category].append({
+                    "task_id": task_ids[category],
+                    "boundary_id": boundary_id,
+                    "src_id": relation["src_id"],
+                    "label_id": relation["label_id"],
+                    "dst_id": relation["dst_id"],
+                    "annotator_id": AUTO_ANNOTATION_USER_ID,
+                })
+
+    bulk_insert(WordOrder, rows[TASK_WORD_ORDER], chunk_size=chunk_size)
+    bulk_insert(TokenGraph, rows[TASK_TOKEN_GRAPH], chunk_size=chunk_size)
+    db.session.commit()
+
+    return {
+        category: len(category_rows)
+        for category, category_rows in rows.items()
+    }
+
+
+def pre_annotate(
+    corpus_id: int = None,
+    chapter_start: int = None,
+    chapter_end: int = None,
+    overwrite: bool = False,
+    workers: int = None,
+    chunk_size: int = 1000
+):
+    """Pre-annotate chapters using heuristics
+
+    Parameters
+    ----------
+    corpus_id : int, optional
+        Only chapters of this corpus are processed.
+        The default is None.
+    chapter_start : int, optional
+        Smallest chapter ID to process.
+        The default is None.
+    chapter_end : int, optional
+        Largest chapter ID to process.
+        The default is None.
+    overwrite : bool, optional
+        Replace existing annotations of the auto-annotator.
+        The default is False.
+    workers : int, optional
+        Number of worker processes.
+        If None, the number of CPUs is used.
+        The default is None.
+    chunk_size : int, optional
+        Number of rows per insert statement.
+        The default is 1000.
+    """
+    configure_heuristics(HEURISTIC_CONFIG)
+
+    chapter_query = Chapter.query.with_entities(Chapter.id).order_by(
+        Chapter.id
+    )
+    if corpus_id is not None:
+        chapter_query = chapter_query.filter(Chapter.corpus_id == corpus_id)
+    if chapter_start is not None:
+        chapter_query = chapter_query.filter(Chapter.id >= chapter_start)
+    if chapter_end is not None:
+        chapter_query = chapter_query.filter(Chapter.id <= chapter_end)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=configure_heuristics,
+        initargs=(HEURISTIC_CONFIG,)
+    ) as executor:
+        for chapter_id, in chapter_query.all():
+            start_time = time.perf_counter()
+            counts = pre_annotate_chapter(
+                chapter_id,
+                executor,
+                overwrite=overwrite,
+                chunk_size=chunk_size
+            )
+            duration = time.perf_counter() - start_time
+            print(
+                f"Chapter {chapter_id}: "
+                f"{counts[TASK_WORD_ORDER]} word order rows, "
+                f"{counts[TASK_TOKEN_GRAPH]} token graph rows "
+                f"in {duration:.2f}s"
+            )
+
+
+###############################################################################
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Pre-annotate chapters using heuristics"
+    )
+    parser.add_argument("--corpus", type=int, help="Corpus ID")
+    parser.add_argument(
+        "--chapter-start", type=int, help="First chapter ID (inclusive)"
+    )
+    parser.add_argument(
+        "--chapter-end", type=int, help="Last chapter ID (inclusive)"
+    )
+    parser.add_argument(
+        "--overwrite", action="store_true",
+        help="Replace existing annotations of the auto-annotator"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=1000,
+        help="Number of rows per insert statement"
+    )
+    args = vars(parser.parse_args())
+
+    pre_annotate(
+        corpus_id=args["corpus"],
+        chapter_start=args["chapter_start"],
+        chapter_end=args["chapter_end"],
+        overwrite=args["overwrite"],
+        workers=args["workers"],
+        chunk_size=args["chunk_size"]
+    )
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precompute heuristic suggestions
+
+Walks every chapter and boundary, computes the word order and token graph
+heuristics in a process pool, and stores them in the `heuristic_suggestion`
+table, from where `get_verse_data()` reads them.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import Flask
+
+# Local
+from settings import app
+from models_sqla import db, Chapter, Verse, Boundary, HeuristicSuggestion
+
+from utils.registry import TASK_REGISTRY
+from utils.database import get_heuristic_inputs
+from utils.heuristic import (
+    HEURISTIC_VERSION, configure_heuristics, run_heuristic_job
+)
+
+###############################################################################
+
+webapp = Flask(__name__)
+webapp.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+webapp.config['SQLALCHEMY_DATABASE_URI'] = app.sqla['database_uri']
+webapp.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    "pool_pre_ping": True,
+}
+db.init_app(webapp)
+webapp.app_context().push()
+
+###############################################################################
+
+HEURISTIC_CONFIG = app.config.get("heuristic", {})
+
+###############################################################################
+
+
+def get_chapter_jobs(chapter_id: int) -> list:
+    """Heuristic jobs for every boundary of a chapter"""
+    relation_map = TASK_REGISTRY.token_relation_map
+    annotator_query = db.session.query(Boundary.annotator_id).join(
+        Verse
+    ).filter(
+        Verse.chapter_id == chapter_id
+    ).distinct().order_by(Boundary.annotator_id)
+
+    # NOTE: If the sentence boundary task is inactive, every annotator sees
+    # the auto-boundaries, which are processed (first) as seen by the
+    # auto-annotator
+    jobs = []
+    seen = set()
+    for annotator_id, in annotator_query.all():
+        inputs = get_heuristic_inputs(chapter_id, annotator_id)
+        for category, category_inputs in inputs.items():
+            for boundary_id, token_list in category_inputs.items():
+                if (boundary_id, category) in seen:
+                    continue
+                seen.add((boundary_id, category))
+                jobs.append((boundary_id, category, token_list, relation_map))
+    return jobs
+
+
+def precompute_heuristics(
+    chapter_ids: list = None,
+    workers: int = None,
+    chunk_size: int = 64
+):
+    """Precompute heuristic suggestions
+
+    Parameters
+    ----------
+    chapter_ids : list, optional
+        Chapters to process.
+        If None, all the chapters are processed.
+        The default is None.
+    workers : int, optional
+        Number of worker processes.
+        If None, the number of CPUs is used.
+        The default is None.
+    chunk_size : int, optional
+        Number of jobs sent to a worker at once.
+        The default is 64.
+    """
+    configure_heuristics(HEURISTIC_CONFIG)
+
+    # suggestions of older heuristic versions are never used
+    stale_count = HeuristicSuggestion.query.filter(
+        HeuristicSuggestion.version != HEURISTIC_VERSION
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    print(f"Removed {stale_count} suggestions of older heuristic versions.")
+
+    chapter_query = Chapter.query.with_entities(Chapter.id).order_by(
+        Chapter.id
+    )
+    if chapter_ids:
+        chapter_query = chapter_query.filter(Chapter.id.in_(chapter_ids))
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=configure_heuristics,
+        initargs=(HEURISTIC_CONFIG,)
+    ) as executor:
+        for chapter_id, in chapter_query.all():
+            start_time = time.perf_counter()
+            jobs = get_chapter_jobs(chapter_id)
+            suggestions = [
+                {
+                    "boundary_id": boundary_id,
+                    "category": category,
+                    "version": HEURISTIC_VERSION,
+                    "input_key": input_key,
+                    "data": data,
+                }
+                for boundary_id, category, input_key, data in executor.map(
+                    run_heuristic_job, jobs, chunksize=chunk_size
+                )
+            ]
+
+            boundary_ids = list({job[0] for job in jobs})
+            if boundary_ids:
+                HeuristicSuggestion.query.filter(
+                    HeuristicSuggestion.boundary_id.in_(boundary_ids),
+                    HeuristicSuggestion.version == HEURISTIC_VERSION
+                ).delete(synchronize_session=False)
+            if suggestions:
+                db.session.bulk_insert_mappings(
+                    HeuristicSuggestion, suggestions
+                )
+            db.session.commit()
+
+            duration = time.perf_counter() - start_time
+            print(
+                f"Chapter {chapter_id}: {len(suggestions)} suggestions "
+                f"({len(boundary_ids)} boundaries) in {duration:.2f}s"
+            )
+
+
+###############################################################################
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Precompute heuristic suggestions"
+    )
+    parser.add_argument(
+        "--chapter", type=int, nargs="*",
+        help="Chapter IDs to process (default: all chapters)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=64,
+        help="Number of jobs sent to a worker at once"
+    )
+    args = vars(parser.parse_args())
+
+    precompute_heuristics(
+        chapter_ids=args["chapter"],
+        workers=args["workers"],
+        chunk_size=args["chunk_size"]
+    )
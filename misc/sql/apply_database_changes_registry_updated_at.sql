@@ -0,0 +1,26 @@
+/* ************************ Data Transfer Commands ************************ */
+/* CAUTION:
+  ONLY FOR DATABASES CREATED BEFORE THE ADDITION OF `updated_at` TO THE
+  TASK AND LABEL TABLES.
+*/
+/* CHANGE:
+* Add a new column to `task`, `token_label`, `token_relation_label`,
+* `sentence_label` and `sentence_relation_label`
+* - `updated_at`: datetime, nullable
+*/
+/* LOGIC:
+* ADD COLUMN variant of ALTER TABLE command is supported by SQLite and MySQL,
+* so the column is added in place.
+* Existing rows keep NULL until they are changed, which is enough for the
+* task registry to detect the change (NULL -> timestamp).
+*/
+
+/* ACTION: STOP SERVER */
+
+ALTER TABLE `task` ADD COLUMN `updated_at` DATETIME;
+ALTER TABLE `token_label` ADD COLUMN `updated_at` DATETIME;
+ALTER TABLE `token_relation_label` ADD COLUMN `updated_at` DATETIME;
+ALTER TABLE `sentence_label` ADD COLUMN `updated_at` DATETIME;
+ALTER TABLE `sentence_relation_label` ADD COLUMN `updated_at` DATETIME;
+
+/* ACTION: START SERVER */
@@ -0,0 +1,26 @@
+/* ************************ Data Transfer Commands ************************ */
+/* CAUTION:
+  ONLY FOR DATABASES CREATED BEFORE THE ADDITION OF SUBMIT LOG COMPACTION.
+*/
+/* CHANGE:
+* Add two new columns to `submit_log`
+* - `submit_count`: integer, default 1, not null
+* - `first_submit_at`: datetime
+* Add an index on (`annotator_id`, `verse_id`, `task_id`, `id`), the order in
+* which the rows are compacted
+*/
+/* LOGIC:
+* ADD COLUMN variant of ALTER TABLE command is supported by SQLite and MySQL,
+* so the columns are added in place.
+* Every existing row stands for a single submit.
+*/
+
+/* ACTION: STOP SERVER */
+
+ALTER TABLE `submit_log` ADD COLUMN `submit_count` INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE `submit_log` ADD COLUMN `first_submit_at` DATETIME;
+UPDATE `submit_log` SET `first_submit_at` = `updated_at`;
+CREATE INDEX `submit_log_annotator_id_verse_id_task_id_id`
+    ON `submit_log` (`annotator_id`, `verse_id`, `task_id`, `id`);
+
+/* ACTION: START SERVER */
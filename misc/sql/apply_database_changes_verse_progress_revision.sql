@@ -0,0 +1,21 @@
+/* ************************ Data Transfer Commands ************************ */
+/* CAUTION:
+  ONLY FOR DATABASES CREATED BEFORE THE ADDITION OF SUBMIT REVISIONS,
+  BUT AFTER THE ADDITION OF `verse_progress` TABLE.
+*/
+/* CHANGE:
+* Add a new column to `verse_progress`
+* - `revision`: integer, default 0, not null
+*/
+/* LOGIC:
+* ADD COLUMN variant of ALTER TABLE command is supported by SQLite and MySQL,
+* so the column is added in place.
+* Existing rows start from revision 0, which is what the clients receive
+* with the verse data after the server is restarted.
+*/
+
+/* ACTION: STOP SERVER */
+
+ALTER TABLE `verse_progress` ADD COLUMN `revision` INTEGER NOT NULL DEFAULT 0;
+
+/* ACTION: START SERVER */
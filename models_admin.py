@@ -11,6 +11,7 @@ from flask_admin import AdminIndexView
 from flask_admin.contrib.sqla import ModelView
 
 from constants import ROLE_OWNER
+from utils.registry import TASK_REGISTRY
 
 ###############################################################################
 
@@ -85,13 +86,24 @@ class UserModelView(BaseModelView):
     )
 
 
-class TaskModelView(BaseModelView):
+class RegistryModelView(BaseModelView):
+    """Model view of tasks or labels, which are served by `TASK_REGISTRY`"""
+
+    def after_model_change(self, form, model, is_created):
+        TASK_REGISTRY.invalidate()
+
+    def after_model_delete(self, model):
+        TASK_REGISTRY.invalidate()
+
+
+class TaskModelView(RegistryModelView):
     column_searchable_list = ("category", "title", "short", "help")
-    form_excluded_columns = ("category",)
+    form_excluded_columns = ("category", "updated_at")
 
 
-class LabelModelView(BaseModelView):
+class LabelModelView(RegistryModelView):
     column_searchable_list = ("label", "description")
+    form_excluded_columns = ("updated_at",)
 
 
 class AnnotationModelView(BaseModelView):
@@ -27,7 +27,11 @@ from flask_security.utils import lookup_identity
 from constants import TASK_CATEGORY_LIST
 
 ###############################################################################
-# Foreign Key Support for SQLite3
+# Foreign Key and Transaction Support for SQLite3
+# NOTE: pysqlite does not emit BEGIN before a SAVEPOINT, so releasing a
+# savepoint (`begin_nested()`) would commit it. pysqlite's own transaction
+# handling is therefore disabled, and BEGIN is emitted by SQLAlchemy instead.
+# (https://docs.sqlalchemy.org/en/14/dialects/sqlite.html#pysqlite-serializable)
 
 
 @event.listens_for(Engine, "connect")
@@ -37,6 +41,13 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
         cursor.close()
+        dbapi_connection.isolation_level = None
+
+
+@event.listens_for(Engine, "begin")
+def set_sqlite_begin(connection):
+    if connection.dialect.driver == "pysqlite":
+        connection.exec_driver_sql("BEGIN")
 
 
 ###############################################################################
@@ -175,6 +186,8 @@ class Task(db.Model):
     help = Column(String(255), nullable=False)
     order = Column(Integer, nullable=False)
     is_deleted = Column(Boolean, default=False, nullable=False)
+    # part of the stamp that the task registry (per-process) is validated with
+    updated_at = Column(DateTime, default=dt.utcnow, onupdate=dt.utcnow)
 
 
 class SubmitLog(db.Model):
@@ -184,6 +197,10 @@ class SubmitLog(db.Model):
     annotator_id = Column(Integer, ForeignKey('user.id'), nullable=False)
     task_id = Column(Integer, ForeignKey('task.id'), nullable=False)
     updated_at = Column(DateTime, default=dt.utcnow, onupdate=dt.utcnow)
+    # NOTE: compacted rows (`misc/python/compact_submit_log.py`) stand for
+    # `submit_count` submits, made between `first_submit_at` and `updated_at`
+    submit_count = Column(Integer, default=1, nullable=False)
+    first_submit_at = Column(DateTime, default=dt.utcnow, nullable=True)
 
     verse = relationship(
         'Verse',
@@ -199,6 +216,44 @@ class SubmitLog(db.Model):
         backref=backref('submits', cascade='all,delete-orphan', lazy='dynamic')
     )
 
+    # order of the rows compacted by `compact_submit_logs()`
+    __table_args__ = (
+        Index('submit_log_annotator_id_verse_id_task_id_id',
+              'annotator_id', 'verse_id', 'task_id', 'id'),
+    )
+
+
+# NOTE: VerseProgress is a rollup of SubmitLog per annotator per verse,
+# maintained on every submit (`utils.database.update_verse_progress()`)
+# and rebuilt using `misc/python/backfill_verse_progress.py`
+class VerseProgress(db.Model):
+    id = Column(Integer, primary_key=True)
+    verse_id = Column(Integer, ForeignKey('verse.id', ondelete='CASCADE'),
+                      nullable=False, index=True)
+    annotator_id = Column(Integer, ForeignKey('user.id'), nullable=False)
+    # comma separated (sorted) IDs of the submitted tasks
+    task_list = Column(String(255), default="", nullable=False)
+    task_count = Column(Integer, default=0, nullable=False)
+    first_update_at = Column(DateTime, default=dt.utcnow, nullable=False)
+    last_update_at = Column(DateTime, default=dt.utcnow, nullable=False)
+    # incremented on every submit, echoed back by the client to detect
+    # submits based on stale data (optimistic concurrency control)
+    revision = Column(Integer, default=0, nullable=False)
+
+    verse = relationship(
+        'Verse',
+        backref=backref(
+            'progress', cascade='all,delete-orphan', lazy='dynamic'
+        )
+    )
+    annotator = relationship(
+        'User', backref=backref('progress', lazy='dynamic')
+    )
+    __table_args__ = (
+         Index('verse_progress_annotator_id_verse_id',
+               'annotator_id', 'verse_id', unique=True),
+    )
+
 
 # --------------------------------------------------------------------------- #
 
@@ -627,6 +682,40 @@ class SentenceGraph(db.Model):
     )
 
 
+###############################################################################
+# Heuristic Models
+# NOTE: Suggestions are precomputed by `misc/python/precompute_heuristics.py`
+# `input_key` is the content hash of the heuristic input
+# (`utils.heuristic.get_heuristic_key()`), so a suggestion is used only if
+# the sentence (and the word order, for token graph) has not changed since.
+
+
+class HeuristicSuggestion(db.Model):
+    id = Column(Integer, primary_key=True)
+    boundary_id = Column(
+        Integer, ForeignKey('boundary.id', ondelete='CASCADE'), nullable=False,
+        index=True
+    )
+    category = Column(Enum(*TASK_CATEGORY_LIST), nullable=False)
+    version = Column(Integer, nullable=False)
+    input_key = Column(String(40), nullable=False)
+    data = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=dt.utcnow, onupdate=dt.utcnow)
+
+    boundary = relationship(
+        'Boundary',
+        backref=backref(
+            'heuristic_suggestions', cascade='all,delete-orphan',
+            lazy='dynamic'
+        )
+    )
+
+    __table_args__ = (
+         Index('heuristic_suggestion_boundary_id_category_version',
+               'boundary_id', 'category', 'version', unique=True),
+    )
+
+
 ###############################################################################
 # Label Models
 
@@ -637,6 +726,7 @@ class TokenLabel(db.Model):
     label = Column(String(255), nullable=False)
     description = Column(String(255))
     is_deleted = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime, default=dt.utcnow, onupdate=dt.utcnow)
     task = relationship(
         'Task',
         backref=backref(
@@ -652,6 +742,7 @@ class TokenRelationLabel(db.Model):
     label = Column(String(255), nullable=False)
     description = Column(String(255))
     is_deleted = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime, default=dt.utcnow, onupdate=dt.utcnow)
     task = relationship(
         'Task',
         backref=backref(
@@ -667,6 +758,7 @@ class SentenceLabel(db.Model):
     label = Column(String(255), nullable=False)
     description = Column(String(255))
     is_deleted = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime, default=dt.utcnow, onupdate=dt.utcnow)
     task = relationship(
         'Task',
         backref=backref(
@@ -682,6 +774,7 @@ class SentenceRelationLabel(db.Model):
     label = Column(String(255), nullable=False)
     description = Column(String(255))
     is_deleted = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime, default=dt.utcnow, onupdate=dt.utcnow)
     task = relationship(
         'Task',
         backref=backref(
@@ -37,13 +37,15 @@ import re
 import csv
 import glob
 import json
+import hashlib
 import logging
 import datetime
 
 import git
 import requests
 from flask import (Flask, render_template, redirect, jsonify, url_for,
-                   request, flash, session, Response, abort)
+                   request, flash, session, Response, abort,
+                   stream_with_context)
 from flask_security import (Security, auth_required, permissions_required,
                             hash_password, current_user, user_registered,
                             user_authenticated)
@@ -91,6 +93,7 @@ from constants import (
     TASK_TOKEN_CONNECTION,
     TASK_SENTENCE_CLASSIFICATION,
     TASK_SENTENCE_GRAPH,
+    TASK_CATEGORY_LIST,
 
     TASK_DEFAULT_INFORMATION,
     TASK_UPDATE_ACTIONS,
@@ -118,10 +121,26 @@ from models_admin import (SecureAdminIndexView,
 from settings import app
 
 from utils.reverseproxied import ReverseProxied
+from utils.cache import LRUCache, VersionCounter
+from utils.registry import TASK_REGISTRY
 from utils.database import (
     add_chapter,
-    get_verse_data, get_chapter_data, export_data,
-    get_annotation_progress, clone_user_annotations
+    get_verse_data, iter_verse_data, get_verse_delta,
+    get_chapter_data, get_chapter_window, get_annotator_ids,
+    get_verse_fingerprint, is_verse_data_degraded,
+    export_data,
+    get_annotation_progress,
+    clone_user_annotations
+)
+from utils.compact import encode_verse_data
+from utils.submit import (
+    SUBMIT_HANDLERS, InvalidSubmission, StaleSubmission, StageTimer,
+    apply_submission, record_submits,
+    is_lock_error, retry_on_lock, get_submit_stats
+)
+from utils.heuristic import (
+    HEURISTIC_CACHE, configure_heuristics, get_heuristic_stats,
+    has_heuristic_limits
 )
 from utils.export import format_data
 from utils.conllu import CoNLLUParser
@@ -280,29 +299,58 @@ PLAINTEXT_PROCESSOR = PlaintextProcessor(
     store_scheme=PLAINTEXT_CONFIG["store_scheme"]
 )
 
+###############################################################################
+# Chapter Cache
+# NOTE: Cache entries are keyed by the annotation version, which is bumped on
+# every change made through this process, and by the fingerprint of the
+# verses, which accounts for changes made through other worker processes, and
+# for changes of the heuristic configuration (`get_heuristic_fingerprint()`).
+
+CACHE_CONFIG = app.config.get("cache", {})
+CHAPTER_CACHE = LRUCache(maxsize=CACHE_CONFIG.get("chapter_size", 64))
+HEURISTIC_CACHE.maxsize = CACHE_CONFIG.get("heuristic_size", 4096)
+ANNOTATION_VERSION = VersionCounter()
+
+###############################################################################
+# Heuristics
+
+HEURISTIC_CONFIG = app.config.get("heuristic", {})
+configure_heuristics(HEURISTIC_CONFIG)
+
+###############################################################################
+# Submissions
+
+# maximum number of submissions in a single batch (`/api/batch`)
+BATCH_MAX_ITEMS = app.config.get("batch_size", 100)
+# report the time taken by every stage of a submission in the response
+SUBMIT_TIMING = app.config.get("debug_timing", False)
+# retries of a submission failing due to lock contention
+SUBMIT_RETRIES = app.config.get("submit_retries", 3)
+SUBMIT_RETRY_DELAY = app.config.get("submit_retry_delay", 0.05)
+
 ###############################################################################
 # Database Utility Functions
 
 
-def record_submit(verse_id: int, annotator_id: int, task_id: int) -> bool:
-    """Record Submit
+def get_conflict_data(error: StaleSubmission, form) -> dict:
+    """Current state of a verse, for a client whose submission was stale
 
-    Parameters
-    ----------
-    verse_id : int
-        Verse ID
-    annotator_id : int
-        Annotator ID
-    task_id : int
-        Task ID
+    Changes made since the version of the verse data available with the
+    client (`since` field of the submission) are included as a delta.
     """
-    submit_log = SubmitLog()
-    submit_log.verse_id = verse_id
-    submit_log.annotator_id = annotator_id
-    submit_log.task_id = task_id
-    db.session.add(submit_log)
-    db.session.commit()
-    return True
+    # NOTE: invalid or missing version results in the entire verse data
+    try:
+        since = datetime.datetime.fromisoformat(form["since"])
+    except (KeyError, TypeError, ValueError):
+        since = None
+    return {
+        "conflict": True,
+        "verse_id": error.verse_id,
+        "revision": error.revision,
+        "delta": get_verse_delta(
+            error.verse_id, annotator_ids=[current_user.id], since=since
+        ),
+    }
 
 
 ###############################################################################
@@ -398,79 +446,62 @@ def assign_default_roles(sender, user, **extra):
 def _after_authentication_hook(sender, user, **extra):
     pass
 
+
+@webapp.before_request
+def validate_task_registry():
+    """Pick up task and label changes made through other worker processes"""
+    if request.endpoint != "static":
+        TASK_REGISTRY.validate()
+
 ###############################################################################
 # Global Context
 
+# NOTE: themes are discovered once at startup
+THEME_CSS_FILES = glob.glob(
+    os.path.join(app.dir, 'static', 'themes', 'css', 'bootstrap.*.min.css')
+)
+THEME_JS_FILES = glob.glob(
+    os.path.join(app.dir, 'static', 'themes', 'js', 'bootstrap.*.min.js')
+)
+THEMES = {
+    "with_css": ['default'] + sorted([
+        os.path.basename(theme).split('.')[1]
+        for theme in THEME_CSS_FILES
+    ]),
+    "with_js": sorted([
+        os.path.basename(theme).split('.')[1]
+        for theme in THEME_JS_FILES
+    ])
+}
 
-@webapp.context_processor
-def inject_global_context():
-    theme_css_files = glob.glob(
-        os.path.join(app.dir, 'static', 'themes', 'css', 'bootstrap.*.min.css')
-    )
-    theme_js_files = glob.glob(
-        os.path.join(app.dir, 'static', 'themes', 'js', 'bootstrap.*.min.js')
-    )
-    THEMES = {
-        "with_css": ['default'] + sorted([
-            os.path.basename(theme).split('.')[1]
-            for theme in theme_css_files
-        ]),
-        "with_js": sorted([
-            os.path.basename(theme).split('.')[1]
-            for theme in theme_js_files
-        ])
-    }
+ROLES = {
+    "owner": ROLE_OWNER,
+    "admin": ROLE_ADMIN,
+    "curator": ROLE_CURATOR,
+    "annotator": ROLE_ANNOTATOR,
+    "member": ROLE_MEMBER,
+    "guest": ROLE_GUEST
+}
 
-    ROLES = {
-        "owner": ROLE_OWNER,
-        "admin": ROLE_ADMIN,
-        "curator": ROLE_CURATOR,
-        "annotator": ROLE_ANNOTATOR,
-        "member": ROLE_MEMBER,
-        "guest": ROLE_GUEST
-    }
+# NOTE: task and label context is required only on the following pages
+ANNOTATION_CONTEXT_ENDPOINTS = ["show_corpus", "show_admin", "show_export"]
 
-    # NOTE: do we really need to have these in global context?
-    # since they are not required on "every" page
-    # move them to individual routes?
-    # alternatively, can we add a check here which route is loading,
-    # and export variables based on that?
-    all_tasks = {
-        task.id: {
-            "id": task.id,
-            "category": task.category,
-            "title": task.title,
-            "short": task.short,
-            "help": task.help,
-            "order": task.order,
-            "is_deleted": task.is_deleted
-        }
-        for task in Task.query.order_by(Task.order).all()
-    }
-    active_tasks = {
-        task_id: task for
-        task_id, task in all_tasks.items()
-        if not task["is_deleted"]
-    }
-    active_task_ids = list(active_tasks)
-    if active_task_ids:
-        first_task = active_task_ids[0]
-        next_task = dict(
-            zip(
-                active_task_ids,
-                active_task_ids[1:] + [active_task_ids[0]]
-            )
-        )
-    else:
-        first_task = None
-        next_task = {}
+# task and label context, memoized against the registry version
+ANNOTATION_CONTEXT = {"version": None, "context": {}}
+
+
+def get_annotation_context() -> dict:
+    """Task and label context, rebuilt only when the registry changes"""
+    if ANNOTATION_CONTEXT["version"] == TASK_REGISTRY.version:
+        return ANNOTATION_CONTEXT["context"]
 
+    version = TASK_REGISTRY.version
     TASKS = {
-        'tasks': all_tasks,
-        'active_ids': active_task_ids,
-        'active_tasks': active_tasks,
-        'first_task': first_task,
-        'next_task': next_task,
+        'tasks': TASK_REGISTRY.tasks,
+        'active_ids': TASK_REGISTRY.active_ids,
+        'active_tasks': TASK_REGISTRY.active_tasks,
+        'first_task': TASK_REGISTRY.first_task,
+        'next_task': TASK_REGISTRY.next_task,
 
         # task default information
         'default': TASK_DEFAULT_INFORMATION,
@@ -490,70 +521,21 @@ def inject_global_context():
     }
 
     LABELS = {
-        # 'task_labels': Label.query.filter(
-        #     ActionLabel.is_deleted == False  # noqa # '== False' is required
-        # ).with_entities(
-        #     Label.id, Label.task_id, Label.label, Label.description
-        # ).order_by(Label.task_id, Label.label).all(),
-        'token_labels': TokenLabel.query.filter(
-            TokenLabel.is_deleted == False  # noqa # '== False' is required
-        ).with_entities(
-            TokenLabel.id,
-            TokenLabel.task_id,
-            TokenLabel.label,
-            TokenLabel.description
-        ).order_by(TokenLabel.label).all(),
-        'token_relation_labels': TokenRelationLabel.query.filter(
-            TokenRelationLabel.is_deleted == False  # noqa # '== False' is required
-        ).with_entities(
-            TokenRelationLabel.id,
-            TokenRelationLabel.task_id,
-            TokenRelationLabel.label,
-            TokenRelationLabel.description
-        ).order_by(TokenRelationLabel.label).all(),
-        'sentence_labels': SentenceLabel.query.filter(
-            SentenceLabel.is_deleted == False  # noqa # '== False' is required
-        ).with_entities(
-            SentenceLabel.id,
-            SentenceLabel.task_id,
-            SentenceLabel.label,
-            SentenceLabel.description
-        ).order_by(SentenceLabel.label).all(),
-        'sentence_relation_labels': SentenceRelationLabel.query.filter(
-            SentenceRelationLabel.is_deleted == False  # noqa # '== False' is required
-        ).with_entities(
-            SentenceRelationLabel.id,
-            SentenceRelationLabel.task_id,
-            SentenceRelationLabel.label,
-            SentenceRelationLabel.description
-        ).order_by(SentenceRelationLabel.label).all(),
-        'admin_labels': []
+        **TASK_REGISTRY.labels,
+        'admin_labels': TASK_REGISTRY.admin_labels
     }
 
-    for task in Task.query.all():
-        _name = None
-        if task.category == TASK_TOKEN_CLASSIFICATION:
-            _name = "token"
-            _object_name = "token_labels"
-        if task.category == TASK_TOKEN_GRAPH:
-            _name = "token_relation"
-            _object_name = "token_relation_labels"
-        if task.category == TASK_SENTENCE_CLASSIFICATION:
-            _name = "sentence"
-            _object_name = "sentence_labels"
-        if task.category == TASK_SENTENCE_GRAPH:
-            _name = "sentence_relation"
-            _object_name = "sentence_relation_labels"
-
-        if _name is not None:
-            LABELS["admin_labels"].append({
-                "task_id": task.id,
-                "name": _name,
-                "title": task.title,
-                "object_name": _object_name
-            })
+    context = {
+        'context_tasks': TASKS,
+        'context_labels': LABELS,
+    }
+    ANNOTATION_CONTEXT.update({"version": version, "context": context})
+    return context
 
-    return {
+
+@webapp.context_processor
+def inject_global_context():
+    context = {
         'title': app.title,
         'header': app.header,
         'now': datetime.datetime.utcnow(),
@@ -562,11 +544,12 @@ def inject_global_context():
         # 'navigation_menu': app.navigation_menu,
         'footer_links': app.footer_links,
         'context_roles': ROLES,
-        'context_tasks': TASKS,
-        'context_labels': LABELS,
         'context_themes': THEMES,
         'config': app.config
     }
+    if request.endpoint in ANNOTATION_CONTEXT_ENDPOINTS:
+        context.update(get_annotation_context())
+    return context
 
 ###############################################################################
 # Flask-Admin Context for Flask-Security-Too
@@ -856,6 +839,27 @@ def show_home():
 ###############################################################################
 # Action Endpoints
 
+TASK_SUBMIT_ACTIONS = list(SUBMIT_HANDLERS)
+ROLE_ACTIONS = {
+    ROLE_ADMIN: [],
+    ROLE_ANNOTATOR: TASK_SUBMIT_ACTIONS + ["add_token", "split_token"],
+    ROLE_CURATOR: [],
+}
+
+
+def get_action_permission_error(action: str) -> str:
+    """Reason why the current user may not perform an action (if any)"""
+    valid_actions = [
+        _action for actions in ROLE_ACTIONS.values() for _action in actions
+    ]
+    if action not in valid_actions:
+        return f"Invalid action. ({action})"
+
+    for role, actions in ROLE_ACTIONS.items():
+        if action in actions and not current_user.has_role(role):
+            return "Insufficient permissions."
+    return None
+
 
 @webapp.route("/api/search/analysis/<string:token_text>")
 @auth_required()
@@ -889,48 +893,18 @@ def api():
     # ----------------------------------------------------------------------- #
     # Action Authorization
 
-    task_update_actions = list(TASK_UPDATE_ACTIONS.values())
-    annotator_actions = task_update_actions + ["add_token", "split_token"]
-
-    role_actions = {
-        ROLE_ADMIN: [],
-        ROLE_ANNOTATOR: annotator_actions,
-        ROLE_CURATOR: [],
-    }
-    valid_actions = [
-        action for actions in role_actions.values() for action in actions
-    ]
-
-    if action not in valid_actions:
-        api_response["message"] = f"Invalid action. ({action})"
+    permission_error = get_action_permission_error(action)
+    if permission_error is not None:
+        api_response["message"] = permission_error
         return jsonify(api_response)
 
-    for role, actions in role_actions.items():
-        if action in actions and not current_user.has_role(role):
-            api_response["message"] = "Insufficient permissions."
-            return jsonify(api_response)
-
     # ----------------------------------------------------------------------- #
     # Populate next_task
 
-    task_query = Task.query.filter(
-        Task.is_deleted == False  # noqa # '== False' is required
-    ).order_by(Task.order)
-    active_task_ids = [task.id for task in task_query.all()]
-
-    if active_task_ids:
-        first_task = active_task_ids[0]
-        next_task = dict(
-            zip(
-                active_task_ids,
-                active_task_ids[1:] + [active_task_ids[0]]
-            )
-        )
-    else:
-        first_task = None
-        next_task = {}
+    first_task = TASK_REGISTRY.first_task
+    next_task = TASK_REGISTRY.next_task
 
-    if action in task_update_actions:
+    if action in TASK_SUBMIT_ACTIONS:
         api_response["first_task"] = first_task
 
     # ----------------------------------------------------------------------- #
@@ -941,110 +915,77 @@ def api():
 
     # ----------------------------------------------------------------------- #
 
-    if action == TASK_UPDATE_ACTIONS[TASK_SENTENCE_BOUNDARY]:
+    if action in TASK_SUBMIT_ACTIONS:
         annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        boundary_tokens = [
-            int(b.strip())
-            for b in request.form["boundaries"].split(",")
-            if b.strip()
-        ]
-
-        perform_update = False
-        objects_to_update = []
-        # If there's any change between existing tokens and marked tokens,
-        # delete  all existing boundary tokens from this verse
-        # WordOrder also gets deleted as (CASCADE)
-        # TokenClassification also gets deleted as (CASCADE)
-        # TokenGraph also gets deleted as (CASCADE)
-        # TokenConnection also gets deleted as (CASCADE)
-        # SentenceClassification also gets deleted as (CASCADE)
-        # SentenceGraph also gets deleted as (CASCADE)
-
-        # NOTE: A sentence boundary task should always be "present"
-        # (even if inactive), since very other task is tied to boundary_id
-        # NOTE: We do not check with task_id because, only single sentence
-        # boundary task is supported
-        # TODO: Perhaps remove `task_id` column from Boundary table altogether
-        existing_boundary_query = Boundary.query.filter(
-            Boundary.verse_id == verse_id,
-            Boundary.annotator_id == annotator_id
-        )
-
-        existing_boundary_tokens = [
-            _boundary.token_id
-            for _boundary in existing_boundary_query.all()
-        ]
-        if set(existing_boundary_tokens) != set(boundary_tokens):
-            perform_update = True
-
-            # delete existing boundary markers from current verse
-            # NOTE: this *could* be improved to only delete the changed one
-            # but every change in boundary marker affects the boundary AFTER it
-            # as well, (and only that), and while adding multiple boundary
-            # markers, this can get complicated, so, delete all
-            existing_boundary_query.delete(synchronize_session=False)
-
-            # delete the first boundary marker after the current verse
-            next_boundary = Boundary.query.filter(
-                Boundary.verse_id > verse_id,
-                Boundary.annotator_id == annotator_id,
-            ).order_by(Boundary.token_id).first()
-            # print("Next Boundary:", next_boundary)
-
-            # NOTE: We do not check with task_id because, currently, only
-            # single token order task is supported (as there needs to be a
-            # link between this and boundary task)
-            # NOTE: If for some reason we need multiple token order tasks,
-            # all of them would require to be deleted anyway as the boundary
-            # gets changed, so we might never need to check with task_id here
-            if next_boundary:
-                word_order_of_next_boundary_query = WordOrder.query.filter(
-                    WordOrder.boundary_id == next_boundary.id,
-                    WordOrder.annotator_id == annotator_id
+        timer = StageTimer(enabled=SUBMIT_TIMING)
+        status = 200
+
+        # NOTE: annotations and the submit log are committed together
+        def submit():
+            with timer.stage("submission"):
+                submission = apply_submission(
+                    action, request.form, annotator_id
                 )
-                word_order_of_next_boundary_query.delete(
-                    synchronize_session=False
+            with timer.stage("submit_log"):
+                record_submits([{
+                    "verse_id": submission["verse_id"],
+                    "annotator_id": annotator_id,
+                    "task_id": submission["task_id"],
+                }])
+            with timer.stage("commit"):
+                db.session.commit()
+            # NOTE: looked up after the commit, so that a stale registry
+            # can not roll back a valid submission
+            with timer.stage("next_task"):
+                api_response["next_task"] = next_task.get(
+                    submission["task_id"]
                 )
-
-            # add new boundary markers
-            for boundary_token in boundary_tokens:
-                boundary = Boundary()
-                boundary.task_id = task_id
-                boundary.verse_id = verse_id
-                boundary.token_id = boundary_token
-                boundary.annotator_id = annotator_id
-                objects_to_update.append(boundary)
+            return submission
 
         try:
-            if perform_update:
-                if objects_to_update:
-                    db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
+            submission = retry_on_lock(
+                submit, SUBMIT_RETRIES, SUBMIT_RETRY_DELAY
+            )
+            ANNOTATION_VERSION.bump()
+
+            if submission["changes"]:
                 api_response["message"] = "Successfully updated!"
                 api_response["style"] = "success"
-                api_response["changes"] = True
             else:
                 api_response["message"] = "No changes were submitted."
                 api_response["style"] = "warning"
-
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
-            )
             api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
+            api_response["revision"] = submission["revision"]
+            api_response["changes"] = submission["changes"]
+        except StaleSubmission as e:
+            db.session.rollback()
+            status = 409
+            api_response["success"] = False
+            api_response["message"] = str(e)
+            api_response["style"] = "warning"
+            api_response.update(get_conflict_data(e, request.form))
+        except InvalidSubmission as e:
+            db.session.rollback()
+            api_response["success"] = False
+            api_response["message"] = str(e)
+            api_response["style"] = "danger"
         except Exception as e:
+            db.session.rollback()
             webapp.logger.exception(e)
             webapp.logger.info(request.form)
             api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
+            api_response["message"] = (
+                "The server is busy. Please submit again."
+                if is_lock_error(e)
+                else "Something went wrong!"
+            )
             api_response["style"] = "danger"
+            api_response.pop("next_task", None)
 
+        if timer.enabled:
+            api_response["timings"] = timer.timings
         api_response["data"] = None
-        return jsonify(api_response)
+        return jsonify(api_response), status
 
     # ----------------------------------------------------------------------- #
 
@@ -1074,6 +1015,7 @@ def api():
         try:
             db.session.add(token)
             db.session.commit()
+            ANNOTATION_VERSION.bump()
             api_response["message"] = (
                 f"Token '{token_data['text']}' added! (ID: {token.id})"
             )
@@ -1118,6 +1060,7 @@ def api():
             # and relatively small number of split components
             db.session.add_all(split_tokens)
             db.session.commit()
+            ANNOTATION_VERSION.bump()
             # print(split_tokens)
             api_response["message"] = (
                 f"Split token '{parent_token.text}' into {len(split_tokens)} parts!<br />"
@@ -1136,746 +1079,173 @@ def api():
 
     # ----------------------------------------------------------------------- #
 
-    if action == TASK_UPDATE_ACTIONS[TASK_WORD_ORDER]:
-        annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        word_order = json.loads(request.form["word_order"])
-
-        word_order_order = {}
-        boundary_ids = []
-
-        for dom_boundary_id, dom_token_ids in word_order.items():
-            m1 = re.match(r'boundary-([0-9]+)$', dom_boundary_id)
-            if not m1:
-                api_response["message"] = "Invalid boundary ID."
-                api_response["style"] = "danger"
-                api_response["success"] = False
-                break
-            boundary_id = int(m1.group(1))
-            boundary_ids.append(boundary_id)
-
-            _order = []
-            for dom_token_id in dom_token_ids:
-                m2 = re.match(r'token-button-([0-9]+)$', dom_token_id)
-                if m2:
-                    _order.append(int(m2.group(1)))
-            word_order_order[boundary_id] = _order
-
-        objects_to_update = []
-
-        existing_word_order_query = WordOrder.query.filter(
-            WordOrder.task_id == task_id,
-            WordOrder.boundary_id.in_(boundary_ids),
-            WordOrder.annotator_id == annotator_id
-        )
-        existing_word_order_query.delete(synchronize_session=False)
-
-        for boundary_id, token_ids in word_order_order.items():
-            for order_id, token_id in enumerate(token_ids, start=1):
-                _word_order = WordOrder()
-                _word_order.task_id = task_id
-                _word_order.boundary_id = boundary_id
-                _word_order.token_id = token_id
-                _word_order.order = order_id
-                _word_order.annotator_id = annotator_id
-                objects_to_update.append(_word_order)
-
-        try:
-            if objects_to_update:
-                db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
-                api_response["message"] = "Successfully updated!"
-                api_response["style"] = "success"
-            else:
-                api_response["message"] = "No changes were submitted."
-                api_response["style"] = "warning"
-
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
-            )
-            api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
-        except Exception as e:
-            webapp.logger.exception(e)
-            webapp.logger.info(request.form)
-            api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
-            api_response["style"] = "danger"
-
+    if action == "custom_action":
         api_response["data"] = None
         return jsonify(api_response)
 
     # ----------------------------------------------------------------------- #
 
-    if action == TASK_UPDATE_ACTIONS[TASK_TOKEN_TEXT_ANNOTATION]:
-        annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        text_annotation_data = json.loads(request.form["text_annotation_data"])
-
-        objects_to_update = []
-        try:
-            text_annotation_data = {
-                int(k.split('-')[-1]): {
-                    "boundary_id": int(v["boundary_id"]),
-                    "text_annotation": v["text_annotation"]
-                }
-                for k, v in text_annotation_data.items()
-                if re.match(r'token-text-annotation-input-[0-9]+-([0-9]+)$', k)
-            }
-        except Exception:
-            api_response["success"] = False
-            api_response["message"] = "Invalid data."
-            api_response["style"] = "danger"
-            return jsonify(api_response)
-
-        existing_text_annotations = TokenTextAnnotation.query.filter(
-            TokenTextAnnotation.task_id == task_id,
-            TokenTextAnnotation.boundary.has(Boundary.verse_id == verse_id),
-            TokenTextAnnotation.annotator_id == annotator_id,
-        ).all()
-        existing_text_annotation_token_ids = [
-            text_annotation.token_id
-            for text_annotation in existing_text_annotations
-        ]
-        for text_annotation in existing_text_annotations:
-            if text_annotation.token_id not in text_annotation_data:
-                # text_annotation exists but was not submitted (i.e. removed)
-                # TODO: This triggers on the deleted entities always
-                # Perhaps we need to add a check
-                # That should avoid "Successfully updated" message even when
-                # there are no updates
-                text_annotation.is_deleted = True
-                objects_to_update.append(text_annotation)
-            else:
-                # text_annotation exists and is submitted (i.e. retained)
-                # check if there are any changes to the text_annotation
-                token_id = text_annotation.token_id
-                if any([
-                    text_annotation.text != text_annotation_data[token_id]["text_annotation"],
-                    text_annotation.boundary_id != text_annotation_data[token_id]["boundary_id"],
-                    text_annotation.is_deleted is True
-                ]):
-                    text_annotation.text = text_annotation_data[token_id]["text_annotation"]
-                    text_annotation.boundary_id = text_annotation_data[token_id]["boundary_id"]
-                    text_annotation.is_deleted = False
-                    objects_to_update.append(text_annotation)
-
-        for token_id, _text_annotation_data in text_annotation_data.items():
-            if token_id in existing_text_annotation_token_ids:
-                # submitted text_annotation already exists
-                # "else" part of the previous condition block handles this
-                # so we can skip here
-                continue
-
-            # submitted text_annotation doesn't exist, create
-            text_annotation = TokenTextAnnotation()
-            text_annotation.task_id = task_id
-            text_annotation.boundary_id = _text_annotation_data["boundary_id"]
-            text_annotation.token_id = token_id
-            text_annotation.text = _text_annotation_data["text_annotation"]
-            text_annotation.annotator_id = annotator_id
-            text_annotation.is_deleted = False
-            objects_to_update.append(text_annotation)
-
-        try:
-            if objects_to_update:
-                db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
-                api_response["message"] = "Successfully updated!"
-                api_response["style"] = "success"
-            else:
-                api_response["message"] = "No changes were submitted."
-                api_response["style"] = "warning"
+    return jsonify(api_response)
 
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
-            )
-            api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
-        except Exception as e:
-            webapp.logger.exception(e)
-            webapp.logger.info(request.form)
-            api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
-            api_response["style"] = "danger"
 
-        api_response["data"] = None
+@webapp.route("/api/batch", methods=["POST"])
+@auth_required()
+def api_batch():
+    """Apply a batch of task submissions in a single transaction
+
+    The request body is a JSON list of submissions (or an object with the
+    list as `items`), each of which has the same fields as the form of
+    a task update action (`/api`), e.g.
+    `{"action": "update_word_order", "task_id": 2, "verse_id": 1,
+    "word_order": {...}}`.
+    Submissions are applied in order, each in its own savepoint, so that an
+    invalid (or stale) submission is skipped without affecting the others.
+    The valid ones are committed (along with their submit logs) at once.
+    """
+    api_response = {
+        "success": False,
+        "first_task": TASK_REGISTRY.first_task,
+        "results": [],
+    }
+    payload = request.get_json(silent=True)
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not all(
+        isinstance(item, dict) for item in items
+    ):
+        api_response["message"] = "Invalid batch."
         return jsonify(api_response)
 
-    # ----------------------------------------------------------------------- #
-
-    if action == TASK_UPDATE_ACTIONS[TASK_TOKEN_CLASSIFICATION]:
-        annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        token_classification_data = json.loads(
-            request.form["token_classification_data"]
+    if len(items) > BATCH_MAX_ITEMS:
+        api_response["message"] = (
+            f"Too many submissions in a batch. (maximum {BATCH_MAX_ITEMS})"
         )
-
-        objects_to_update = []
-        try:
-            token_classification_data = {
-                int(k.split('-')[-1]): {
-                    "boundary_id": int(v["boundary_id"]),
-                    "label_id": int(v["label_id"])
-                }
-                for k, v in token_classification_data.items()
-                if re.match(r'token-class-selector-[0-9]+-([0-9]+)$', k)
-            }
-        except Exception:
-            api_response["success"] = False
-            api_response["message"] = "Invalid data."
-            api_response["style"] = "danger"
-            return jsonify(api_response)
-
-        existing_token_classification = TokenClassification.query.filter(
-            TokenClassification.task_id == task_id,
-            TokenClassification.boundary.has(Boundary.verse_id == verse_id),
-            TokenClassification.annotator_id == annotator_id,
-        ).all()
-        existing_token_classification_token_ids = [
-            tokclf.token_id
-            for tokclf in existing_token_classification
-        ]
-        for tokclf in existing_token_classification:
-            if tokclf.token_id not in token_classification_data:
-                # tokclf exists but was not submitted (i.e. removed)
-                # TODO: This triggers on the deleted entities always
-                # Perhaps we need to add a check
-                # That should avoid "Successfully updated" message even when
-                # there are no updates
-                tokclf.is_deleted = True
-                objects_to_update.append(tokclf)
-            else:
-                # tokclf exists and is submitted (i.e. retained)
-                # check if there are any changes to the tokclf
-                token_id = tokclf.token_id
-                if any([
-                    tokclf.label_id != token_classification_data[token_id]["label_id"],
-                    tokclf.boundary_id != token_classification_data[token_id]["boundary_id"],
-                    tokclf.is_deleted is True
-                ]):
-                    tokclf.label_id = token_classification_data[token_id]["label_id"]
-                    tokclf.boundary_id = token_classification_data[token_id]["boundary_id"]
-                    tokclf.is_deleted = False
-                    objects_to_update.append(tokclf)
-
-        for token_id, _tokclf_data in token_classification_data.items():
-            if token_id in existing_token_classification_token_ids:
-                # submitted tokclf already exists
-                # "else" part of the previous condition block handles this
-                # so we can skip here
-                continue
-
-            # submitted tokclf doesn't exist, create
-            tokclf = TokenClassification()
-            tokclf.task_id = task_id
-            tokclf.boundary_id = _tokclf_data["boundary_id"]
-            tokclf.token_id = token_id
-            tokclf.label_id = _tokclf_data["label_id"]
-            tokclf.annotator_id = annotator_id
-            tokclf.is_deleted = False
-            objects_to_update.append(tokclf)
-
-        try:
-            if objects_to_update:
-                db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
-                api_response["message"] = "Successfully updated!"
-                api_response["style"] = "success"
-            else:
-                api_response["message"] = "No changes were submitted."
-                api_response["style"] = "warning"
-
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
-            )
-            api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
-        except Exception as e:
-            webapp.logger.exception(e)
-            webapp.logger.info(request.form)
-            api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
-            api_response["style"] = "danger"
-
-        api_response["data"] = None
         return jsonify(api_response)
 
-    # ----------------------------------------------------------------------- #
-
-    if action == TASK_UPDATE_ACTIONS[TASK_TOKEN_GRAPH]:
-        annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        token_graph_data = json.loads(
-            request.form.get("token_graph_data", "[]")
-        )
-
-        # NOTE: we use find existing (src_id, dst_id) 2-tuples,
-        # and not (src_id, label_id, dst_id) 3-tuples in order to allow change
-        # of label type without violating unique constraint.
-        # so, if a triple (s, l1, d) exists and we want to make it (s, l2, d),
-        # we need to be able to find (s, l1, d) as "existing"
-        # otherwise, we have to remove the "unique" constraint on src_id, dst_id
-        # and include label_id in it too.
-
-        objects_to_update = []
-        try:
-            # validate token_graph_data: List[Dict]
-            # keys: boundary_id, src_id, label_id, dst_id
-            # values: strings? cast int()
-            token_graph_data = {
-                (
-                    int(tokrel["src_id"]),
-                    # int(tokrel["label_id"]),
-                    int(tokrel["dst_id"])
-                ): {
-                    k: int(v)
-                    for k, v in tokrel.items()
-                }
-                for tokrel in token_graph_data
+    annotator_id = current_user.id
+    next_task = TASK_REGISTRY.next_task
+
+    timer = StageTimer(enabled=SUBMIT_TIMING)
+
+    def submit_batch():
+        api_response["results"] = []
+        submits = []
+        # NOTE: submissions of a verse in a batch are based on the same
+        # revision, the ones after the first are rebased on the revision
+        # resulting from the previous one
+        # (verse_id: (revision seen by the client, resulting revision))
+        batch_revisions = {}
+        for index, item in enumerate(items):
+            action = item.get("action")
+            result = {
+                "index": index,
+                "action": action,
+                "success": False,
             }
-        except Exception:
-            api_response["success"] = False
-            api_response["message"] = "Invalid data."
-            api_response["style"] = "danger"
-            return jsonify(api_response)
-
-        existing_tokrels_query = TokenGraph.query.filter(
-            TokenGraph.task_id == task_id,
-            TokenGraph.boundary.has(Boundary.verse_id == verse_id),
-            TokenGraph.annotator_id == annotator_id,
-        )
-
-        existing_tokrels = existing_tokrels_query.all()
-        existing_tokrel_tuples = [
-            # (tokrel.src_id, tokrel.label_id, tokrel.dst_id)
-            (tokrel.src_id, tokrel.dst_id)
-            for tokrel in existing_tokrels
-        ]
-
-        for tokrel in existing_tokrels:
-            # tokrel_tuple = (tokrel.src_id, tokrel.label_id, tokrel.dst_id)
-            tokrel_tuple = (tokrel.src_id, tokrel.dst_id)
-            if tokrel_tuple not in token_graph_data:
-                # tokrel exists but was not submitted (i.e. removed)
-                tokrel.is_deleted = True
-                objects_to_update.append(tokrel)
-            else:
-                # tokrel exists and is submitted (i.e. retained or changed)
-                # check if there are any changes to the tokrel
-                if any([
-                    tokrel.boundary_id != token_graph_data[tokrel_tuple]["boundary_id"],
-                    tokrel.label_id != token_graph_data[tokrel_tuple]["label_id"],
-                    tokrel.is_deleted is True
-                ]):
-                    tokrel.boundary_id = token_graph_data[tokrel_tuple]["boundary_id"]
-                    tokrel.label_id = token_graph_data[tokrel_tuple]["label_id"]
-                    tokrel.is_deleted = False
-                    objects_to_update.append(tokrel)
-
-        for tokrel_tuple, _tokrel_data in token_graph_data.items():
-            if tokrel_tuple in existing_tokrel_tuples:
-                # submitted tokrel already exists
-                # "else" part of the previous condition block handles this
-                # so we can skip here
+            api_response["results"].append(result)
+
+            permission_error = get_action_permission_error(action)
+            if (
+                permission_error is not None or
+                action not in TASK_SUBMIT_ACTIONS
+            ):
+                result["message"] = permission_error or (
+                    f"Invalid action. ({action})"
+                )
+                result["style"] = "danger"
                 continue
 
-            # submitted tokrel doesn't exist, create
-            tokrel = TokenGraph()
-            tokrel.task_id = task_id
-            tokrel.boundary_id = _tokrel_data["boundary_id"]
-            tokrel.src_id = _tokrel_data["src_id"]
-            tokrel.label_id = _tokrel_data["label_id"]
-            tokrel.dst_id = _tokrel_data["dst_id"]
-            tokrel.annotator_id = annotator_id
-            tokrel.is_deleted = False
-            objects_to_update.append(tokrel)
-
-        try:
-            if objects_to_update:
-                db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
-                api_response["message"] = "Successfully updated!"
-                api_response["style"] = "success"
+            verse_key = str(item.get("verse_id"))
+            seen_revision = str(item.get("revision"))
+            if verse_key in batch_revisions:
+                base_revision, claimed_revision = batch_revisions[verse_key]
+                if seen_revision == base_revision:
+                    item = {**item, "revision": claimed_revision}
             else:
-                api_response["message"] = "No changes were submitted."
-                api_response["style"] = "warning"
-
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
-            )
-            api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
-        except Exception as e:
-            webapp.logger.exception(e)
-            webapp.logger.info(request.form)
-            api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
-            api_response["style"] = "danger"
+                base_revision = seen_revision
 
-        api_response["data"] = None
-        return jsonify(api_response)
-
-    # ----------------------------------------------------------------------- #
-
-    if action == TASK_UPDATE_ACTIONS[TASK_TOKEN_CONNECTION]:
-        annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        token_connection_data = json.loads(
-            request.form.get("token_connection_data", "[]")
-        )
-        context_data = json.loads(
-            request.form.get("context_data", "[]")
-        )
-
-        objects_to_update = []
-        try:
-            # validate token_connection_data: List[Dict]
-            # keys: boundary_id, src_id, dst_id
-            # values: strings? cast int()
-            token_connection_data = {
-                (
-                    int(tokcon["src_id"]),
-                    int(tokcon["dst_id"])
-                ): {
-                    k: int(v)
-                    for k, v in tokcon.items()
-                }
-                for tokcon in token_connection_data
-            }
-            context_data = [int(boundary_id) for boundary_id in context_data]
-        except Exception:
-            api_response["success"] = False
-            api_response["message"] = "Invalid data."
-            api_response["style"] = "danger"
-            return jsonify(api_response)
-
-        existing_tokcons_query = TokenConnection.query.filter(
-            TokenConnection.task_id == task_id,
-            TokenConnection.boundary_id.in_(context_data),
-            TokenConnection.annotator_id == annotator_id,
-        )
-
-        existing_tokcons = existing_tokcons_query.all()
-        existing_tokcon_tuples = [
-            (tokcon.src_id, tokcon.dst_id)
-            for tokcon in existing_tokcons
-        ]
-
-        for tokcon in existing_tokcons:
-            tokcon_tuple = (tokcon.src_id, tokcon.dst_id)
-            if tokcon_tuple not in token_connection_data:
-                # tokcon exists but was not submitted (i.e. removed)
-                tokcon.is_deleted = True
-                objects_to_update.append(tokcon)
-            else:
-                # TODO: do we really need to check boundary_id?
-                # when would it be different when src_id and dst_id are same?
-                # only if we change convention?
-
-                # tokcon exists and is submitted (i.e. retained)
-                # check if there are any changes to the tokcon
-                if any([
-                    tokcon.boundary_id != token_connection_data[tokcon_tuple]["boundary_id"],
-                    tokcon.is_deleted is True
-                ]):
-                    tokcon.boundary_id = token_connection_data[tokcon_tuple]["boundary_id"]
-                    tokcon.is_deleted = False
-                    objects_to_update.append(tokcon)
-
-        for tokcon_tuple, _tokcon_data in token_connection_data.items():
-            if tokcon_tuple in existing_tokcon_tuples:
-                # submitted tokcon already exists
-                # "else" part of the previous condition block handles this
-                # so we can skip here
+            savepoint = db.session.begin_nested()
+            try:
+                with timer.stage("submission"):
+                    submission = apply_submission(action, item, annotator_id)
+                savepoint.commit()
+            except StaleSubmission as e:
+                savepoint.rollback()
+                result["message"] = str(e)
+                result["style"] = "warning"
+                result.update(get_conflict_data(e, item))
                 continue
-
-            # submitted tokcon doesn't exist, create
-            tokcon = TokenConnection()
-            tokcon.task_id = task_id
-            tokcon.boundary_id = _tokcon_data["boundary_id"]
-            tokcon.src_id = _tokcon_data["src_id"]
-            tokcon.dst_id = _tokcon_data["dst_id"]
-            tokcon.annotator_id = annotator_id
-            tokcon.is_deleted = False
-            objects_to_update.append(tokcon)
-
-        try:
-            if objects_to_update:
-                db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
-                api_response["message"] = "Successfully updated!"
-                api_response["style"] = "success"
-            else:
-                api_response["message"] = "No changes were submitted."
-                api_response["style"] = "warning"
-
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
-            )
-            api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
-        except Exception as e:
-            webapp.logger.exception(e)
-            webapp.logger.info(request.form)
-            api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
-            api_response["style"] = "danger"
-
-        api_response["data"] = None
-        return jsonify(api_response)
-
-    # ----------------------------------------------------------------------- #
-
-    if action == TASK_UPDATE_ACTIONS[TASK_SENTENCE_CLASSIFICATION]:
-        annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        sentence_classification_data = json.loads(
-            request.form.get("sentence_classification_data", "[]")
-        )
-        objects_to_update = []
-        try:
-            # validate sentence_classification_data: List[Dict]
-            # keys: boundary_id, label_id
-            # values: strings? cast int()
-            sentence_classification_data = {
-                int(sentclf["boundary_id"]): int(sentclf["label_id"])
-                for sentclf in sentence_classification_data
-            }
-        except Exception:
-            api_response["success"] = False
-            api_response["message"] = "Invalid data."
-            api_response["style"] = "danger"
-            return jsonify(api_response)
-
-        existing_sentence_classification = SentenceClassification.query.filter(
-            SentenceClassification.task_id == task_id,
-            SentenceClassification.boundary.has(Boundary.verse_id == verse_id),
-            SentenceClassification.annotator_id == annotator_id,
-        ).all()
-        existing_boundaries = {
-            sentclf.boundary_id: sentclf.label_id
-            for sentclf in existing_sentence_classification
-        }
-
-        for sentclf in existing_sentence_classification:
-            if sentclf.boundary_id not in sentence_classification_data:
-                # sentclf exists but was not submitted (i.e. removed)
-                sentclf.is_deleted = True
-                objects_to_update.append(sentclf)
-            else:
-                # sentclf exists and is submitted (i.e. retained)
-                # check if there are any changes to the sentclf
-                if any([
-                    sentclf.label_id != sentence_classification_data[sentclf.boundary_id],
-                    sentclf.is_deleted is True
-                ]):
-                    sentclf.label_id = sentence_classification_data[sentclf.boundary_id]
-                    sentclf.is_deleted = False
-                    objects_to_update.append(sentclf)
-
-        for _boundary_id, _label_id in sentence_classification_data.items():
-            if _boundary_id in existing_boundaries:
-                # submitted sentclf already exists
-                # "else" part of the previous condition block handles this
-                # so we can skip here
+            except InvalidSubmission as e:
+                savepoint.rollback()
+                result["message"] = str(e)
+                result["style"] = "danger"
+                continue
+            except Exception as e:
+                savepoint.rollback()
+                if is_lock_error(e):
+                    # retry the entire batch
+                    raise
+                webapp.logger.exception(e)
+                webapp.logger.info(item)
+                result["message"] = "Something went wrong!"
+                result["style"] = "danger"
                 continue
 
-            # submitted sentclf doesn't exist, create
-            sentclf = SentenceClassification()
-            sentclf.task_id = task_id
-            sentclf.boundary_id = _boundary_id
-            sentclf.label_id = _label_id
-            sentclf.annotator_id = annotator_id
-            sentclf.is_deleted = False
-            objects_to_update.append(sentclf)
-
-        try:
-            if objects_to_update:
-                db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
-                api_response["message"] = "Successfully updated!"
-                api_response["style"] = "success"
-            else:
-                api_response["message"] = "No changes were submitted."
-                api_response["style"] = "warning"
-
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
+            batch_revisions[verse_key] = (
+                base_revision, submission["revision"]
             )
-            api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
-        except Exception as e:
-            webapp.logger.exception(e)
-            webapp.logger.info(request.form)
-            api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
-            api_response["style"] = "danger"
-
-        api_response["data"] = None
-
-        return jsonify(api_response)
+            submits.append({
+                "verse_id": submission["verse_id"],
+                "annotator_id": annotator_id,
+                "task_id": submission["task_id"],
+            })
+            result.update(submission)
+            result["success"] = True
+            result["next_task"] = next_task.get(submission["task_id"])
+            if submission["changes"]:
+                result["message"] = "Successfully updated!"
+                result["style"] = "success"
+            else:
+                result["message"] = "No changes were submitted."
+                result["style"] = "warning"
 
-    # ----------------------------------------------------------------------- #
+        with timer.stage("submit_log"):
+            record_submits(submits)
+        with timer.stage("commit"):
+            db.session.commit()
+        return submits
 
-    if action == TASK_UPDATE_ACTIONS[TASK_SENTENCE_GRAPH]:
-        annotator_id = current_user.id
-        task_id = int(request.form["task_id"])
-        verse_id = int(request.form["verse_id"])
-        sentence_graph_data = json.loads(
-            request.form.get("sentence_graph_data", "[]")
-        )
-        context_data = json.loads(
-            request.form.get("context_data", "[]")
+    try:
+        submits = retry_on_lock(
+            submit_batch, SUBMIT_RETRIES, SUBMIT_RETRY_DELAY
         )
-
-        objects_to_update = []
-        try:
-            # validate sentence_graph_data: List[Dict]
-            # keys:
-            # src_boundary_id, src_token_id,
-            # dst_boundary_id, dst_token_id
-            # label_id, relation_type (0, 1, 2, 3)
-            # values: strings? cast int()
-            sentence_graph_data = {
-                (
-                    int(sentrel["src_boundary_id"]),
-                    int(sentrel["src_token_id"]),
-                    int(sentrel["dst_boundary_id"]),
-                    int(sentrel["dst_token_id"]),
-                    int(sentrel["relation_type"])
-                ): {
-                    k: int(v)
-                    for k, v in sentrel.items()
-                }
-                for sentrel in sentence_graph_data
-            }
-            context_data = [int(boundary_id) for boundary_id in context_data]
-        except Exception:
-            api_response["success"] = False
-            api_response["message"] = "Invalid data."
-            api_response["style"] = "danger"
-            return jsonify(api_response)
-
-        # TODO: Re-examine if the conditions are proper
-        existing_sentrels_query = SentenceGraph.query.filter(
-            SentenceGraph.task_id == task_id,
-            SentenceGraph.src_boundary_id.in_(context_data),
-            SentenceGraph.dst_boundary_id.in_(context_data),
-            SentenceGraph.annotator_id == annotator_id,
+        if submits:
+            ANNOTATION_VERSION.bump()
+    except Exception as e:
+        db.session.rollback()
+        webapp.logger.exception(e)
+        for result in api_response["results"]:
+            if result["success"]:
+                result["success"] = False
+                result["message"] = "Something went wrong!"
+                result["style"] = "danger"
+        api_response["message"] = (
+            "The server is busy. Please submit again."
+            if is_lock_error(e)
+            else "Something went wrong!"
         )
-
-        existing_sentrels = existing_sentrels_query.all()
-        existing_sentrel_tuples = [
-            (
-                sentrel.src_boundary_id,
-                sentrel.src_token_id,
-                sentrel.dst_boundary_id,
-                sentrel.dst_token_id,
-                sentrel.relation_type
-            )
-            for sentrel in existing_sentrels
-        ]
-
-        for sentrel in existing_sentrels:
-            sentrel_tuple = (
-                sentrel.src_boundary_id,
-                sentrel.src_token_id,
-                sentrel.dst_boundary_id,
-                sentrel.dst_token_id,
-                sentrel.relation_type
-            )
-            if sentrel_tuple not in sentence_graph_data:
-                # sentrel exists but was not submitted (i.e. removed)
-                sentrel.is_deleted = True
-                objects_to_update.append(sentrel)
-            else:
-                # TODO: Re-examine conditions in any()
-                # i.e. conditions to decide whether sentrel should be updated
-
-                # sentrel exists and is submitted (i.e. retained)
-                # check if there are any changes to the sentrel
-                if any([
-                    sentrel.label_id != sentence_graph_data[sentrel_tuple]["label_id"],
-                    sentrel.is_deleted is True
-                ]):
-                    sentrel.label_id = sentence_graph_data[sentrel_tuple]["label_id"]
-                    sentrel.is_deleted = False
-                    objects_to_update.append(sentrel)
-
-        for sentrel_tuple, _sentrel_data in sentence_graph_data.items():
-            if sentrel_tuple in existing_sentrel_tuples:
-                # submitted sentrel already exists
-                # "else" part of the previous condition block handles this
-                # so we can skip here
-                continue
-
-            # submitted sentrel doesn't exist, create
-            sentrel = SentenceGraph()
-            sentrel.task_id = task_id
-            sentrel.src_boundary_id = _sentrel_data["src_boundary_id"]
-            sentrel.src_token_id = _sentrel_data["src_token_id"]
-            sentrel.dst_boundary_id = _sentrel_data["dst_boundary_id"]
-            sentrel.dst_token_id = _sentrel_data["dst_token_id"]
-            sentrel.label_id = _sentrel_data["label_id"]
-            sentrel.relation_type = _sentrel_data["relation_type"]
-            sentrel.annotator_id = annotator_id
-            sentrel.is_deleted = False
-            objects_to_update.append(sentrel)
-
-        try:
-            if objects_to_update:
-                db.session.bulk_save_objects(objects_to_update)
-                db.session.commit()
-                api_response["message"] = "Successfully updated!"
-                api_response["style"] = "success"
-            else:
-                api_response["message"] = "No changes were submitted."
-                api_response["style"] = "warning"
-
-            record_submit(
-                verse_id=verse_id,
-                annotator_id=annotator_id,
-                task_id=task_id
-            )
-            api_response["success"] = True
-            api_response["next_task"] = next_task[task_id]
-        except Exception as e:
-            webapp.logger.exception(e)
-            webapp.logger.info(request.form)
-            api_response["success"] = False
-            api_response["message"] = "Something went wrong!"
-            api_response["style"] = "danger"
-
-        api_response["data"] = None
-        return jsonify(api_response)
-
-    # ----------------------------------------------------------------------- #
-
-    if action == "custom_action":
-        api_response["data"] = None
+        api_response["style"] = "danger"
         return jsonify(api_response)
 
-    # ----------------------------------------------------------------------- #
-
+    if timer.enabled:
+        api_response["timings"] = timer.timings
+    success_count = len(submits)
+    api_response["success"] = True
+    api_response["message"] = (
+        f"Submitted {success_count} of {len(items)} items."
+    )
+    api_response["style"] = (
+        "success" if success_count == len(items) else "warning"
+    )
     return jsonify(api_response)
 
 
@@ -1892,13 +1262,75 @@ def api_chapter(chapter_id):
             'data': []
         })
 
-    data = get_chapter_data(chapter_id, current_user)
+    # Verse Window
+    # NOTE: without any of the window arguments, the entire chapter is served
+    offset = max(request.args.get("offset", default=0, type=int), 0)
+    limit = request.args.get("limit", default=None, type=int)
+    after = request.args.get("after", default=None, type=int)
+    if limit is not None and limit <= 0:
+        limit = None
+
+    window = get_chapter_window(
+        chapter_id, offset=offset, limit=limit, after=after
+    )
+
+    annotator_ids = get_annotator_ids(current_user)
+    fingerprint = get_verse_fingerprint(window["verse_ids"], annotator_ids)
+    etag = get_request_etag(fingerprint, window["total"], window["next"])
+    # NOTE: degraded data is sent without an ETag, so a client can only hold
+    # the ETag of complete data, and 304 never preserves a degraded payload
+    if request.if_none_match.contains(etag):
+        return set_validation_headers(Response(status=304), etag)
+
+    tasks = get_requested_tasks()
+    cache_key = (
+        chapter_id,
+        tuple(tasks) if tasks is not None else None,
+        tuple(annotator_ids or []),
+        ANNOTATION_VERSION.value,
+        fingerprint
+    )
+    data = CHAPTER_CACHE.get(cache_key)
+
+    if request.args.get("format") == "ndjson":
+        # NOTE: streamed responses are not added to the cache,
+        # as that would require holding the entire payload in memory
+        # NOTE: headers are sent before the heuristics are computed, hence
+        # an uncached stream is validated only if it can not be degraded
+        if data is None:
+            verses = iter_verse_data(window["verse_ids"], annotator_ids, tasks)
+            if has_heuristic_limits():
+                etag = None
+        else:
+            verses = data.values()
+        response = stream_verse_data(verses)
+        response.headers["X-Total-Count"] = window["total"]
+        if window["next"] is not None:
+            response.headers["X-Next-Cursor"] = window["next"]
+        return set_validation_headers(response, etag)
+
+    if data is None:
+        data = get_chapter_data(
+            chapter_id, current_user, verse_ids=window["verse_ids"],
+            tasks=tasks
+        )
+        if is_verse_data_degraded(data.values()):
+            etag = None
+        else:
+            CHAPTER_CACHE.set(cache_key, data)
 
     response = {
         'title': f"{chapter.corpus.name} - {chapter.name}",
+        'total': window["total"],
+        'offset': window["offset"],
+        'limit': window["limit"],
+        'next': window["next"],
         'data': list(data.values())
     }
-    return jsonify(response)
+    if request.args.get("format") == "compact":
+        response['format'] = "compact"
+        response['data'] = encode_verse_data(response['data'])
+    return set_validation_headers(jsonify(response), etag)
 
 # --------------------------------------------------------------------------- #
 
@@ -1914,8 +1346,140 @@ def api_verse(verse_id):
     if current_user.has_permission(PERMISSION_ANNOTATE):
         annotator_ids = [current_user.id]
 
-    data = get_verse_data([verse_id], annotator_ids=annotator_ids)
-    return jsonify(data)
+    etag = get_request_etag(
+        get_verse_fingerprint([verse_id], annotator_ids)
+    )
+    if request.if_none_match.contains(etag):
+        return set_validation_headers(Response(status=304), etag)
+
+    tasks = get_requested_tasks()
+    if request.args.get("format") == "ndjson":
+        response = stream_verse_data(
+            iter_verse_data([verse_id], annotator_ids=annotator_ids, tasks=tasks)
+        )
+        if has_heuristic_limits():
+            etag = None
+        return set_validation_headers(response, etag)
+
+    data = get_verse_data([verse_id], annotator_ids=annotator_ids, tasks=tasks)
+    if is_verse_data_degraded(data.values()):
+        etag = None
+    return set_validation_headers(jsonify(data), etag)
+
+
+@webapp.route("/api/verse/<int:verse_id>/delta")
+@auth_required()
+def api_verse_delta(verse_id):
+    verse = Verse.query.get(verse_id)
+    if verse is None:
+        return jsonify({})
+
+    annotator_ids = []
+    if current_user.has_permission(PERMISSION_ANNOTATE):
+        annotator_ids = [current_user.id]
+
+    # NOTE: invalid or missing version results in the entire verse data
+    try:
+        since = datetime.datetime.fromisoformat(request.args["since"])
+    except (KeyError, ValueError):
+        since = None
+
+    tasks = get_requested_tasks()
+    delta = get_verse_delta(
+        verse_id, annotator_ids=annotator_ids, since=since, tasks=tasks
+    )
+    response = jsonify(delta)
+    if delta["version"] is not None:
+        response.headers["X-Verse-Version"] = delta["version"]
+    return response
+
+
+def get_requested_tasks() -> list:
+    """Get task categories requested through the `tasks` argument
+
+    Returns
+    -------
+    list
+        List of valid task categories, None if the argument is absent
+    """
+    if not request.args.get("tasks"):
+        return None
+    return [
+        task_category.strip()
+        for task_category in request.args["tasks"].split(",")
+        if task_category.strip() in TASK_CATEGORY_LIST
+    ]
+
+
+def get_request_etag(*fingerprint) -> str:
+    """Get ETag for the current request
+
+    Parameters
+    ----------
+    *fingerprint
+        Values identifying the state of the requested data
+        (e.g. from `get_verse_fingerprint()`)
+
+    Returns
+    -------
+    str
+        ETag, distinct for every URL (including query arguments)
+    """
+    content = repr((request.full_path, current_user.id, *fingerprint))
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def set_validation_headers(response: Response, etag: str) -> Response:
+    """Set headers that make the clients revalidate data using ETag
+
+    If `etag` is None (e.g. degraded heuristics), the response is not stored
+    by the clients at all.
+    """
+    if etag is None:
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def stream_verse_data(verses) -> Response:
+    """Stream verse data as newline delimited JSON (NDJSON)
+
+    Parameters
+    ----------
+    verses : Iterable[dict]
+        Verse data objects, e.g. from `iter_verse_data()`
+
+    Returns
+    -------
+    Response
+        Streamed response with one verse object per line
+    """
+    def generate():
+        for verse in verses:
+            yield webapp.json.dumps(verse) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson"
+    )
+
+# --------------------------------------------------------------------------- #
+
+
+@webapp.route("/api/metrics")
+@auth_required()
+@permissions_required(PERMISSION_VIEW_ACP)
+def api_metrics():
+    return jsonify({
+        "annotation_version": ANNOTATION_VERSION.value,
+        "task_registry": TASK_REGISTRY.stats(),
+        "chapter_cache": CHAPTER_CACHE.stats(),
+        "heuristic_cache": HEURISTIC_CACHE.stats(),
+        "heuristic_limits": get_heuristic_stats(),
+        "submit_contention": get_submit_stats(),
+    })
 
 # --------------------------------------------------------------------------- #
 
@@ -2116,6 +1680,8 @@ def perform_action():
         if task is not None:
             db.session.add(task)
             db.session.commit()
+            TASK_REGISTRY.invalidate()
+            ANNOTATION_VERSION.bump()
             flash(message, "success")
         else:
             flash(message)
@@ -2131,6 +1697,8 @@ def perform_action():
                 task.order = int(task_order)
         db.session.bulk_save_objects(tasks)
         db.session.commit()
+        TASK_REGISTRY.invalidate()
+        ANNOTATION_VERSION.bump()
         flash("Tasks updated!", "success")
         return redirect(request.referrer)
 
@@ -2292,6 +1860,8 @@ def perform_action():
 
         if status:
             db.session.commit()
+            TASK_REGISTRY.invalidate()
+            ANNOTATION_VERSION.bump()
             flash(message, "success")
         else:
             flash(message, "info")
@@ -2424,6 +1994,7 @@ def perform_action():
             # Such a count is inaccurate for WordOrder
             # (Since each "order" corresponds to several entries)
             clone_count = sum(clone_result["count"].values())
+            ANNOTATION_VERSION.bump()
             flash(f"Successfully cloned {clone_count} annotations.", "success")
 
         return redirect(request.referrer)
@@ -79,6 +79,50 @@ APPLICATION_CONFIG = {
     #     "token_classification": True
     # },
 
+    # Number of verses fetched per request by the corpus viewer
+    # (the first window is shown immediately and the rest are loaded in the
+    # background; 0 fetches the entire chapter at once)
+    "chapter_window_size": 50,
+    # Fetch chapter data in the compact (dictionary-encoded) format
+    "chapter_compact_format": True,
+    # Maximum number of task submissions accepted in a single batch
+    # (`/api/batch`)
+    "batch_size": 100,
+    # Include the time taken by every stage of a submission
+    # (in milliseconds) as `timings` in the response of `/api`, `/api/batch`
+    "debug_timing": False,
+    # Number of times a submission is retried when it fails due to lock
+    # contention (e.g. SQLite "database is locked"), and the delay before
+    # the first retry (in seconds, doubles after every retry)
+    "submit_retries": 3,
+    "submit_retry_delay": 0.05,
+
+    # In-process Cache Settings (per worker)
+    "cache": {
+        # maximum number of chapter payloads to keep (0 disables the cache)
+        "chapter_size": 64,
+        # maximum number of memoized heuristic results (word order, graph)
+        "heuristic_size": 4096,
+    },
+
+    # Heuristic Settings
+    "heuristic": {
+        # token graph rules (see `utils.heuristic.DEFAULT_TOKEN_GRAPH_RULES`)
+        # None uses the default rules
+        "token_graph_rules": None,
+        # word order priority table
+        # (see `utils.heuristic.DEFAULT_WORD_ORDER_PRIORITY`)
+        # None uses the default table
+        "word_order_priority": None,
+        # heuristics computed while serving a request are skipped for
+        # sentences longer than `max_tokens`, and for the remaining
+        # sentences once `time_budget` (seconds) has been spent
+        # (precomputed suggestions are not affected)
+        # None disables the limit
+        "max_tokens": 200,
+        "time_budget": 2.0,
+    },
+
     # CoNLL-U Corpus Settings
     "conllu": {
         "input_scheme": "iast",
@@ -25,6 +25,15 @@ $(document).ready(function () {
     });
 });
 
+// Load Chapter Windows
+$corpus_table.on('load-success.bs.table', function (e, data) {
+    load_remaining_verses(chapter_load_generation);
+});
+
+$corpus_table.on('collapse-row.bs.table', function (e, index, row) {
+    append_pending_verses();
+});
+
 // Expand Row on Select
 $corpus_table.on('check.bs.table', function (e, row, $element) {
     $corpus_table.bootstrapTable('collapseAllRows');
@@ -53,7 +62,9 @@ $corpus_table.on('expand-row.bs.table', function (e, index, row, $detail) {
     const $active_tab = $('.task-tab[aria-selected="true"]');
     const active_task_category = $active_tab.data('task-category');
     const active_task_id = $active_tab.data('task-id');
-    setup_task(active_task_category, active_task_id, verse_id);
+    ensure_task_section(active_task_category, function () {
+        setup_task(active_task_category, active_task_id, verse_id);
+    });
 });
 
 
@@ -73,7 +84,9 @@ $('.task-tab[data-toggle="pill"]').on('shown.bs.tab', function (event) {
     const task_category = $active_tab.data("task-category");
     const task_id = $active_tab.data("task-id");
     $load_context_buttons.removeData("context-window");
-    setup_task(task_category, task_id, verse_id);
+    ensure_task_section(task_category, function () {
+        setup_task(task_category, task_id, verse_id);
+    });
 });
 
 $load_context_buttons.click(function () {
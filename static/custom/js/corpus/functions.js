@@ -1,6 +1,77 @@
+// Chapter Window
+// The first window of verses is loaded by the table itself,
+// the remaining windows are fetched in the background and appended
+// whenever no row is expanded (appending re-renders the table body)
+var chapter_next_cursor = null;
+var chapter_load_generation = 0;
+var chapter_pending_rows = [];
+
+// Task Sections
+// Only the sections of the task categories in `chapter_loaded_tasks` are
+// fetched along with the chapter, the others are fetched on tab change
+var chapter_loaded_tasks = [];
+
 function response_handler(response) {
     $('#corpus-title').html(response.title);
-    return response.data;
+    chapter_next_cursor = (response.next === undefined) ? null : response.next;
+    chapter_pending_rows = [];
+    chapter_load_generation += 1;
+    return chapter_response_data(response);
+}
+
+function query_params_handler(params) {
+    if (CHAPTER_WINDOW_SIZE > 0) {
+        params.limit = CHAPTER_WINDOW_SIZE;
+    }
+    if (!chapter_loaded_tasks.length) {
+        const active_task_category = $('.task-tab[aria-selected="true"]').data('task-category');
+        if (active_task_category) {
+            chapter_loaded_tasks.push(active_task_category);
+        }
+    }
+    if (chapter_loaded_tasks.length) {
+        params.tasks = chapter_loaded_tasks.join(",");
+    }
+    if (CHAPTER_COMPACT_FORMAT) {
+        params.format = "compact";
+    }
+    return params;
+}
+
+function load_remaining_verses(generation) {
+    if (chapter_next_cursor === null || generation != chapter_load_generation) {
+        return;
+    }
+    $.get(CHAPTER_DATA_URL, {
+        after: chapter_next_cursor,
+        limit: CHAPTER_WINDOW_SIZE,
+        tasks: chapter_loaded_tasks.join(","),
+        format: CHAPTER_COMPACT_FORMAT ? "compact" : "json"
+    }, function (response) {
+        if (generation != chapter_load_generation) {
+            return;
+        }
+        chapter_next_cursor = response.next;
+        chapter_pending_rows.push(...chapter_response_data(response));
+        // windows requested before a tab change lack its section
+        for (const task_category of chapter_loaded_tasks) {
+            ensure_task_section(task_category, function () {});
+        }
+        append_pending_verses();
+        load_remaining_verses(generation);
+    }, 'json');
+}
+
+function append_pending_verses() {
+    if (!chapter_pending_rows.length) {
+        return;
+    }
+    if ($corpus_table.find('tr.detail-view').length) {
+        return;
+    }
+    const rows = chapter_pending_rows;
+    chapter_pending_rows = [];
+    $corpus_table.bootstrapTable('append', rows);
 }
 
 function generic_row_detail_formatter(index, row) {
@@ -76,3 +147,166 @@ function column_text_formatter(value, row, index, field) {
 function row_attribute_handler(row, index) {
     return {}
 }
+
+function ensure_task_section(task_category, _callback) {
+    const is_missing = function (row) {
+        return row.sections && !row.sections.includes(task_category);
+    };
+    const get_rows = function () {
+        return $corpus_table.bootstrapTable('getData', {unfiltered: true}).concat(chapter_pending_rows);
+    };
+    const missing_verse_ids = get_rows().filter(is_missing).map(row => row.verse_id);
+    if (!missing_verse_ids.length) {
+        _callback();
+        return;
+    }
+    // NOTE: only the window of the loaded rows that lack the section is
+    // fetched (verses are ordered by their IDs, and the windows that are
+    // yet to be loaded will include the section)
+    const first_verse_id = Math.min(...missing_verse_ids);
+    const last_verse_id = Math.max(...missing_verse_ids);
+    const window_size = get_rows().filter(
+        row => row.verse_id >= first_verse_id && row.verse_id <= last_verse_id
+    ).length;
+    if (!chapter_loaded_tasks.includes(task_category)) {
+        chapter_loaded_tasks.push(task_category);
+    }
+    $.get(CHAPTER_DATA_URL, {
+        after: first_verse_id - 1,
+        limit: window_size,
+        tasks: task_category,
+        format: CHAPTER_COMPACT_FORMAT ? "compact" : "json"
+    }, function (response) {
+        const verses = {};
+        for (const verse of chapter_response_data(response)) {
+            verses[verse.verse_id] = verse;
+        }
+        // rows are updated in place, since the section is not displayed
+        // in the table itself
+        for (const row of get_rows().filter(is_missing)) {
+            const verse = verses[row.verse_id];
+            if (!verse) {
+                continue;
+            }
+            row[task_category] = verse[task_category];
+            row.heuristics[task_category] = verse.heuristics[task_category];
+            if (verse.heuristics_degraded[task_category] !== undefined) {
+                row.heuristics_degraded[task_category] = verse.heuristics_degraded[task_category];
+            }
+            row.sections.push(task_category);
+        }
+        _callback();
+    }, 'json');
+}
+
+// Compact Format
+// Decoder for the compact format produced by `utils/compact.py`
+
+function decode_compact_verse_data(compact) {
+    const columns = compact.tokens;
+    const tokens = {};
+    for (const [index, token_id] of columns.id.entries()) {
+        const analysis = compact.analyses[columns.analysis[index]];
+        const analysis_with_feats = (analysis !== null && typeof analysis === "object" && Number.isInteger(analysis.feats))
+            ? Object.assign({}, analysis, {feats: compact.feature_bundles[analysis.feats]})
+            : analysis;
+        tokens[token_id] = {
+            id: token_id,
+            inner_id: columns.inner_id[index],
+            line_id: columns.line_id[index],
+            order: columns.order[index],
+            text: columns.text[index],
+            lemma: columns.lemma[index],
+            analysis: analysis_with_feats,
+            display: decode_compact_display(compact, columns.display[index], analysis_with_feats),
+            annotator_id: columns.annotator_id[index]
+        };
+    }
+
+    const verses = [];
+    for (const compact_verse of compact.verses) {
+        const verse_id = compact_verse.verse_id;
+        const verse = Object.assign({}, compact_verse);
+
+        verse.tokens = compact_verse.tokens.map(line_token_ids => line_token_ids.map(function (token_id) {
+            const token = tokens[token_id];
+            return {
+                id: token.id,
+                inner_id: token.inner_id,
+                verse_id: verse_id,
+                line_id: token.line_id,
+                order: token.order,
+                text: token.text,
+                lemma: token.lemma,
+                analysis: token.analysis,
+                annotator_id: token.annotator_id
+            };
+        }));
+        verse.display = compact_verse.tokens.map(line_token_ids => line_token_ids
+            .map(token_id => tokens[token_id])
+            .filter(token => !token.annotator_id)
+            .map(token => token.display)
+        );
+
+        verse.sentences = {};
+        for (const [boundary_id, token_ids] of Object.entries(compact_verse.sentences)) {
+            const sentence = {};
+            for (const token_id of token_ids) {
+                const token = tokens[token_id];
+                if (boundary_id == "extra") {
+                    sentence[token_id] = {
+                        id: token.id,
+                        inner_id: token.inner_id,
+                        line_id: token.line_id,
+                        verse_id: verse_id,
+                        text: token.text,
+                        lemma: token.lemma,
+                        analysis: token.analysis,
+                        annotator_id: token.annotator_id
+                    };
+                } else {
+                    sentence[token_id] = {
+                        id: token.id,
+                        inner_id: token.inner_id,
+                        sentence_id: parseInt(boundary_id),
+                        boundary_id: parseInt(boundary_id),
+                        order: token.order,
+                        text: token.text,
+                        lemma: token.lemma,
+                        analysis: token.analysis,
+                        annotator_id: token.annotator_id
+                    };
+                }
+            }
+            verse.sentences[boundary_id] = sentence;
+        }
+        verses.push(verse);
+    }
+    return verses;
+}
+
+function decode_compact_display(compact, display_ref, analysis) {
+    // NOTE: -1 denotes display derived from the analysis (`derive_display()`)
+    if (display_ref === null) {
+        return null;
+    }
+    if (display_ref != -1) {
+        return compact.displays[display_ref];
+    }
+    const join = (bundle) => Object.entries(bundle).map(([k, v]) => `${k}=${v}`).join("<br>");
+    return {
+        Word: analysis.form,
+        Lemma: analysis.lemma,
+        UPOS: analysis.upos,
+        XPOS: analysis.xpos,
+        Features: join(analysis.feats),
+        Misc: join(analysis.misc)
+    };
+}
+
+function chapter_response_data(response) {
+    if (response.format == "compact") {
+        return decode_compact_verse_data(response.data);
+    }
+    return response.data;
+}
@@ -167,6 +167,72 @@ function refresh_row_data(unique_id, _callback, _callback_options) {
     console.log(`Verse data updated for ID: ${unique_id}`);
 }
 
+function refresh_row_delta(unique_id) {
+    console.log(`Called ${arguments.callee.name}(${Object.values(arguments).join(", ")});`);
+    const row = $corpus_table.bootstrapTable('getRowByUniqueId', unique_id);
+    if (!row || !row.version) {
+        refresh_row_data(unique_id);
+        return;
+    }
+    const verse_delta_url = SAMPLE_VERSE_DELTA_URL.replace('0', unique_id);
+    $.get(verse_delta_url, {since: row.version}, function (delta) {
+        merge_row_delta(unique_id, delta);
+    }, 'json');
+}
+
+function merge_row_delta(unique_id, delta) {
+    const row = $corpus_table.bootstrapTable('getRowByUniqueId', unique_id);
+    var updated_row;
+    if (delta.full || !row) {
+        updated_row = delta.data;
+    } else {
+        updated_row = Object.assign({}, row, delta.data, {
+            heuristics: Object.assign({}, row.heuristics, delta.data.heuristics),
+            heuristics_degraded: Object.assign({}, row.heuristics_degraded, delta.data.heuristics_degraded),
+            version: delta.version
+        });
+    }
+    $corpus_table.bootstrapTable('updateByUniqueId', {
+        id: unique_id,
+        row: updated_row,
+        replace: true
+    });
+    $corpus_table.bootstrapTable('collapseRowByUniqueId', unique_id);
+    $corpus_table.bootstrapTable('check', storage.getItem(KEY_CURRENT_INDEX));
+    console.log(`Verse data updated for ID: ${unique_id} (${delta.tasks.join(", ")})`);
+}
+
+// Optimistic Concurrency
+// NOTE: submits carry the revision of the annotations of the verse that the
+// client has seen, a submit based on an older revision (e.g. from another
+// tab) is rejected with 409, along with the changes made since `version`
+
+function get_verse_revision(verse_id) {
+    const row = $corpus_table.bootstrapTable('getRowByUniqueId', verse_id);
+    if (!row || !row.revisions) {
+        return "";
+    }
+    return row.revisions[CURRENT_USER_ID] || 0;
+}
+
+function get_verse_version(verse_id) {
+    const row = $corpus_table.bootstrapTable('getRowByUniqueId', verse_id);
+    return (row && row.version) || "";
+}
+
+function handle_submit_conflict(jqxhr) {
+    if (jqxhr.status != 409 || !jqxhr.responseJSON) {
+        return;
+    }
+    const response = jqxhr.responseJSON;
+    $.notify({
+        message: response.message
+    }, {
+        type: response.style
+    });
+    merge_row_delta(response.verse_id, response.delta);
+}
+
 function draw_graph_displacy(data) {
     const displacy = new displaCy('', {
         container: graph_displacy_container_selector,
@@ -477,6 +543,8 @@ function submit_task_sentence_boundary(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         boundaries: line_break_tokens.join(","),
     },
     function (response) {
@@ -489,7 +557,7 @@ function submit_task_sentence_boundary(task_id) {
         if (response.success) {
             $task_1_input.prop('disabled', true).removeClass('text-info').addClass('text-muted');
 
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -498,7 +566,7 @@ function submit_task_sentence_boundary(task_id) {
             }
         }
     },
-    'json');
+    'json').fail(handle_submit_conflict);
 };
 
 /* ********************** END Task: Sentence Boundary ********************** */
@@ -1239,6 +1307,8 @@ function submit_task_word_order(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         word_order: JSON.stringify(word_order_data)
     },
     function (response) {
@@ -1255,7 +1325,7 @@ function submit_task_word_order(task_id) {
                 storage.removeItem(`${PREFIX_KEY_BOUNDARY_STATE}_${boundary_element_id}`);
                 console.log(`Removed stored token order for ${boundary_element_id} after a successful submit.`);
             }
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -1263,7 +1333,7 @@ function submit_task_word_order(task_id) {
                 $corpus_table.bootstrapTable('check', storage.getItem(KEY_NEXT_INDEX));
             }
         }
-    });
+    }).fail(handle_submit_conflict);
 };
 
 /* ************************* END Task: Token Order ************************* */
@@ -1445,6 +1515,8 @@ function submit_task_token_classification(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         token_classification_data: JSON.stringify(token_classification_data)
     },
     function (response) {
@@ -1455,7 +1527,7 @@ function submit_task_token_classification(task_id) {
         });
 
         if (response.success) {
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -1463,7 +1535,7 @@ function submit_task_token_classification(task_id) {
                 $corpus_table.bootstrapTable('check', storage.getItem(KEY_NEXT_INDEX));
             }
         }
-    });
+    }).fail(handle_submit_conflict);
 };
 
 /* ******************** END Task: Token Classification ******************** */
@@ -1952,6 +2024,8 @@ function submit_task_token_graph(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         token_graph_data: JSON.stringify(token_graph_data)
     },
     function (response) {
@@ -1962,7 +2036,7 @@ function submit_task_token_graph(task_id) {
         });
 
         if (response.success) {
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -1970,7 +2044,7 @@ function submit_task_token_graph(task_id) {
                 $corpus_table.bootstrapTable('check', storage.getItem(KEY_NEXT_INDEX));
             }
         }
-    });
+    }).fail(handle_submit_conflict);
 };
 
 /* ************************* END Task: Token Graph ************************* */
@@ -2211,6 +2285,8 @@ function submit_task_token_connection(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         context_data: JSON.stringify(context_data),
         token_connection_data: JSON.stringify(token_connection_data)
     },
@@ -2221,7 +2297,7 @@ function submit_task_token_connection(task_id) {
             type: response.style
         });
         if (response.success) {
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -2229,7 +2305,7 @@ function submit_task_token_connection(task_id) {
                 $corpus_table.bootstrapTable('check', storage.getItem(KEY_NEXT_INDEX));
             }
         }
-    });
+    }).fail(handle_submit_conflict);
 };
 
 /* ********************** END Task: Token Connection ********************** */
@@ -2340,6 +2416,8 @@ function submit_task_sentence_classification(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         sentence_classification_data: JSON.stringify(sentence_classification_data)
     },
     function (response) {
@@ -2351,7 +2429,7 @@ function submit_task_sentence_classification(task_id) {
 
         if (response.success) {
             // ....
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -2359,7 +2437,7 @@ function submit_task_sentence_classification(task_id) {
                 $corpus_table.bootstrapTable('check', storage.getItem(KEY_NEXT_INDEX));
             }
         }
-    });
+    }).fail(handle_submit_conflict);
 };
 
 /* ******************* END Task: Sentence Classification ******************* */
@@ -2795,6 +2873,8 @@ function submit_task_sentence_graph(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         context_data: JSON.stringify(context_data),
         sentence_graph_data: JSON.stringify(sentence_graph_data)
     },
@@ -2806,7 +2886,7 @@ function submit_task_sentence_graph(task_id) {
         });
 
         if (response.success) {
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -2815,7 +2895,7 @@ function submit_task_sentence_graph(task_id) {
             }
         }
     },
-    'json');
+    'json').fail(handle_submit_conflict);
 };
 
 /* *********************** END Task: Sentence Graph *********************** */
@@ -2997,6 +3077,8 @@ function submit_task_token_text_annotation(task_id) {
         action: TASK_UPDATE_ACTIONS[task_category],
         task_id: task_id,
         verse_id: verse_id,
+        revision: get_verse_revision(verse_id),
+        since: get_verse_version(verse_id),
         text_annotation_data: JSON.stringify(token_text_annotation_data)
     },
     function (response) {
@@ -3007,7 +3089,7 @@ function submit_task_token_text_annotation(task_id) {
         });
 
         if (response.success) {
-            refresh_row_data(verse_id);
+            refresh_row_delta(verse_id);
             const first_task = response.first_task;
             const next_task = response.next_task;
             $tabs[next_task].click();
@@ -3015,7 +3097,7 @@ function submit_task_token_text_annotation(task_id) {
                 $corpus_table.bootstrapTable('check', storage.getItem(KEY_NEXT_INDEX));
             }
         }
-    });
+    }).fail(handle_submit_conflict);
 };
 
 /* ******************** END Task: Token Text Annotation ******************** */
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Fixtures
+
+An in-memory SQLite database with the sample chapter
+(`data/corpus/sample`) and annotations of every task category by a single
+annotator for the first few verses.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import os
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from models_sqla import db, User, Task, Corpus, Verse, Line, Token
+from models_sqla import (
+    Boundary,
+    WordOrder,
+    TokenTextAnnotation,
+    TokenClassification,
+    TokenGraph,
+    TokenConnection,
+    SentenceClassification,
+    SentenceGraph,
+    TokenLabel,
+    TokenRelationLabel,
+    SentenceLabel,
+    SentenceRelationLabel,
+)
+from constants import (
+    AUTO_ANNOTATION_USER_ID,
+    TASK_CATEGORY_LIST,
+    TASK_DEFAULT_INFORMATION,
+    TASK_SENTENCE_BOUNDARY,
+    TASK_WORD_ORDER,
+    TASK_TOKEN_TEXT_ANNOTATION,
+    TASK_TOKEN_CLASSIFICATION,
+    TASK_TOKEN_GRAPH,
+    TASK_TOKEN_CONNECTION,
+    TASK_SENTENCE_CLASSIFICATION,
+    TASK_SENTENCE_GRAPH,
+)
+from utils.conllu import CoNLLUParser
+from utils.database import add_chapter
+from utils.registry import TASK_REGISTRY
+
+###############################################################################
+
+SAMPLE_CHAPTER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data", "corpus", "sample", "sample_ay_18-1182.conllu"
+)
+ANNOTATOR_ID = 1
+# number of (leading) verses annotated by the annotator
+ANNOTATED_VERSE_COUNT = 12
+
+###############################################################################
+
+
+def read_sample_chapter() -> list:
+    """Chapter data of the sample chapter, in verses of two lines each"""
+    with open(SAMPLE_CHAPTER, encoding="utf-8") as f:
+        lines = [
+            line
+            for verse in CoNLLUParser().read_conllu_data(f.read())
+            for line in verse
+        ]
+    return [lines[idx:idx + 2] for idx in range(0, len(lines), 2)]
+
+
+def populate_database():
+    """Add users, tasks, labels, the sample chapter and annotations"""
+    for user_id, username in [
+        (AUTO_ANNOTATION_USER_ID, "auto"),
+        (ANNOTATOR_ID, "annotator"),
+    ]:
+        db.session.add(User(
+            id=user_id,
+            username=username,
+            email=f"{username}@localhost",
+            password="",
+            fs_uniquifier=username,
+        ))
+
+    task_ids = {}
+    for order, category in enumerate(TASK_CATEGORY_LIST, start=1):
+        information = TASK_DEFAULT_INFORMATION[category]
+        db.session.add(Task(
+            id=order,
+            category=category,
+            title=information["title"],
+            short=information["short"],
+            help=information["help"],
+            order=order,
+        ))
+        task_ids[category] = order
+
+    for label in ["KARTA", "KARMA", "SAMPRADANA", "APADANA"]:
+        db.session.add(TokenRelationLabel(
+            task_id=task_ids[TASK_TOKEN_GRAPH], label=label
+        ))
+    db.session.add(TokenLabel(
+        task_id=task_ids[TASK_TOKEN_CLASSIFICATION], label="PER"
+    ))
+    db.session.add(SentenceLabel(
+        task_id=task_ids[TASK_SENTENCE_CLASSIFICATION], label="Q"
+    ))
+    db.session.add(SentenceRelationLabel(
+        task_id=task_ids[TASK_SENTENCE_GRAPH], label="CAUSE"
+    ))
+    corpus = Corpus(name="Sample", description="Sample Corpus")
+    db.session.add(corpus)
+    db.session.commit()
+    TASK_REGISTRY.invalidate()
+
+    # ----------------------------------------------------------------------- #
+    # chapter
+
+    add_chapter(
+        corpus.id, "Sample Chapter", "Sample Chapter", read_sample_chapter()
+    )
+
+    # ----------------------------------------------------------------------- #
+    # annotations
+
+    verse_ids = [
+        verse_id
+        for verse_id, in db.session.query(Verse.id).order_by(Verse.id).all()
+    ][:ANNOTATED_VERSE_COUNT]
+    token_label = TokenLabel.query.first()
+    token_relation_label = TokenRelationLabel.query.first()
+    sentence_label = SentenceLabel.query.first()
+    sentence_relation_label = SentenceRelationLabel.query.first()
+
+    def annotation(category, **kwargs):
+        return {
+            "task_id": task_ids[category],
+            "annotator_id": ANNOTATOR_ID,
+            **kwargs
+        }
+
+    previous_boundary = None
+    for verse_index, verse_id in enumerate(verse_ids):
+        token_ids = [
+            token_id
+            for token_id, in db.session.query(Token.id).join(Line).filter(
+                Line.verse_id == verse_id
+            ).order_by(Token.id).all()
+        ]
+        # every other verse has two sentences
+        sentences = [token_ids]
+        if verse_index % 2 == 0 and len(token_ids) > 3:
+            middle = len(token_ids) // 2
+            sentences = [token_ids[:middle], token_ids[middle:]]
+
+        for sentence_index, sentence in enumerate(sentences):
+            boundary = Boundary(**annotation(
+                TASK_SENTENCE_BOUNDARY,
+                verse_id=verse_id,
+                token_id=sentence[-1],
+            ))
+            db.session.add(boundary)
+            db.session.flush()
+
+            # annotated word order for some of the sentences
+            if sentence_index == 0 and verse_index % 3 != 2:
+                db.session.add_all([
+                    WordOrder(**annotation(
+                        TASK_WORD_ORDER,
+                        boundary_id=boundary.id,
+                        token_id=token_id,
+                        order=order,
+                    ))
+                    for order, token_id in enumerate(
+                        reversed(sentence), start=1
+                    )
+                ])
+            db.session.add(TokenTextAnnotation(**annotation(
+                TASK_TOKEN_TEXT_ANNOTATION,
+                boundary_id=boundary.id,
+                token_id=sentence[0],
+                text="text",
+            )))
+            db.session.add(TokenClassification(**annotation(
+                TASK_TOKEN_CLASSIFICATION,
+                boundary_id=boundary.id,
+                token_id=sentence[0],
+                label_id=token_label.id,
+            )))
+            if len(sentence) > 1:
+                db.session.add(TokenGraph(**annotation(
+                    TASK_TOKEN_GRAPH,
+                    boundary_id=boundary.id,
+                    src_id=sentence[0],
+                    label_id=token_relation_label.id,
+                    dst_id=sentence[1],
+                )))
+            db.session.add(SentenceClassification(**annotation(
+                TASK_SENTENCE_CLASSIFICATION,
+                boundary_id=boundary.id,
+                label_id=sentence_label.id,
+            )))
+            if previous_boundary is not None:
+                db.session.add(TokenConnection(**annotation(
+                    TASK_TOKEN_CONNECTION,
+                    boundary_id=boundary.id,
+                    src_id=previous_boundary.token_id,
+                    dst_id=sentence[0],
+                )))
+                db.session.add(SentenceGraph(**annotation(
+                    TASK_SENTENCE_GRAPH,
+                    src_boundary_id=boundary.id,
+                    src_token_id=sentence[0],
+                    dst_boundary_id=previous_boundary.id,
+                    dst_token_id=previous_boundary.token_id,
+                    label_id=sentence_relation_label.id,
+                    relation_type=1,
+                )))
+            previous_boundary = boundary
+    db.session.commit()
+
+
+###############################################################################
+
+
+@contextmanager
+def count_queries():
+    """Count the statements executed within the block
+
+    Transaction control statements (i.e. the `BEGIN` emitted for SQLite)
+    are not counted.
+    """
+    statements = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if statement.strip().upper() not in ("BEGIN", "COMMIT", "ROLLBACK"):
+            statements.append(statement)
+
+    engine = db.engine
+    # NOTE: start with an empty identity map, so that objects loaded by an
+    # earlier call do not save queries of the measured call
+    db.session.expunge_all()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+###############################################################################
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Application (with an active context) with a populated database"""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        populate_database()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(scope="session")
+def chapter_verse_ids(app):
+    """IDs of the verses of the sample chapter (in order)"""
+    return [
+        verse_id
+        for verse_id, in db.session.query(Verse.id).order_by(Verse.id).all()
+    ]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Batch Submissions
+
+A batch is applied in a single transaction, so a rolled back batch
+(e.g. due to lock contention) leaves no trace, and is applied as a whole on
+a retry.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import json
+import sqlite3
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+import utils.submit
+from models_sqla import db, Task, Boundary, TokenLabel, TokenClassification
+from models_sqla import SubmitLog
+from constants import TASK_TOKEN_CLASSIFICATION
+from utils.database import get_verse_revision
+from utils.submit import InvalidSubmission, apply_submission, retry_on_lock
+
+from conftest import ANNOTATOR_ID
+
+###############################################################################
+
+
+def submit_batch(items: list, annotator_id: int) -> list:
+    """Apply a batch of submissions, each in its own savepoint
+
+    Mirrors `submit_batch()` of `api_batch()` (server_sqla.py)
+
+    Returns
+    -------
+    list
+        Whether each of the submissions was applied
+    """
+    results = []
+    submits = []
+    for item in items:
+        savepoint = db.session.begin_nested()
+        try:
+            submission = apply_submission(item["action"], item, annotator_id)
+            savepoint.commit()
+        except InvalidSubmission:
+            savepoint.rollback()
+            results.append(False)
+            continue
+        submits.append({
+            "verse_id": submission["verse_id"],
+            "annotator_id": annotator_id,
+            "task_id": submission["task_id"],
+        })
+        results.append(True)
+
+    utils.submit.record_submits(submits)
+    db.session.commit()
+    return results
+
+
+def get_first_boundary(verse_id: int) -> Boundary:
+    return Boundary.query.filter(
+        Boundary.verse_id == verse_id,
+        Boundary.annotator_id == ANNOTATOR_ID
+    ).order_by(Boundary.token_id).first()
+
+
+def get_submission(verse_id: int) -> dict:
+    """Token classification of the last token of the first sentence"""
+    boundary = get_first_boundary(verse_id)
+    return {
+        "action": "update_token_classification",
+        "task_id": Task.query.filter(
+            Task.category == TASK_TOKEN_CLASSIFICATION
+        ).one().id,
+        "verse_id": verse_id,
+        "revision": get_verse_revision(verse_id, ANNOTATOR_ID),
+        "token_classification_data": json.dumps({
+            f"token-class-selector-{boundary.id}-{boundary.token_id}": {
+                "boundary_id": boundary.id,
+                "label_id": TokenLabel.query.first().id
+            }
+        })
+    }
+
+
+def get_submit_count(verse_id: int) -> int:
+    return db.session.query(func.count(SubmitLog.id)).filter(
+        SubmitLog.verse_id == verse_id,
+        SubmitLog.annotator_id == ANNOTATOR_ID
+    ).scalar()
+
+
+def get_classified_tokens(verse_id: int) -> list:
+    return [
+        token_id
+        for token_id, in db.session.query(TokenClassification.token_id).join(
+            Boundary, TokenClassification.boundary_id == Boundary.id
+        ).filter(
+            Boundary.verse_id == verse_id,
+            TokenClassification.annotator_id == ANNOTATOR_ID,
+            TokenClassification.is_deleted == False  # noqa
+        )
+    ]
+
+###############################################################################
+
+
+def test_batch_is_a_single_transaction(chapter_verse_ids, monkeypatch):
+    verse_ids = chapter_verse_ids[1:4]
+    items = [get_submission(verse_id) for verse_id in verse_ids]
+    items[1]["token_classification_data"] = "{"
+
+    revisions = [
+        get_verse_revision(verse_id, ANNOTATOR_ID) for verse_id in verse_ids
+    ]
+    submit_counts = [get_submit_count(verse_id) for verse_id in verse_ids]
+    classified_tokens = [
+        get_classified_tokens(verse_id) for verse_id in verse_ids
+    ]
+
+    # lock contention after the submissions have been applied
+    record_submits = utils.submit.record_submits
+    attempts = []
+
+    def locked_record_submits(submits):
+        attempts.append(submits)
+        if len(attempts) == 1:
+            raise OperationalError(
+                "INSERT INTO submit_log", {},
+                sqlite3.OperationalError("database is locked")
+            )
+        return record_submits(submits)
+
+    monkeypatch.setattr(utils.submit, "record_submits", locked_record_submits)
+
+    results = retry_on_lock(
+        lambda: submit_batch(items, ANNOTATOR_ID), retries=1, delay=0
+    )
+    assert len(attempts) == 2
+    assert results == [True, False, True]
+
+    # the valid submissions are applied once, the invalid one is not applied
+    for idx, verse_id in enumerate(verse_ids):
+        applied = results[idx]
+        assert get_verse_revision(verse_id, ANNOTATOR_ID) == (
+            revisions[idx] + applied
+        )
+        assert get_submit_count(verse_id) == submit_counts[idx] + applied
+        if applied:
+            assert get_classified_tokens(verse_id) == [
+                get_first_boundary(verse_id).token_id
+            ]
+        else:
+            assert get_classified_tokens(verse_id) == classified_tokens[idx]
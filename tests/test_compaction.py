@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Submit Log Compaction
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import gzip
+import json
+import datetime as dt
+
+import pytest
+
+from models_sqla import db, SubmitLog
+from constants import AUTO_ANNOTATION_USER_ID
+from utils.database import compact_submit_logs
+
+###############################################################################
+
+BEFORE = dt.datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def submit_logs(chapter_verse_ids):
+    """Submit logs of three (verse, task) groups, by the auto-annotator
+
+    Returns
+    -------
+    dict
+        (verse_id, task_id): list of rows (as dictionaries), in the order of ID
+    """
+    def day(days: int) -> dt.datetime:
+        return BEFORE - dt.timedelta(days=days)
+
+    # (verse_id, task_id): [(submit_count, first_submit_at, updated_at)]
+    groups = {
+        # compacted earlier, and submitted since
+        (chapter_verse_ids[-1], 1): [
+            (1, day(50), day(50)),
+            (3, day(90), day(40)),
+            (1, day(30), day(30)),
+            (1, day(20), day(20)),
+            (1, None, day(10)),
+        ],
+        # single submit
+        (chapter_verse_ids[-1], 2): [
+            (1, day(25), day(25)),
+        ],
+        # the latest submit is within the retention period
+        (chapter_verse_ids[-2], 1): [
+            (1, day(15), day(15)),
+            (1, day(5), day(5)),
+            (1, day(-5), day(-5)),
+        ],
+    }
+    rows = {}
+    for (verse_id, task_id), group_logs in groups.items():
+        submit_logs = [
+            SubmitLog(
+                verse_id=verse_id,
+                annotator_id=AUTO_ANNOTATION_USER_ID,
+                task_id=task_id,
+                submit_count=submit_count,
+                first_submit_at=first_submit_at,
+                updated_at=updated_at,
+            )
+            for submit_count, first_submit_at, updated_at in group_logs
+        ]
+        db.session.add_all(submit_logs)
+        db.session.flush()
+        rows[(verse_id, task_id)] = [
+            {
+                "id": submit_log.id,
+                "submit_count": submit_log.submit_count,
+                "first_submit_at": submit_log.first_submit_at,
+                "updated_at": submit_log.updated_at,
+            }
+            for submit_log in submit_logs
+        ]
+    db.session.commit()
+
+    yield rows
+
+    SubmitLog.query.filter(
+        SubmitLog.annotator_id == AUTO_ANNOTATION_USER_ID
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def get_submit_logs(verse_id: int, task_id: int) -> list:
+    return SubmitLog.query.filter(
+        SubmitLog.annotator_id == AUTO_ANNOTATION_USER_ID,
+        SubmitLog.verse_id == verse_id,
+        SubmitLog.task_id == task_id
+    ).order_by(SubmitLog.id).all()
+
+###############################################################################
+
+
+@pytest.mark.parametrize("chunk_size", [2, 3, 1000])
+def test_compact_submit_logs(submit_logs, tmp_path, chunk_size):
+    archive_path = tmp_path / "submit_log.jsonl.gz"
+    result = compact_submit_logs(BEFORE, str(archive_path), chunk_size)
+
+    (compacted_key, compacted_rows), (single_key, single_rows), \
+        (recent_key, recent_rows) = submit_logs.items()
+
+    # every submit before the cutoff is collapsed into the latest one
+    kept, = get_submit_logs(*compacted_key)
+    assert kept.id == compacted_rows[-1]["id"]
+    assert kept.submit_count == 7
+    assert kept.first_submit_at == compacted_rows[1]["first_submit_at"]
+    assert kept.updated_at == compacted_rows[-1]["updated_at"]
+
+    kept, = get_submit_logs(*single_key)
+    assert kept.id == single_rows[0]["id"]
+    assert kept.submit_count == 1
+
+    kept, recent = get_submit_logs(*recent_key)
+    assert kept.id == recent_rows[1]["id"]
+    assert kept.submit_count == 2
+    assert kept.first_submit_at == recent_rows[0]["first_submit_at"]
+    assert kept.updated_at == recent_rows[1]["updated_at"]
+    assert recent.id == recent_rows[2]["id"]
+    assert recent.submit_count == 1
+
+    # the changed and deleted rows are archived once, in their original form
+    with gzip.open(archive_path, "rt", encoding="utf-8") as f:
+        archived = [json.loads(line) for line in f]
+    expected_rows = compacted_rows + recent_rows[:2]
+    assert sorted(row["id"] for row in archived) == [
+        row["id"] for row in expected_rows
+    ]
+    archived_rows = {row["id"]: row for row in archived}
+    for row in expected_rows:
+        archived_row = archived_rows[row["id"]]
+        assert archived_row["submit_count"] == row["submit_count"]
+        assert archived_row["updated_at"] == row["updated_at"].isoformat()
+        assert archived_row["first_submit_at"] == (
+            row["first_submit_at"].isoformat()
+            if row["first_submit_at"] else None
+        )
+
+    assert result == {
+        "archived": len(expected_rows),
+        "deleted": len(expected_rows) - 2,
+        "compacted": 2,
+    }
+
+    # nothing is left to compact
+    result = compact_submit_logs(BEFORE, str(archive_path), chunk_size)
+    assert result == {"archived": 0, "deleted": 0, "compacted": 0}
+
+
+def test_failed_compaction_is_not_archived(submit_logs, tmp_path, monkeypatch):
+    archive_path = tmp_path / "submit_log.jsonl.gz"
+
+    def commit():
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(db.session, "commit", commit)
+    with pytest.raises(RuntimeError):
+        compact_submit_logs(BEFORE, str(archive_path))
+    monkeypatch.undo()
+
+    assert not archive_path.exists()
+    for (verse_id, task_id), rows in submit_logs.items():
+        assert [
+            submit_log.id for submit_log in get_submit_logs(verse_id, task_id)
+        ] == [row["id"] for row in rows]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Heuristics
+
+The word order and token graph heuristics are checked against the output
+recorded from their original (uncompiled) implementations, for every line of
+the sample chapter and a few seeded random token lists
+(`data/heuristic_golden.json`).
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import os
+import json
+
+import pytest
+
+from utils.heuristic import get_word_order_heuristic, get_token_graph
+
+###############################################################################
+
+GOLDEN_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "data", "heuristic_golden.json"
+)
+BOUNDARY_ID = 7
+
+with open(GOLDEN_FILE, encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+
+###############################################################################
+
+
+def get_token_list(case: dict) -> dict:
+    return {
+        token_id: {"analysis": analysis}
+        for token_id, analysis in case["tokens"]
+    }
+
+
+@pytest.mark.parametrize(
+    "case", GOLDEN["cases"], ids=[case["name"] for case in GOLDEN["cases"]]
+)
+def test_word_order_heuristic(case):
+    assert get_word_order_heuristic(get_token_list(case)) == case["word_order"]
+
+
+@pytest.mark.parametrize(
+    "case", GOLDEN["cases"], ids=[case["name"] for case in GOLDEN["cases"]]
+)
+def test_token_graph(case):
+    relations = get_token_graph(
+        get_token_list(case), BOUNDARY_ID, GOLDEN["relation_map"]
+    )
+    assert all(
+        relation["boundary_id"] == BOUNDARY_ID for relation in relations
+    )
+    assert [
+        [relation["src_id"], relation["label_id"], relation["dst_id"]]
+        for relation in relations
+    ] == case["token_graph"]
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Chapter Ingestion
+
+The bulk ingestion of a chapter (`add_chapter()`) is checked against the
+original ingestion through the ORM, which is reproduced here.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import copy
+
+import pytest
+
+from models_sqla import db, Task, Corpus, Chapter, Verse, Line, Token
+from models_sqla import Boundary
+from constants import AUTO_ANNOTATION_USER_ID, TASK_SENTENCE_BOUNDARY
+from utils.compact import derive_display
+from utils.database import add_chapter
+
+from conftest import read_sample_chapter
+
+###############################################################################
+
+CHAPTER_NAME = "Ingested Chapter"
+
+
+def add_chapter_orm(
+    corpus_id: int,
+    chapter_name: str,
+    chapter_description: str,
+    chapter_data: list
+):
+    """Add Chapter Data, one ORM object at a time (the original ingestion)"""
+    chapter = Chapter()
+    chapter.corpus_id = corpus_id
+    chapter.name = chapter_name
+    chapter.description = chapter_description
+
+    for _verse in chapter_data:
+        verse = Verse()
+        verse.chapter = chapter
+        for _line in _verse:
+            line = Line()
+            if _line.get('id'):
+                line.id = _line.get('id')
+            line.verse = verse
+            line.text = _line.get('text', '')
+
+            is_subtoken = False
+            end_id = None
+            for _idx, _token in enumerate(_line["tokens"], start=1):
+                _token_id = _token["id"]
+                inner_id = (
+                    "".join(map(str, _token_id))
+                    if isinstance(_token_id, (list, tuple))
+                    else str(_token_id)
+                )
+                del _token["id"]
+
+                token = Token()
+                token.inner_id = inner_id
+                token.order = _idx * 10
+                token.line = line
+                token.text = _token["form"]
+                if is_subtoken:
+                    token.text = "_"
+                token.lemma = _token["lemma"]
+                token.analysis = _token
+                token.display = {
+                    "Word": _token["form"],
+                    "Lemma": _token["lemma"],
+                    "UPOS": _token["upos"],
+                    "XPOS": _token["xpos"],
+                    "Features": "<br>".join(
+                        f"{k}={v}" for k, v in _token["feats"].items()
+                    ),
+                    "Misc": "<br>".join(
+                        f"{k}={v}" for k, v in _token["misc"].items()
+                    )
+                }
+                db.session.add(token)
+
+                if str(_token_id) == str(end_id):
+                    is_subtoken = False
+                    end_id = None
+
+                if isinstance(_token_id, (list, tuple)):
+                    is_subtoken = True
+                    end_id = _token_id[-1]
+
+        boundary = Boundary()
+        boundary.task = Task.query.filter(
+            Task.category == TASK_SENTENCE_BOUNDARY
+        ).first()
+        boundary.token = token
+        boundary.verse = verse
+        boundary.annotator_id = AUTO_ANNOTATION_USER_ID
+        db.session.add(boundary)
+
+
+def get_chapter_rows(chapter_name: str) -> dict:
+    """Rows of a chapter, its verses, lines, tokens and boundaries"""
+    chapter = Chapter.query.filter(Chapter.name == chapter_name).one()
+    verse_ids = [
+        verse_id
+        for verse_id, in db.session.query(Verse.id).filter(
+            Verse.chapter_id == chapter.id
+        )
+    ]
+
+    def get_rows(model, *filters) -> list:
+        columns = [
+            column.name
+            for column in model.__table__.columns
+            if column.name != "updated_at"
+        ]
+        return [
+            dict(zip(columns, row))
+            for row in db.session.query(
+                *[getattr(model, column) for column in columns]
+            ).filter(*filters).order_by(model.id)
+        ]
+
+    return {
+        "chapter": get_rows(Chapter, Chapter.id == chapter.id),
+        "verses": get_rows(Verse, Verse.id.in_(verse_ids)),
+        "lines": get_rows(Line, Line.verse_id.in_(verse_ids)),
+        "tokens": get_rows(
+            Token, Token.line.has(Line.verse_id.in_(verse_ids))
+        ),
+        "boundaries": get_rows(Boundary, Boundary.verse_id.in_(verse_ids)),
+    }
+
+###############################################################################
+
+
+@pytest.fixture(autouse=True)
+def no_chapter(app):
+    """The chapter is not left behind by any of the tests"""
+    assert not Chapter.query.filter(Chapter.name == CHAPTER_NAME).count()
+    yield
+    assert not Chapter.query.filter(Chapter.name == CHAPTER_NAME).count()
+
+
+def test_add_chapter_matches_orm_ingestion(app, monkeypatch):
+    corpus_id = Corpus.query.first().id
+    chapter_data = read_sample_chapter()
+    # NOTE: both ingestions are rolled back, and, as the rolled back IDs are
+    # reused (SQLite), the rows of both get the same IDs
+    monkeypatch.setattr(db.session, "commit", db.session.flush)
+
+    try:
+        add_chapter_orm(
+            corpus_id, CHAPTER_NAME, CHAPTER_NAME,
+            copy.deepcopy(chapter_data)
+        )
+        db.session.flush()
+        expected = get_chapter_rows(CHAPTER_NAME)
+    finally:
+        db.session.rollback()
+
+    try:
+        result = add_chapter(
+            corpus_id, CHAPTER_NAME, CHAPTER_NAME,
+            copy.deepcopy(chapter_data)
+        )
+        assert result["style"] == "success"
+        actual = get_chapter_rows(CHAPTER_NAME)
+    finally:
+        db.session.rollback()
+
+    assert len(expected["verses"]) == len(chapter_data)
+    assert len(expected["boundaries"]) == len(chapter_data)
+    assert len(expected["tokens"]) == sum(
+        len(_line["tokens"]) for _verse in chapter_data for _line in _verse
+    )
+    for key, rows in expected.items():
+        assert actual[key] == rows, key
+
+    # displays that can be derived from the analysis match the derived ones
+    # (which the compact encoding of the verse data relies on)
+    derived_displays = [
+        (token["display"], derive_display(token["analysis"]))
+        for token in actual["tokens"]
+    ]
+    assert any(derived for _, derived in derived_displays)
+    for display, derived in derived_displays:
+        assert derived is None or display == derived
+
+
+def test_add_chapter_rolls_back_on_error(app, monkeypatch):
+    corpus_id = Corpus.query.first().id
+    chapter_data = read_sample_chapter()
+    # a token without an analysis
+    del chapter_data[-1][-1]["tokens"][-1]["upos"]
+    counts = {
+        model: model.query.count()
+        for model in [Chapter, Verse, Line, Token, Boundary]
+    }
+
+    result = add_chapter(corpus_id, CHAPTER_NAME, CHAPTER_NAME, chapter_data)
+    assert result["style"] == "danger"
+    for model, count in counts.items():
+        assert model.query.count() == count, model.__name__
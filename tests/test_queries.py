@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Query Count
+
+The number of queries run to fetch the data of a list of verses must not
+depend on the number of verses (or sentences) in the list.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import pytest
+
+from models_sqla import db, Verse
+from utils.database import get_verse_data, get_chapter_sentences
+
+from conftest import ANNOTATOR_ID, ANNOTATED_VERSE_COUNT, count_queries
+
+###############################################################################
+
+
+@pytest.fixture(scope="module")
+def annotated_verse_ids(chapter_verse_ids):
+    return chapter_verse_ids[:ANNOTATED_VERSE_COUNT]
+
+
+###############################################################################
+
+
+def test_verse_data_query_count(annotated_verse_ids):
+    with count_queries() as single_verse_queries:
+        get_verse_data(annotated_verse_ids[:1], [ANNOTATOR_ID])
+    with count_queries() as multiple_verse_queries:
+        verse_data = get_verse_data(annotated_verse_ids, [ANNOTATOR_ID])
+
+    assert len(verse_data) == len(annotated_verse_ids)
+    assert len(multiple_verse_queries) == len(single_verse_queries)
+
+
+def test_chapter_sentences_query_count(annotated_verse_ids):
+    chapter_id = db.session.query(Verse.chapter_id).filter(
+        Verse.id == annotated_verse_ids[0]
+    ).scalar()
+
+    with count_queries() as single_verse_queries:
+        get_chapter_sentences(
+            chapter_id, [ANNOTATOR_ID], annotated_verse_ids[:1]
+        )
+    with count_queries() as multiple_verse_queries:
+        sentences = get_chapter_sentences(
+            chapter_id, [ANNOTATOR_ID], annotated_verse_ids
+        )
+
+    assert len(sentences) == len(annotated_verse_ids)
+    assert len(multiple_verse_queries) == len(single_verse_queries)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Task Registry
+
+Changes made without invalidating the registry (i.e. through another worker
+process) are picked up by `TaskRegistry.validate()`.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+from models_sqla import db, Task, TokenLabel
+from utils.registry import TASK_REGISTRY
+
+###############################################################################
+
+
+def test_task_update_is_picked_up(app):
+    task_id = TASK_REGISTRY.active_ids[0]
+    title = TASK_REGISTRY.tasks[task_id]["title"]
+
+    # NOTE: tasks are saved in bulk by `perform_action()`
+    task = db.session.get(Task, task_id)
+    task.title = f"{title} (updated)"
+    db.session.bulk_save_objects([task])
+    db.session.commit()
+    try:
+        assert TASK_REGISTRY.tasks[task_id]["title"] == title
+        TASK_REGISTRY.validate()
+        assert TASK_REGISTRY.tasks[task_id]["title"] == f"{title} (updated)"
+
+        # unchanged tables do not cause a reload
+        version = TASK_REGISTRY.version
+        TASK_REGISTRY.validate()
+        assert TASK_REGISTRY.version == version
+    finally:
+        task.title = title
+        db.session.commit()
+        TASK_REGISTRY.invalidate()
+
+
+def test_label_update_is_picked_up(app):
+    label = TokenLabel.query.first()
+    assert any(
+        label_id == label.id
+        for label_id, *_ in TASK_REGISTRY.labels["token_labels"]
+    )
+
+    label.is_deleted = True
+    db.session.commit()
+    try:
+        TASK_REGISTRY.validate()
+        assert not any(
+            label_id == label.id
+            for label_id, *_ in TASK_REGISTRY.labels["token_labels"]
+        )
+    finally:
+        label.is_deleted = False
+        db.session.commit()
+        TASK_REGISTRY.invalidate()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Submissions
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import json
+
+import pytest
+
+from models_sqla import db, Task, Line, Token, Boundary, TokenLabel, WordOrder
+from models_sqla import (
+    TokenTextAnnotation,
+    TokenClassification,
+    TokenGraph,
+    SentenceClassification,
+)
+from constants import (
+    TASK_SENTENCE_BOUNDARY,
+    TASK_TOKEN_CLASSIFICATION,
+    TASK_WORD_ORDER,
+)
+from utils.database import get_verse_revision
+from utils.submit import (
+    StaleSubmission,
+    apply_submission,
+    get_boundary_changes,
+)
+
+from conftest import ANNOTATOR_ID
+
+###############################################################################
+
+
+@pytest.fixture
+def submission_form(chapter_verse_ids):
+    """Form of a token classification submission for the first verse
+
+    Changes made by the test are rolled back.
+    """
+    verse_id = chapter_verse_ids[0]
+    task_id = Task.query.filter(
+        Task.category == TASK_TOKEN_CLASSIFICATION
+    ).one().id
+    boundary = Boundary.query.filter(
+        Boundary.verse_id == verse_id,
+        Boundary.annotator_id == ANNOTATOR_ID
+    ).order_by(Boundary.token_id).first()
+    label_id = TokenLabel.query.first().id
+
+    def form(revision: int) -> dict:
+        return {
+            "task_id": task_id,
+            "verse_id": verse_id,
+            "revision": revision,
+            "token_classification_data": json.dumps({
+                f"token-class-selector-{boundary.id}-{boundary.token_id}": {
+                    "boundary_id": boundary.id,
+                    "label_id": label_id
+                }
+            })
+        }
+
+    yield form
+    db.session.rollback()
+
+
+###############################################################################
+
+
+def test_revision_claimed_only_on_changes(chapter_verse_ids, submission_form):
+    verse_id = chapter_verse_ids[0]
+    action = "update_token_classification"
+    revision = get_verse_revision(verse_id, ANNOTATOR_ID)
+
+    submission = apply_submission(
+        action, submission_form(revision), ANNOTATOR_ID
+    )
+    assert submission["changes"]
+    assert submission["revision"] == revision + 1
+
+    # resubmitting the same annotations does not change the revision
+    submission = apply_submission(
+        action, submission_form(revision + 1), ANNOTATOR_ID
+    )
+    assert not submission["changes"]
+    assert submission["revision"] == revision + 1
+    assert get_verse_revision(verse_id, ANNOTATOR_ID) == revision + 1
+
+    # a submission based on an outdated revision is rejected
+    with pytest.raises(StaleSubmission):
+        apply_submission(action, submission_form(revision), ANNOTATOR_ID)
+
+    # word order: resubmitting the same order, and clearing the order
+    task_id = Task.query.filter(Task.category == TASK_WORD_ORDER).one().id
+    boundary_id, = db.session.query(WordOrder.boundary_id).join(
+        Boundary, WordOrder.boundary_id == Boundary.id
+    ).filter(
+        Boundary.verse_id == verse_id,
+        WordOrder.annotator_id == ANNOTATOR_ID
+    ).first()
+    word_order = [
+        token_id
+        for token_id, in db.session.query(WordOrder.token_id).filter(
+            WordOrder.boundary_id == boundary_id,
+            WordOrder.annotator_id == ANNOTATOR_ID
+        ).order_by(WordOrder.order)
+    ]
+    assert word_order
+
+    def word_order_form(token_ids: list, revision: int) -> dict:
+        return {
+            "task_id": task_id,
+            "verse_id": verse_id,
+            "revision": revision,
+            "word_order": json.dumps({
+                f"boundary-{boundary_id}": [
+                    f"token-button-{token_id}" for token_id in token_ids
+                ]
+            })
+        }
+
+    revision = get_verse_revision(verse_id, ANNOTATOR_ID)
+    submission = apply_submission(
+        "update_word_order", word_order_form(word_order, revision),
+        ANNOTATOR_ID
+    )
+    assert not submission["changes"]
+    assert submission["revision"] == revision
+
+    submission = apply_submission(
+        "update_word_order", word_order_form([], revision), ANNOTATOR_ID
+    )
+    assert submission["changes"]
+    assert submission["revision"] == revision + 1
+    assert not WordOrder.query.filter(
+        WordOrder.boundary_id == boundary_id,
+        WordOrder.annotator_id == ANNOTATOR_ID
+    ).count()
+
+    with pytest.raises(StaleSubmission):
+        apply_submission(
+            "update_word_order", word_order_form(word_order, revision),
+            ANNOTATOR_ID
+        )
+
+
+###############################################################################
+# Sentence Boundaries
+
+BOUNDARY_CHANGES = {
+    # name: (existing, submitted, (stale, new, last_changed))
+    "unchanged": ([3, 6], [3, 6], ([], [], False)),
+    "insert-first": ([6, 9], [3, 6, 9], ([6], [3, 6], False)),
+    "insert-middle": ([3, 9], [3, 6, 9], ([9], [6, 9], False)),
+    "insert-last": ([3, 6], [3, 6, 9], ([], [9], True)),
+    "remove-first": ([3, 6, 9], [6, 9], ([3, 6], [6], False)),
+    "remove-middle": ([3, 6, 9], [3, 9], ([6, 9], [9], False)),
+    "remove-last": ([3, 6, 9], [3, 6], ([9], [], True)),
+    "move-middle": ([3, 6, 9], [3, 7, 9], ([6, 9], [7, 9], False)),
+    "move-last": ([3, 6], [3, 7], ([6], [7], True)),
+    "reordered": ([3, 6, 9], [9, 3, 6], ([], [], False)),
+    "duplicates": ([3, 6], [3, 6, 6, 3], ([], [], False)),
+    "empty-to-full": ([], [3, 6], ([], [3, 6], True)),
+    "full-to-empty": ([3, 6], [], ([3, 6], [], True)),
+    "empty": ([], [], ([], [], False)),
+}
+
+
+@pytest.mark.parametrize(
+    "existing, submitted, expected",
+    BOUNDARY_CHANGES.values(),
+    ids=BOUNDARY_CHANGES.keys()
+)
+def test_boundary_changes(existing, submitted, expected):
+    assert get_boundary_changes(existing, submitted) == expected
+
+
+def get_boundary_annotations(boundary_id: int) -> dict:
+    """Annotations of a boundary, by model"""
+    return {
+        model.__name__: sorted(
+            (annotation.id, annotation.is_deleted)
+            for annotation in model.query.filter(
+                model.boundary_id == boundary_id
+            ).all()
+        )
+        for model in [
+            TokenTextAnnotation,
+            TokenClassification,
+            TokenGraph,
+            SentenceClassification,
+        ]
+    }
+
+
+def get_word_order(boundary_id: int) -> list:
+    return [
+        (token_id, order)
+        for token_id, order in db.session.query(
+            WordOrder.token_id, WordOrder.order
+        ).filter(
+            WordOrder.boundary_id == boundary_id,
+            WordOrder.annotator_id == ANNOTATOR_ID
+        ).order_by(WordOrder.order)
+    ]
+
+
+def get_boundaries(verse_id: int) -> dict:
+    """Boundary ID of every boundary marker of a verse, by token ID"""
+    return {
+        boundary.token_id: boundary.id
+        for boundary in Boundary.query.filter(
+            Boundary.verse_id == verse_id,
+            Boundary.annotator_id == ANNOTATOR_ID
+        ).all()
+    }
+
+
+def test_unaffected_boundaries_keep_annotations(chapter_verse_ids):
+    # a verse with two annotated sentences, followed by an annotated verse
+    verse_id, next_verse_id = chapter_verse_ids[6:8]
+    task_id = Task.query.filter(
+        Task.category == TASK_SENTENCE_BOUNDARY
+    ).one().id
+    token_ids = [
+        token_id
+        for token_id, in db.session.query(Token.id).join(Line).filter(
+            Line.verse_id == verse_id
+        ).order_by(Token.id).all()
+    ]
+    boundaries = get_boundaries(verse_id)
+    (first_token_id, first_id), (last_token_id, last_id) = sorted(
+        boundaries.items()
+    )
+    assert last_token_id == token_ids[-1]
+    next_id = min(get_boundaries(next_verse_id).items())[1]
+
+    annotations = {
+        boundary_id: get_boundary_annotations(boundary_id)
+        for boundary_id in [first_id, last_id, next_id]
+    }
+    word_orders = {
+        boundary_id: get_word_order(boundary_id)
+        for boundary_id in [first_id, next_id]
+    }
+    assert all(word_orders.values())
+    assert all(
+        model_annotations
+        for boundary_annotations in annotations.values()
+        for model_annotations in boundary_annotations.values()
+    )
+
+    def submit(boundary_tokens: list) -> bool:
+        return apply_submission("update_sentence_boundary", {
+            "task_id": task_id,
+            "verse_id": verse_id,
+            "boundaries": ",".join(str(b) for b in boundary_tokens),
+        }, ANNOTATOR_ID)["changes"]
+
+    try:
+        # insert a boundary marker in the second sentence
+        middle_token_id = token_ids[token_ids.index(first_token_id) + 1]
+        assert submit([first_token_id, middle_token_id, last_token_id])
+
+        boundaries = get_boundaries(verse_id)
+        assert sorted(boundaries) == [
+            first_token_id, middle_token_id, last_token_id
+        ]
+        # the first sentence has not changed
+        assert boundaries[first_token_id] == first_id
+        assert get_boundary_annotations(first_id) == annotations[first_id]
+        assert get_word_order(first_id) == word_orders[first_id]
+        # the second sentence has been split, and its annotations deleted
+        assert boundaries[last_token_id] != last_id
+        assert not any(get_boundary_annotations(last_id).values())
+        # the last boundary marker has not changed
+        assert get_boundary_annotations(next_id) == annotations[next_id]
+        assert get_word_order(next_id) == word_orders[next_id]
+
+        # remove the last boundary marker
+        assert submit([first_token_id, middle_token_id])
+        boundaries = get_boundaries(verse_id)
+        assert sorted(boundaries) == [first_token_id, middle_token_id]
+        assert boundaries[first_token_id] == first_id
+        assert get_boundary_annotations(first_id) == annotations[first_id]
+        assert get_word_order(first_id) == word_orders[first_id]
+        # the first sentence of the next verse now starts in this verse,
+        # so its word order is cleared, but its other annotations are kept
+        assert get_boundary_annotations(next_id) == annotations[next_id]
+        assert not get_word_order(next_id)
+
+        # resubmitting the same boundary markers changes nothing
+        assert not submit([middle_token_id, first_token_id, first_token_id])
+    finally:
+        db.session.rollback()
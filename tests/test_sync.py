@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Annotation Sync
+
+A submission is diffed against the existing annotations, and only the
+differences are written, as upserts on the natural key of the annotation.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import json
+
+import pytest
+
+import utils.submit
+from models_sqla import db, Task, Boundary
+from models_sqla import TokenLabel, TokenClassification
+from constants import TASK_TOKEN_CLASSIFICATION
+from utils.submit import update_token_classification, upsert_rows
+
+from conftest import ANNOTATOR_ID, count_queries
+
+###############################################################################
+
+
+@pytest.fixture
+def verse(chapter_verse_ids):
+    """A verse with two annotated sentences, and two token labels
+
+    Changes made by the test are rolled back.
+    """
+    verse_id = chapter_verse_ids[8]
+    label = TokenLabel(task_id=get_task_id(), label="ORG")
+    db.session.add(label)
+    db.session.flush()
+    yield {
+        "verse_id": verse_id,
+        "boundary_ids": [
+            boundary_id
+            for boundary_id, in db.session.query(Boundary.id).filter(
+                Boundary.verse_id == verse_id,
+                Boundary.annotator_id == ANNOTATOR_ID
+            ).order_by(Boundary.token_id)
+        ],
+        "label_ids": [TokenLabel.query.first().id, label.id],
+    }
+    db.session.rollback()
+
+
+def get_task_id() -> int:
+    return Task.query.filter(
+        Task.category == TASK_TOKEN_CLASSIFICATION
+    ).one().id
+
+
+def get_classifications(verse_id: int) -> dict:
+    """Token classifications of a verse, by token ID"""
+    return {
+        row.token_id: row
+        for row in db.session.query(
+            TokenClassification.id,
+            TokenClassification.token_id,
+            TokenClassification.boundary_id,
+            TokenClassification.label_id,
+            TokenClassification.is_deleted,
+        ).join(
+            Boundary, TokenClassification.boundary_id == Boundary.id
+        ).filter(
+            Boundary.verse_id == verse_id,
+            TokenClassification.annotator_id == ANNOTATOR_ID
+        )
+    }
+
+
+def get_form(classifications: dict) -> dict:
+    """Form of token classifications (token_id: (boundary_id, label_id))"""
+    return {
+        "token_classification_data": json.dumps({
+            f"token-class-selector-{boundary_id}-{token_id}": {
+                "boundary_id": boundary_id,
+                "label_id": label_id
+            }
+            for token_id, (boundary_id, label_id) in classifications.items()
+        })
+    }
+
+
+def submit(verse_id: int, classifications: dict) -> bool:
+    return update_token_classification(
+        get_form(classifications), ANNOTATOR_ID, get_task_id(), verse_id
+    )
+
+
+def as_submitted(classifications: dict) -> dict:
+    return {
+        token_id: (row.boundary_id, row.label_id)
+        for token_id, row in classifications.items()
+        if not row.is_deleted
+    }
+
+###############################################################################
+
+
+def test_unchanged_resubmit_query_count(verse):
+    verse_id = verse["verse_id"]
+    submitted = as_submitted(get_classifications(verse_id))
+    assert submitted
+    form = get_form(submitted)
+    task_id = get_task_id()
+
+    with count_queries() as queries:
+        changes = update_token_classification(
+            form, ANNOTATOR_ID, task_id, verse_id
+        )
+
+    assert not changes
+    assert len(queries) == 1
+    assert queries[0].lstrip().upper().startswith("SELECT")
+
+
+def test_sync_annotations(verse):
+    verse_id = verse["verse_id"]
+    first_boundary_id, last_boundary_id = verse["boundary_ids"]
+    label_id, other_label_id = verse["label_ids"]
+    existing = get_classifications(verse_id)
+    first_token_id, last_token_id = sorted(existing)
+    new_token_id = first_token_id + 1
+    assert new_token_id not in existing
+
+    def check(expected: dict):
+        classifications = get_classifications(verse_id)
+        assert as_submitted(classifications) == expected
+        # existing annotations are updated in place
+        for token_id, row in existing.items():
+            assert classifications[token_id].id == row.id
+        return classifications
+
+    # value change (and an insert)
+    submitted = {
+        first_token_id: (first_boundary_id, other_label_id),
+        last_token_id: (last_boundary_id, label_id),
+        new_token_id: (first_boundary_id, label_id),
+    }
+    assert submit(verse_id, submitted)
+    existing = check(submitted)
+
+    # delete
+    del submitted[last_token_id]
+    assert submit(verse_id, submitted)
+    classifications = check(submitted)
+    assert classifications[last_token_id].is_deleted
+
+    # an unchanged resubmit does not touch the deleted annotation
+    assert not submit(verse_id, submitted)
+
+    # restore, with a different value
+    submitted[last_token_id] = (last_boundary_id, other_label_id)
+    assert submit(verse_id, submitted)
+    check(submitted)
+
+    # delete all
+    assert submit(verse_id, {})
+    classifications = check({})
+    assert all(row.is_deleted for row in classifications.values())
+    assert not submit(verse_id, {})
+
+
+@pytest.mark.parametrize("native", [True, False], ids=["upsert", "fallback"])
+def test_upsert_rows(verse, monkeypatch, native):
+    if not native:
+        # a database without `INSERT ... ON CONFLICT`
+        monkeypatch.setattr(utils.submit, "UPSERT_DIALECTS", {})
+
+    first_boundary_id, _ = verse["boundary_ids"]
+    _, other_label_id = verse["label_ids"]
+    existing = get_classifications(verse["verse_id"])
+    token_id = min(existing)
+    new_token_id = token_id + 1
+    assert new_token_id not in existing
+
+    task_id = get_task_id()
+    rows = [
+        {
+            "task_id": task_id,
+            "annotator_id": ANNOTATOR_ID,
+            "token_id": _token_id,
+            "boundary_id": first_boundary_id,
+            "label_id": other_label_id,
+            "is_deleted": False,
+        }
+        for _token_id in [token_id, new_token_id]
+    ]
+    with count_queries() as queries:
+        assert upsert_rows(
+            TokenClassification,
+            rows,
+            index_columns=["task_id", "annotator_id", "token_id"],
+            update_columns=["label_id", "is_deleted"],
+        ) == 2
+
+    if native:
+        # a single `INSERT ... ON CONFLICT DO UPDATE` for all the rows
+        assert len(queries) == 1
+        assert "ON CONFLICT" in queries[0].upper()
+    else:
+        # an update per row, and an insert for the row that does not exist
+        assert len(queries) == 3
+
+    classifications = get_classifications(verse["verse_id"])
+    # the conflicting row is updated, the other one is inserted
+    assert classifications[token_id].id == existing[token_id].id
+    assert classifications[token_id].label_id == other_label_id
+    assert classifications[new_token_id].label_id == other_label_id
+    assert len(classifications) == len(existing) + 1
+
+    assert upsert_rows(TokenClassification, [], [], []) == 0
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests: Verse Data
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import pytest
+
+from constants import TASK_CATEGORY_LIST, TASK_WORD_ORDER
+from utils.database import (
+    get_verse_data, get_verse_fingerprint, is_verse_data_degraded
+)
+from utils.heuristic import (
+    DEFAULT_WORD_ORDER_PRIORITY,
+    HEURISTIC_CACHE,
+    set_heuristic_limits,
+    set_word_order_priority,
+    set_token_graph_rules,
+)
+
+from conftest import ANNOTATOR_ID
+
+###############################################################################
+
+
+def load_section(verse_data: dict, section_data: dict, task_category: str):
+    """Add a lazily fetched section to the verse data
+
+    Mirrors `ensure_task_section()` (static/custom/js/corpus/functions.js)
+    """
+    for verse_id, verse in verse_data.items():
+        if task_category in verse["sections"]:
+            continue
+        section_verse = section_data[verse_id]
+        verse[task_category] = section_verse[task_category]
+        verse["heuristics"][task_category] = (
+            section_verse["heuristics"][task_category]
+        )
+        if task_category in section_verse["heuristics_degraded"]:
+            verse["heuristics_degraded"][task_category] = (
+                section_verse["heuristics_degraded"][task_category]
+            )
+        verse["sections"].append(task_category)
+
+
+@pytest.mark.parametrize("task_category", TASK_CATEGORY_LIST)
+def test_lazy_word_order_matches_full_load(chapter_verse_ids, task_category):
+    verse_ids = chapter_verse_ids[:20]
+    full_data = get_verse_data(verse_ids, [ANNOTATOR_ID])
+
+    verse_data = get_verse_data(verse_ids, [ANNOTATOR_ID], [task_category])
+    for verse in verse_data.values():
+        assert (TASK_WORD_ORDER in verse["sections"]) == (
+            task_category == TASK_WORD_ORDER
+        )
+
+    load_section(
+        verse_data,
+        get_verse_data(verse_ids, [ANNOTATOR_ID], [TASK_WORD_ORDER]),
+        TASK_WORD_ORDER
+    )
+    assert any(
+        verse["heuristics"][TASK_WORD_ORDER] for verse in full_data.values()
+    )
+    for verse_id, verse in verse_data.items():
+        full_verse = full_data[verse_id]
+        assert verse[TASK_WORD_ORDER] == full_verse[TASK_WORD_ORDER]
+        assert (
+            verse["heuristics"][TASK_WORD_ORDER] ==
+            full_verse["heuristics"][TASK_WORD_ORDER]
+        )
+        assert TASK_WORD_ORDER in verse["sections"]
+
+
+def test_degraded_heuristics(chapter_verse_ids):
+    verse_ids = chapter_verse_ids[:20]
+    HEURISTIC_CACHE.clear()
+    set_heuristic_limits(max_tokens=1)
+    try:
+        degraded_data = get_verse_data(verse_ids, [ANNOTATOR_ID])
+    finally:
+        set_heuristic_limits()
+    assert is_verse_data_degraded(degraded_data.values())
+
+    # degraded results are recomputed once the limits are lifted
+    verse_data = get_verse_data(verse_ids, [ANNOTATOR_ID])
+    assert not is_verse_data_degraded(verse_data.values())
+
+
+def test_fingerprint_heuristic_configuration(chapter_verse_ids):
+    verse_ids = chapter_verse_ids[:5]
+    fingerprint = get_verse_fingerprint(verse_ids, [ANNOTATOR_ID])
+
+    set_word_order_priority(
+        {**DEFAULT_WORD_ORDER_PRIORITY, "upos_start_order": []}
+    )
+    try:
+        assert get_verse_fingerprint(verse_ids, [ANNOTATOR_ID]) != fingerprint
+    finally:
+        set_word_order_priority()
+
+    set_token_graph_rules([])
+    try:
+        assert get_verse_fingerprint(verse_ids, [ANNOTATOR_ID]) != fingerprint
+    finally:
+        set_token_graph_rules()
+
+    assert get_verse_fingerprint(verse_ids, [ANNOTATOR_ID]) == fingerprint
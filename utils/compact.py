@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact Wire Format for Verse Data
+
+Verse data (as produced by `get_verse_data()`) repeats every token several
+times (`tokens`, `display`, `sentences`) and every token carries its entire
+CoNLL-U analysis. In the compact format,
+
+* distinct analyses, feature bundles and displays are stored once per
+  response in tables, and are referred to by their index,
+* displays that can be derived from the analysis (i.e., the ones created by
+  `add_chapter()`) are not transmitted at all,
+* tokens are stored once per response, in columnar arrays,
+* verses refer to tokens by their IDs.
+
+The format is decoded by `decode_compact_verse_data()` in
+`static/custom/js/corpus/functions.js`, which reconstructs the verse data.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import json
+from typing import Any, Dict, List
+
+###############################################################################
+
+COMPACT_FORMAT_VERSION = 1
+
+# value of the display column for the displays derived from the analysis
+DERIVED_DISPLAY = -1
+
+TOKEN_COLUMNS = [
+    "id",
+    "inner_id",
+    "line_id",
+    "order",
+    "text",
+    "lemma",
+    "analysis",
+    "display",
+    "annotator_id",
+]
+
+###############################################################################
+
+
+class ValueTable:
+    """Table of distinct JSON values, referred to by index"""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def add(self, value: Any) -> int:
+        key = json.dumps(value, ensure_ascii=False, default=str)
+        if key not in self.index:
+            self.index[key] = len(self.values)
+            self.values.append(value)
+        return self.index[key]
+
+
+###############################################################################
+
+
+def derive_display(analysis: Any) -> Dict[str, str]:
+    """Derive display of a token from its analysis
+
+    Mirrors the display created in `add_chapter()`, and the decoder in the
+    corpus JS. Returns None if the analysis contains values that the
+    decoder can not reproduce exactly (i.e., non-string values).
+
+    Parameters
+    ----------
+    analysis : Any
+        Token analysis
+
+    Returns
+    -------
+    Dict[str, str]
+        Display
+    """
+    if not isinstance(analysis, dict):
+        return None
+    try:
+        values = [analysis[key] for key in ["form", "lemma", "upos", "xpos"]]
+        feats = analysis["feats"]
+        misc = analysis["misc"]
+    except KeyError:
+        return None
+    if not isinstance(feats, dict) or not isinstance(misc, dict):
+        return None
+    values.extend(feats.values())
+    values.extend(misc.values())
+    if not all(isinstance(value, str) for value in values):
+        return None
+
+    return {
+        "Word": analysis["form"],
+        "Lemma": analysis["lemma"],
+        "UPOS": analysis["upos"],
+        "XPOS": analysis["xpos"],
+        "Features": "<br>".join(f"{k}={v}" for k, v in feats.items()),
+        "Misc": "<br>".join(f"{k}={v}" for k, v in misc.items())
+    }
+
+
+def encode_verse_data(verses: List[dict]) -> Dict[str, Any]:
+    """Encode verse data in the compact format
+
+    Parameters
+    ----------
+    verses : List[dict]
+        List of verse data objects, as produced by `get_verse_data()`
+
+    Returns
+    -------
+    Dict[str, Any]
+        Compact verse data
+    """
+    analyses = ValueTable()
+    feature_bundles = ValueTable()
+    displays = ValueTable()
+    tokens = {}
+
+    def encode_analysis(analysis: Any) -> int:
+        if isinstance(analysis, dict) and isinstance(
+            analysis.get("feats"), dict
+        ):
+            analysis = {
+                **analysis,
+                "feats": feature_bundles.add(analysis["feats"])
+            }
+        return analyses.add(analysis)
+
+    def add_token(token: dict, display: Any = None, has_display=False):
+        token_id = token["id"]
+        if token_id not in tokens:
+            tokens[token_id] = {
+                "id": token_id,
+                "inner_id": token["inner_id"],
+                "line_id": token.get("line_id"),
+                "order": token.get("order"),
+                "text": token["text"],
+                "lemma": token["lemma"],
+                "analysis": encode_analysis(token["analysis"]),
+                "display": None,
+                "annotator_id": token["annotator_id"],
+            }
+        _token = tokens[token_id]
+        for key in ["line_id", "order"]:
+            if _token[key] is None and token.get(key) is not None:
+                _token[key] = token[key]
+        if has_display:
+            _token["display"] = (
+                DERIVED_DISPLAY
+                if display is not None and (
+                    display == derive_display(token["analysis"])
+                )
+                else displays.add(display)
+            )
+        return token_id
+
+    compact_verses = []
+    for verse in verses:
+        compact_verse = {
+            key: value
+            for key, value in verse.items()
+            if key not in ["tokens", "display", "sentences"]
+        }
+
+        compact_tokens = []
+        for line_tokens, line_display in zip(
+            verse["tokens"], verse["display"]
+        ):
+            # NOTE: display is available only for the original tokens
+            original_display = iter(line_display)
+            compact_tokens.append([
+                add_token(
+                    token,
+                    display=(
+                        next(original_display)
+                        if not token["annotator_id"]
+                        else None
+                    ),
+                    has_display=not token["annotator_id"]
+                )
+                for token in line_tokens
+            ])
+        compact_verse["tokens"] = compact_tokens
+
+        compact_verse["sentences"] = {
+            boundary_id: [
+                add_token(token)
+                for token in sentence_tokens.values()
+            ]
+            for boundary_id, sentence_tokens in verse["sentences"].items()
+        }
+        compact_verses.append(compact_verse)
+
+    return {
+        "version": COMPACT_FORMAT_VERSION,
+        "analyses": analyses.values,
+        "feature_bundles": feature_bundles.values,
+        "displays": displays.values,
+        "tokens": {
+            column: [token[column] for token in tokens.values()]
+            for column in TOKEN_COLUMNS
+        },
+        "verses": compact_verses,
+    }
+
+###############################################################################
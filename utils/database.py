@@ -10,11 +10,19 @@ Note: Functions are usable only in an application context.
 
 ###############################################################################
 
+import gzip
+import json
+import hashlib
 import logging
-from typing import Dict, List, Any
+import datetime as dt
+from bisect import bisect_right
+from itertools import groupby
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
 from collections import defaultdict
 
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.properties import ColumnProperty
 from sqlalchemy.orm.relationships import RelationshipProperty
 
@@ -31,7 +39,9 @@ from models_sqla import (
     SentenceClassification,
     SentenceGraph,
     TokenRelationLabel,
-    SubmitLog
+    SubmitLog,
+    VerseProgress,
+    HeuristicSuggestion
 )
 from constants import (
     AUTO_ANNOTATION_USER_ID,
@@ -47,9 +57,16 @@ from constants import (
     TASK_TOKEN_GRAPH,
     TASK_TOKEN_CONNECTION,
     TASK_SENTENCE_CLASSIFICATION,
-    TASK_SENTENCE_GRAPH
+    TASK_SENTENCE_GRAPH,
+    TASK_CATEGORY_LIST
 )
-from utils.heuristic import get_word_order, get_token_graph
+from utils.heuristic import (
+    HEURISTIC_VERSION,
+    HeuristicBudget,
+    get_word_order_batch_cached, get_token_graph_cached,
+    get_heuristic_fingerprint
+)
+from utils.registry import TASK_REGISTRY
 
 ###############################################################################
 
@@ -57,6 +74,79 @@ LOGGER = logging.getLogger(__name__)
 
 ###############################################################################
 
+# maximum number of bound parameters in a single statement
+# (`SQLITE_MAX_VARIABLE_NUMBER` of SQLite versions before 3.32.0)
+MAX_STATEMENT_PARAMETERS = 999
+
+###############################################################################
+
+
+def insert_rows(model, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert rows with multi-row INSERT statements and get their IDs
+
+    Rows are inserted in chunks (limited by `MAX_STATEMENT_PARAMETERS`)
+    through SQLAlchemy Core, bypassing the ORM unit of work and the identity
+    map. Rows with an explicit `id` are inserted as they are.
+    IDs of the other rows are returned by the database (PostgreSQL),
+    or are derived from the ID of the last (SQLite) or the first (MySQL)
+    row of a statement, as the rows of a single multi-row INSERT statement
+    get consecutive IDs. Other databases insert one row at a time.
+
+    Changes are added to the session, but not committed.
+
+    Parameters
+    ----------
+    model : db.Model
+        Model with an integer primary key `id`
+    rows : List[Dict[str, Any]]
+        Rows (column name: value), with the same columns,
+        apart from the optional `id`
+
+    Returns
+    -------
+    List[int]
+        IDs of the inserted rows, in the same order as `rows`
+    """
+    table = model.__table__
+    dialect = db.engine.dialect.name
+    chunk_size = max(MAX_STATEMENT_PARAMETERS // len(table.columns), 1)
+
+    ids = []
+    for has_id, run in groupby(rows, key=lambda row: "id" in row):
+        run = list(run)
+        if has_id:
+            for start in range(0, len(run), chunk_size):
+                db.session.execute(
+                    table.insert(), run[start:start + chunk_size]
+                )
+            ids.extend(row["id"] for row in run)
+            continue
+
+        if dialect not in ["sqlite", "mysql", "postgresql"]:
+            for row in run:
+                inserted = db.session.execute(table.insert().values(row))
+                ids.append(inserted.inserted_primary_key[0])
+            continue
+
+        for start in range(0, len(run), chunk_size):
+            chunk = run[start:start + chunk_size]
+            statement = table.insert().values(chunk)
+            if dialect == "postgresql":
+                # NOTE: RETURNING follows the order of VALUES
+                inserted = db.session.execute(statement.returning(table.c.id))
+                ids.extend(_id for _id, in inserted)
+                continue
+
+            last_row_id = db.session.execute(statement).lastrowid
+            first_id = (
+                last_row_id - len(chunk) + 1
+                if dialect == "sqlite"
+                else last_row_id
+            )
+            ids.extend(range(first_id, first_id + len(chunk)))
+    return ids
+
+
 # NOTE: Format Verse Data (`chapter_data`)
 # [[{}, {}, {}, ...], [{}, {}, {}, ...], ...]
 # data: list of verses
@@ -105,21 +195,39 @@ def add_chapter(
         result["style"] = "warning"
         return result
 
+    # NOTE: rows are inserted with multi-row INSERT statements
+    # (`insert_rows()`), level by level (verses, lines, tokens, boundaries),
+    # since building ORM objects for every token is slow for large chapters
     try:
-        chapter = Chapter()
-        chapter.corpus_id = corpus_id
-        chapter.name = chapter_name
-        chapter.description = chapter_description
+        boundary_task_id = TASK_REGISTRY.task_id(TASK_SENTENCE_BOUNDARY)
+
+        chapter_id, = insert_rows(Chapter, [{
+            "corpus_id": corpus_id,
+            "name": chapter_name,
+            "description": chapter_description,
+        }])
+        verse_ids = insert_rows(Verse, [
+            {"chapter_id": chapter_id} for _verse in chapter_data
+        ])
 
-        for _verse in chapter_data:
-            verse = Verse()
-            verse.chapter = chapter
+        line_rows = []
+        for verse_id, _verse in zip(verse_ids, chapter_data):
             for _line in _verse:
-                line = Line()
+                line_row = {
+                    "verse_id": verse_id,
+                    "text": _line.get('text', ''),
+                }
                 if _line.get('id'):
-                    line.id = _line.get('id')
-                line.verse = verse
-                line.text = _line.get('text', '')
+                    line_row["id"] = _line.get('id')
+                line_rows.append(line_row)
+        line_ids = iter(insert_rows(Line, line_rows))
+
+        token_rows = []
+        # index (in `token_rows`) of the last token of every verse
+        verse_last_tokens = []
+        for _verse in chapter_data:
+            for _line in _verse:
+                line_id = next(line_ids)
 
                 is_subtoken = False
                 end_id = None
@@ -132,32 +240,35 @@ def add_chapter(
                         if isinstance(_token_id, (list, tuple))
                         else str(_token_id)
                     )
-                    del _token["id"]
-
-                    token = Token()
-                    token.inner_id = inner_id
-                    token.order = _idx * 10
-                    token.line = line
-                    token.text = _token["form"]
-                    if is_subtoken:
-                        token.text = "_"
-                    token.lemma = _token["lemma"]
-                    token.analysis = _token
-                    token.display = {
-                        "Word": _token["form"],
-                        "Lemma": _token["lemma"],
-                        "UPOS": _token["upos"],
-                        "XPOS": _token["xpos"],
-                        "Features": "<br>".join(
-                            f"{k}={v}"
-                            for k, v in _token["feats"].items()
-                        ),
-                        "Misc": "<br>".join(
-                            f"{k}={v}"
-                            for k, v in _token["misc"].items()
-                        )
+                    analysis = {
+                        key: value
+                        for key, value in _token.items()
+                        if key != "id"
                     }
-                    db.session.add(token)
+
+                    token_rows.append({
+                        "line_id": line_id,
+                        "inner_id": inner_id,
+                        "order": _idx * 10,
+                        "text": "_" if is_subtoken else _token["form"],
+                        "lemma": _token["lemma"],
+                        "analysis": analysis,
+                        "display": {
+                            "Word": _token["form"],
+                            "Lemma": _token["lemma"],
+                            "UPOS": _token["upos"],
+                            "XPOS": _token["xpos"],
+                            "Features": "<br>".join(
+                                f"{k}={v}"
+                                for k, v in _token["feats"].items()
+                            ),
+                            "Misc": "<br>".join(
+                                f"{k}={v}"
+                                for k, v in _token["misc"].items()
+                            )
+                        },
+                        "annotator_id": None,
+                    })
 
                     if str(_token_id) == str(end_id):
                         is_subtoken = False
@@ -167,21 +278,29 @@ def add_chapter(
                         is_subtoken = True
                         end_id = _token_id[-1]
 
-            # NOTE: SentenceBoundary task is auto created at the start
-            # * Auto-boundary: Insert verse boundary as sentence boundary
-            # * Use AUTO_ANNOTATOR_USER_ID as `annotator_id`
-            # * Auto-boundary is used if the SentenceBoundary is not active
-            task = Task.query.filter(
-                Task.category == TASK_SENTENCE_BOUNDARY
-            ).first()
-            boundary = Boundary()
-            boundary.task = task
-            boundary.token = token
-            boundary.verse = verse
-            boundary.annotator_id = AUTO_ANNOTATION_USER_ID
-            db.session.add(boundary)
+            if not token_rows:
+                raise ValueError("No tokens in the first verse.")
+            verse_last_tokens.append(len(token_rows) - 1)
+        token_ids = insert_rows(Token, token_rows)
+
+        # NOTE: SentenceBoundary task is auto created at the start
+        # * Auto-boundary: Insert verse boundary as sentence boundary
+        # * Use AUTO_ANNOTATOR_USER_ID as `annotator_id`
+        # * Auto-boundary is used if the SentenceBoundary is not active
+        insert_rows(Boundary, [
+            {
+                "task_id": boundary_task_id,
+                "verse_id": verse_id,
+                "token_id": token_ids[last_token_index],
+                "annotator_id": AUTO_ANNOTATION_USER_ID,
+            }
+            for verse_id, last_token_index in zip(
+                verse_ids, verse_last_tokens
+            )
+        ])
 
     except Exception as e:
+        db.session.rollback()
         result["message"] = "An error occurred while inserting data."
         result["style"] = "danger"
         LOGGER.exception(e)
@@ -487,7 +606,13 @@ def export_data(
 ###############################################################################
 
 
-def get_chapter_data(chapter_id: int, user: User, all: bool = False) -> dict:
+def get_chapter_data(
+    chapter_id: int,
+    user: User,
+    all: bool = False,
+    verse_ids: List[int] = None,
+    tasks: List[str] = None
+) -> dict:
     """Get Chapter Data
 
     Fetch line data for the lines belonging to the specified chapter.
@@ -505,18 +630,115 @@ def get_chapter_data(chapter_id: int, user: User, all: bool = False) -> dict:
         If True, and the user has `PERMISSION_CURATE` permission
         or `ROLE_ADMIN` role, annotations by all the users will be fetched.
         The default is False
+    verse_ids : List[int], optional
+        If provided, only the data of these verses is fetched.
+        (e.g. a window obtained from `get_chapter_window()`)
+        The default is None.
+    tasks : List[str], optional
+        Task categories to fetch (see `get_verse_data()`)
+        If None, all the task categories are fetched.
+        The default is None.
 
     Returns
     -------
     dict
         Line data, keyed by line IDs
     """
-    chapter = Chapter.query.get(chapter_id)
+    if verse_ids is None:
+        chapter = Chapter.query.get(chapter_id)
+        verse_ids = [
+            verse.id
+            for verse in chapter.verses
+        ]
+    annotator_ids = get_annotator_ids(user, all=all)
+    return get_verse_data(verse_ids, annotator_ids=annotator_ids, tasks=tasks)
+
+
+def get_chapter_window(
+    chapter_id: int,
+    offset: int = 0,
+    limit: int = None,
+    after: int = None
+) -> dict:
+    """Get a window of verses from a chapter
+
+    Verses are ordered by their IDs.
+
+    Parameters
+    ----------
+    chapter_id : int
+        Chapter ID
+    offset : int, optional
+        Number of verses to skip.
+        The default is 0.
+    limit : int, optional
+        Maximum number of verses in the window.
+        If None, all the remaining verses are included.
+        The default is None.
+    after : int, optional
+        Cursor. If provided, only the verses with ID greater than this
+        are considered (`offset` is applied after the cursor).
+        The default is None.
 
-    verse_ids = [
-        verse.id
-        for verse in chapter.verses
+    Returns
+    -------
+    dict
+        Window details
+        * `verse_ids`: IDs of the verses in the window
+        * `total`: number of verses in the chapter
+        * `offset`, `limit`, `after`: requested window
+        * `next`: cursor for the next window (None, if this is the last one)
+    """
+    chapter_verse_ids = [
+        verse_id
+        for verse_id, in db.session.query(Verse.id).filter(
+            Verse.chapter_id == chapter_id
+        ).order_by(Verse.id).all()
     ]
+
+    window_verse_ids = chapter_verse_ids
+    if after is not None:
+        window_verse_ids = [
+            verse_id
+            for verse_id in window_verse_ids
+            if verse_id > after
+        ]
+    window_verse_ids = window_verse_ids[offset:]
+    if limit is not None:
+        window_verse_ids = window_verse_ids[:limit]
+
+    has_next = (
+        bool(window_verse_ids) and
+        window_verse_ids[-1] != chapter_verse_ids[-1]
+    )
+    return {
+        "verse_ids": window_verse_ids,
+        "total": len(chapter_verse_ids),
+        "offset": offset,
+        "limit": limit,
+        "after": after,
+        "next": window_verse_ids[-1] if has_next else None,
+    }
+
+
+def get_annotator_ids(user: User, all: bool = False) -> List[int]:
+    """Get IDs of the annotators whose annotations are visible to a user
+
+    Parameters
+    ----------
+    user : User
+        User object for the user associated with the request
+    all : bool
+        If True, and the user has `PERMISSION_CURATE` permission
+        or `ROLE_ADMIN` role, annotations by all the users are visible.
+        The default is False
+
+    Returns
+    -------
+    List[int]
+        List of annotator IDs
+        (None, if annotations by all the users are visible)
+    """
     annotator_ids = []
 
     if user.has_permission(PERMISSION_ANNOTATE):
@@ -525,7 +747,7 @@ def get_chapter_data(chapter_id: int, user: User, all: bool = False) -> dict:
     if user.has_permission(PERMISSION_CURATE) or user.has_role(ROLE_ADMIN):
         annotator_ids = None if all else [user.id]
 
-    return get_verse_data(verse_ids, annotator_ids=annotator_ids)
+    return annotator_ids
 
 
 ###############################################################################
@@ -534,11 +756,16 @@ def get_chapter_data(chapter_id: int, user: User, all: bool = False) -> dict:
 def get_verse_data(
     verse_ids: List[int],
     annotator_ids: List[int] = None,
+    tasks: List[str] = None,
 ) -> dict:
     """Get Verse Data
 
     Fetch content, linguistic information and annotations
 
+    Every table is queried once for the entire list of verses (or the
+    boundaries therein) and the rows are grouped in memory, so the number of
+    queries does not grow with the number of verses or sentences.
+
     Parameters
     ----------
     verse_ids : List[int]
@@ -547,6 +774,17 @@ def get_verse_data(
         List of user IDs of annotators
         If None, annotations by all the users will be fetched.
         The default is None.
+    tasks : List[str], optional
+        Task categories whose annotations (and heuristics) are to be fetched.
+        Sections of the other task categories, as well as of the categories
+        without an active task, are left empty.
+        Boundaries and word order are always fetched, since they are
+        required to display the sentences, however, the heuristic word order
+        is computed only if the word order task category is requested.
+        Fetched categories are listed in the `sections` field of every verse,
+        which lists the word order task category only if it was requested.
+        If None, all the task categories are fetched.
+        The default is None.
 
     Returns
     -------
@@ -556,31 +794,106 @@ def get_verse_data(
     annotator_ids = annotator_ids or []
     line_object_query = Line.query.filter(Line.verse_id.in_(verse_ids))
 
-    sentence_boundary_task_active = Task.query.filter(
-        Task.category == TASK_SENTENCE_BOUNDARY,
-        Task.is_deleted == False  # noqa
-    ).one_or_none()
-    word_order_task_active = Task.query.filter(
-        Task.category == TASK_WORD_ORDER,
-        Task.is_deleted == False  # noqa
-    ).one_or_none()
+    active_task_categories = TASK_REGISTRY.active_categories
+    sentence_boundary_task_active = (
+        TASK_SENTENCE_BOUNDARY in active_task_categories
+    )
+    word_order_task_active = TASK_WORD_ORDER in active_task_categories
+
+    tasks = set(TASK_CATEGORY_LIST if tasks is None else tasks)
+    tasks.intersection_update(active_task_categories)
+    sections = [
+        category
+        for category in TASK_CATEGORY_LIST
+        if category in tasks or category == TASK_SENTENCE_BOUNDARY
+    ]
 
     data = {}
 
+    # ----------------------------------------------------------------------- #
+    # line and token data
+
+    line_objects = line_object_query.all()
+
+    line_tokens = defaultdict(list)
+    token_query = Token.query.filter(
+        Token.line_id.in_([line.id for line in line_objects])
+    ).order_by(Token.id)
+    for token in token_query.all():
+        line_tokens[token.line_id].append(token)
+
+    # ----------------------------------------------------------------------- #
+    # progress data
+
+    verse_progress = defaultdict(list)
+    progress_query = db.session.query(
+        SubmitLog.verse_id,
+        SubmitLog.task_id,
+        Task.short,
+        SubmitLog.annotator_id,
+        func.max(SubmitLog.updated_at)
+    ).filter(
+        SubmitLog.verse_id.in_(verse_ids),
+        SubmitLog.annotator_id.in_(annotator_ids),
+        Task.is_deleted == False  # noqa
+    ).join(
+        Task
+    ).group_by(
+        SubmitLog.verse_id,
+        SubmitLog.task_id,
+        SubmitLog.annotator_id,
+        Task.short,
+        Task.order
+    ).order_by(Task.order, SubmitLog.annotator_id)
+
+    # NOTE: version of a verse is the time of the latest submit,
+    # it serves as the starting point for `get_verse_delta()`
+    verse_version = {}
+    for (
+        verse_id, task_id, task_short, annotator_id, latest_update_time
+    ) in progress_query.all():
+        verse_progress[verse_id].append({
+            "task_id": task_id,
+            "task_short": task_short,
+            "verse_id": verse_id,
+            "annotator_id": annotator_id,
+            "updated_at": latest_update_time
+        })
+        if latest_update_time is not None:
+            verse_version[verse_id] = max(
+                latest_update_time,
+                verse_version.get(verse_id, latest_update_time)
+            )
+
+    # NOTE: revision of the annotations of a verse by an annotator,
+    # to be echoed back with a submit (`claim_verse_revision()`)
+    verse_revisions = defaultdict(dict)
+    revision_query = db.session.query(
+        VerseProgress.verse_id,
+        VerseProgress.annotator_id,
+        VerseProgress.revision
+    ).filter(
+        VerseProgress.verse_id.in_(verse_ids),
+        VerseProgress.annotator_id.in_(annotator_ids)
+    )
+    for verse_id, annotator_id, revision in revision_query.all():
+        verse_revisions[verse_id][annotator_id] = revision
+
     # TODO: Consider rewriting with a focus on Verse instead of Line
     # NOTE: Line ID is important for tokens
     # Do we want to change the database structure to remove Line table
     # altogether and only keep only a line_id field in Verse table?
 
-    for line in line_object_query:
+    for line in line_objects:
         verse_id = line.verse_id
+        tokens = line_tokens[line.id]
         if not data.get(verse_id):
             data[verse_id] = {
                 "verse_id": verse_id,
                 "text": [line.text],
                 "display": [[
                     token.display
-                    for token in line.tokens.all()
+                    for token in tokens
                     if not token.annotator_id
                     # tokens that do not have annotator_id are original
                 ]],
@@ -597,7 +910,7 @@ def get_verse_data(
                         # "display": token.display,
                         "annotator_id": token.annotator_id
                     }
-                    for token in line.tokens.all()
+                    for token in tokens
                     # if (
                     #     token.annotator_id is None or
                     #     token.annotator_id in annotator_ids
@@ -627,35 +940,25 @@ def get_verse_data(
                     TASK_SENTENCE_CLASSIFICATION: [],
                     TASK_SENTENCE_GRAPH: []
                 },
-                "progress": [
-                    {
-                        "task_id": p.task_id,
-                        "task_short": p.task.short,
-                        "verse_id": p.verse_id,
-                        "annotator_id": p.annotator_id,
-                        "updated_at": latest_update_time
-                    }
-
-                    for p, latest_update_time in db.session.query(
-                        SubmitLog,
-                        func.max(SubmitLog.updated_at)
-                    ).filter(
-                        SubmitLog.verse_id == verse_id,
-                        SubmitLog.annotator_id.in_(annotator_ids),
-                        Task.is_deleted == False  # noqa
-                    ).group_by(
-                        SubmitLog.task_id,
-                        SubmitLog.annotator_id
-                    ).join(
-                        Task
-                    ).order_by(Task.order).all()
-                ]
+                # boundaries whose heuristics were skipped (`HeuristicBudget`)
+                "heuristics_degraded": {
+                    TASK_WORD_ORDER: [],
+                    TASK_TOKEN_GRAPH: []
+                },
+                "progress": verse_progress[verse_id],
+                "revisions": verse_revisions[verse_id],
+                "sections": list(sections),
+                "version": (
+                    verse_version[verse_id].isoformat()
+                    if verse_id in verse_version
+                    else None
+                )
             }
         else:
             data[verse_id]["text"].append(line.text)
             data[verse_id]["display"].append([
                 token.display
-                for token in line.tokens.all()
+                for token in tokens
                 if not token.annotator_id
                 # tokens that do not have annotator_id are original
             ])
@@ -672,7 +975,7 @@ def get_verse_data(
                     # "display": token.display,
                     "annotator_id": token.annotator_id
                 }
-                for token in line.tokens.all()
+                for token in tokens
                 # if (
                 #     token.annotator_id is None or
                 #     token.annotator_id in annotator_ids
@@ -690,9 +993,118 @@ def get_verse_data(
             Boundary.annotator_id == AUTO_ANNOTATION_USER_ID
         ).order_by(Boundary.token_id)
 
+    boundaries = boundary_query.options(
+        joinedload(Boundary.annotator)
+    ).all()
+    boundary_ids = [boundary.id for boundary in boundaries]
+    boundary_verse_ids = {
+        boundary.id: boundary.verse_id
+        for boundary in boundaries
+    }
+
+    # sentences of all the verses, resolved once per chapter
+    verse_sentences = {}
+    verse_chapter_query = db.session.query(
+        Verse.chapter_id, Verse.id
+    ).filter(Verse.id.in_({boundary.verse_id for boundary in boundaries}))
+    chapter_verse_ids = defaultdict(list)
+    for chapter_id, verse_id in verse_chapter_query.all():
+        chapter_verse_ids[chapter_id].append(verse_id)
+    for chapter_id, _verse_ids in chapter_verse_ids.items():
+        verse_sentences.update(
+            get_chapter_sentences(chapter_id, annotator_ids, _verse_ids)
+        )
+
+    # ----------------------------------------------------------------------- #
+    # annotations of all the boundaries, grouped by boundary_id
+
+    # NOTE: Currently there is no support for multiple word order tasks.
+    # Further, since the word order is used in other tasks to display
+    # tokens, it is straightforward how such support would work, as it
+    # would require a choice of word order task to display order
+    word_orders = get_boundary_rows(
+        WordOrder, boundary_ids, annotator_ids,
+        order_by=[WordOrder.order, WordOrder.id]
+    )
+    text_annotations = (
+        get_boundary_rows(TokenTextAnnotation, boundary_ids, annotator_ids)
+        if TASK_TOKEN_TEXT_ANNOTATION in tasks
+        else defaultdict(list)
+    )
+    token_classifications = (
+        get_boundary_rows(TokenClassification, boundary_ids, annotator_ids)
+        if TASK_TOKEN_CLASSIFICATION in tasks
+        else defaultdict(list)
+    )
+    token_graphs = (
+        get_boundary_rows(TokenGraph, boundary_ids, annotator_ids)
+        if TASK_TOKEN_GRAPH in tasks
+        else defaultdict(list)
+    )
+    token_connections = (
+        get_boundary_rows(TokenConnection, boundary_ids, annotator_ids)
+        if TASK_TOKEN_CONNECTION in tasks
+        else defaultdict(list)
+    )
+    sentence_classifications = (
+        get_boundary_rows(SentenceClassification, boundary_ids, annotator_ids)
+        if TASK_SENTENCE_CLASSIFICATION in tasks
+        else defaultdict(list)
+    )
+    # NOTE: We show connections that at the src_boundary_id
+    sentence_graphs = (
+        get_boundary_rows(
+            SentenceGraph, boundary_ids, annotator_ids,
+            boundary_column="src_boundary_id"
+        )
+        if TASK_SENTENCE_GRAPH in tasks
+        else defaultdict(list)
+    )
+
+    # destination boundaries of sentence graph may lie outside `verse_ids`
+    outside_boundary_ids = {
+        sentrel.dst_boundary_id
+        for sentrels in sentence_graphs.values()
+        for sentrel in sentrels
+        if sentrel.dst_boundary_id not in boundary_verse_ids
+    }
+    if outside_boundary_ids:
+        boundary_verse_ids.update(
+            db.session.query(Boundary.id, Boundary.verse_id).filter(
+                Boundary.id.in_(outside_boundary_ids)
+            ).all()
+        )
+
+    # TODO: Need better heuristic management.
+    # One option is to connect TASK_ID to heuristic functions
+    # This mapping needs to be dynamic though? Since the task_ids would be
+    # decided based on the order in which tasks are added.
+
+    # The following assumes a single TOKEN_GRAPH task, else the dictionary
+    # might not work well since there might be common labels across tasks
+    # and their ID will get overwritten
+
+    token_relation_map = {}
+    if TASK_TOKEN_GRAPH in tasks:
+        token_relation_map = TASK_REGISTRY.token_relation_map
+
+    # precomputed heuristic suggestions (see `get_heuristic_inputs()`)
+    heuristic_suggestions = (
+        get_heuristic_suggestions(boundary_ids)
+        if TASK_WORD_ORDER in tasks or TASK_TOKEN_GRAPH in tasks
+        else {}
+    )
+    # heuristics computed on the fly are limited by the token cap and the
+    # time budget (`heuristic` settings), which applies to this call
+    heuristic_budget = HeuristicBudget()
+
+    # NOTE: heuristic word order is computed for all the sentences (without an
+    # annotated word order) in a single batch, after the boundary loop
+    unordered_sentences = {}
+
     # ----------------------------------------------------------------------- #
     # boundary specific data - BEGIN
-    for boundary in boundary_query.all():
+    for boundary in boundaries:
         verse_id = boundary.verse_id
         data[verse_id][TASK_SENTENCE_BOUNDARY][boundary.id] = {
             "id": boundary.id,
@@ -703,18 +1115,11 @@ def get_verse_data(
             "annotator": boundary.annotator.username,
         }
 
-        data[verse_id]["sentences"] = get_sentences(verse_id, annotator_ids)
+        if not data[verse_id]["sentences"]:
+            data[verse_id]["sentences"] = verse_sentences.get(verse_id, {})
 
-        # NOTE: Currently there is no support for multiple word order tasks.
-        # Further, since the word order is used in other tasks to display
-        # tokens, it is straightforward how such support would work, as it
-        # would require a choice of word order task to display order
-        word_order_query = WordOrder.query.filter(
-            WordOrder.boundary_id == boundary.id,
-            WordOrder.annotator_id.in_(annotator_ids)
-        ).order_by(WordOrder.order)
         annotated_word_order = [
-            a.token_id for a in word_order_query.all()
+            a.token_id for a in word_orders[boundary.id]
         ]
         verse_word_order = list(
             data[verse_id]["sentences"][boundary.id]
@@ -722,15 +1127,10 @@ def get_verse_data(
         # if word_order doesn't exist, apply heuristic
         if not annotated_word_order:
             display_word_order = verse_word_order
-            if word_order_task_active:
-                heuristic_word_order = get_word_order(
+            if TASK_WORD_ORDER in tasks:
+                unordered_sentences[(verse_id, boundary.id)] = (
                     data[verse_id]["sentences"][boundary.id]
                 )
-            else:
-                heuristic_word_order = verse_word_order
-            data[verse_id]["heuristics"][TASK_WORD_ORDER][boundary.id] = (
-                heuristic_word_order
-            )
         else:
             display_word_order = annotated_word_order
         data[verse_id][TASK_WORD_ORDER][boundary.id] = display_word_order
@@ -739,11 +1139,6 @@ def get_verse_data(
 
         # ------------------------------------------------------------------- #
 
-        text_annotation_query = TokenTextAnnotation.query.filter(
-            TokenTextAnnotation.boundary_id == boundary.id,
-            TokenTextAnnotation.annotator_id.in_(annotator_ids)
-        )
-
         data[verse_id][TASK_TOKEN_TEXT_ANNOTATION].extend([
             {
                 "id": text_annotation.id,
@@ -754,16 +1149,11 @@ def get_verse_data(
                 "annotator_id": text_annotation.annotator_id,
                 "is_deleted": text_annotation.is_deleted
             }
-            for text_annotation in text_annotation_query.all()
+            for text_annotation in text_annotations[boundary.id]
         ])
 
         # ------------------------------------------------------------------- #
 
-        token_classification_query = TokenClassification.query.filter(
-            TokenClassification.boundary_id == boundary.id,
-            TokenClassification.annotator_id.in_(annotator_ids)
-        )
-
         data[verse_id][TASK_TOKEN_CLASSIFICATION].extend([
             {
                 "id": tokclf.id,
@@ -774,16 +1164,11 @@ def get_verse_data(
                 "annotator_id": tokclf.annotator_id,
                 "is_deleted": tokclf.is_deleted
             }
-            for tokclf in token_classification_query.all()
+            for tokclf in token_classifications[boundary.id]
         ])
 
         # ------------------------------------------------------------------- #
 
-        token_graph_query = TokenGraph.query.filter(
-            TokenGraph.boundary_id == boundary.id,
-            TokenGraph.annotator_id.in_(annotator_ids)
-        )
-
         data[verse_id][TASK_TOKEN_GRAPH].extend([
             {
                 "id": tokrel.id,
@@ -795,7 +1180,7 @@ def get_verse_data(
                 "annotator_id": tokrel.annotator_id,
                 "is_deleted": tokrel.is_deleted
             }
-            for tokrel in token_graph_query.all()
+            for tokrel in token_graphs[boundary.id]
         ])
 
         # NOTE: Do we pass task_id to get_token_graph()
@@ -805,66 +1190,44 @@ def get_verse_data(
         # Other alternative could be to have separate heuristic functions for
         # every token graph task, but managing that might be harder!
 
-        sentence_tokens = data[verse_id]["sentences"][boundary.id]
-        used_tokens = {
-            _token_id: sentence_tokens[_token_id]
-            for _token_id in data[verse_id][TASK_WORD_ORDER][boundary.id]
-            if _token_id in sentence_tokens
-        }
-
-        # TODO: Need better heuristic management.
-        # One option is to connect TASK_ID to heuristic functions
-        # This mapping needs to be dynamic though? Since the task_ids would be
-        # decided based on the order in which tasks are added.
-
-        # The following assumes a single TOKEN_GRAPH task, else the dictionary
-        # might not work well since there might be common labels across tasks
-        # and their ID will get overwritten
-
-        # Further, this relation map can be generated outside the verse loop,
-        # so that it's calculated only once per function call instead of once
-        # per boundary
-
-        token_relation_label_query = TokenRelationLabel.query.filter(
-            TokenRelationLabel.is_deleted == False  # noqa
-        )
-        token_relation_map = {
-            token_relation_label.label: token_relation_label.id
-            for token_relation_label in token_relation_label_query.all()
-        }
+        if TASK_TOKEN_GRAPH in tasks:
+            sentence_tokens = data[verse_id]["sentences"][boundary.id]
+            used_tokens = {
+                _token_id: sentence_tokens[_token_id]
+                for _token_id in data[verse_id][TASK_WORD_ORDER][boundary.id]
+                if _token_id in sentence_tokens
+            }
 
-        data[verse_id]["heuristics"][TASK_TOKEN_GRAPH].extend(
-            get_token_graph(used_tokens, boundary.id, token_relation_map)
-        )
+            data[verse_id]["heuristics"][TASK_TOKEN_GRAPH].extend(
+                get_token_graph_cached(
+                    used_tokens, boundary.id, token_relation_map,
+                    precomputed=heuristic_suggestions,
+                    budget=heuristic_budget
+                )
+            )
+            if heuristic_budget.is_degraded(TASK_TOKEN_GRAPH, boundary.id):
+                data[verse_id]["heuristics_degraded"][TASK_TOKEN_GRAPH].append(
+                    boundary.id
+                )
 
         # ------------------------------------------------------------------- #
 
-        token_connection_query = TokenConnection.query.filter(
-            TokenConnection.boundary_id == boundary.id,
-            TokenConnection.annotator_id.in_(annotator_ids)
-        )
-
         data[verse_id][TASK_TOKEN_CONNECTION].extend([
             {
                 "id": token_connection.id,
                 "task_id": token_connection.task_id,
                 "boundary_id": token_connection.boundary_id,
-                "verse_id": token_connection.boundary.verse_id,
+                "verse_id": boundary_verse_ids[token_connection.boundary_id],
                 "src_id": token_connection.src_id,
                 "dst_id": token_connection.dst_id,
                 "annotator_id": token_connection.annotator_id,
                 "is_deleted": token_connection.is_deleted
             }
-            for token_connection in token_connection_query.all()
+            for token_connection in token_connections[boundary.id]
         ])
 
         # ------------------------------------------------------------------- #
 
-        sentence_classification_query = SentenceClassification.query.filter(
-            SentenceClassification.boundary_id == boundary.id,
-            SentenceClassification.annotator_id.in_(annotator_ids)
-        )
-
         data[verse_id][TASK_SENTENCE_CLASSIFICATION].extend([
             {
                 "id": sentclf.id,
@@ -874,217 +1237,1051 @@ def get_verse_data(
                 "annotator_id": sentclf.annotator_id,
                 "is_deleted": sentclf.is_deleted
             }
-            for sentclf in sentence_classification_query.all()
+            for sentclf in sentence_classifications[boundary.id]
         ])
 
         # ------------------------------------------------------------------- #
 
-        # NOTE: We show connections that at the src_boundary_id
-        sentence_graph_query = SentenceGraph.query.filter(
-            SentenceGraph.src_boundary_id == boundary.id,
-            SentenceGraph.annotator_id.in_(annotator_ids)
-        )
-
         data[verse_id][TASK_SENTENCE_GRAPH].extend([
             {
                 "id": sentrel.id,
                 "task_id": sentrel.task_id,
                 "src_boundary_id": sentrel.src_boundary_id,
-                "src_verse_id": sentrel.src_boundary.verse_id,
+                "src_verse_id": boundary_verse_ids[sentrel.src_boundary_id],
                 "src_token_id": sentrel.src_token_id,
                 "dst_boundary_id": sentrel.dst_boundary_id,
-                "dst_verse_id": sentrel.dst_boundary.verse_id,
+                "dst_verse_id": boundary_verse_ids[sentrel.dst_boundary_id],
                 "dst_token_id": sentrel.dst_token_id,
                 "label_id": sentrel.label_id,
                 "relation_type": sentrel.relation_type,
                 "annotator_id": sentrel.annotator_id,
                 "is_deleted": sentrel.is_deleted
             }
-            for sentrel in sentence_graph_query.all()
+            for sentrel in sentence_graphs[boundary.id]
         ])
 
         # ------------------------------------------------------------------- #
 
     # boundary specific data - END
     # ----------------------------------------------------------------------- #
+
+    heuristic_word_orders = get_word_order_batch_cached(
+        unordered_sentences,
+        precomputed=heuristic_suggestions,
+        budget=heuristic_budget
+    )
+    for (verse_id, boundary_id), word_order in heuristic_word_orders.items():
+        data[verse_id]["heuristics"][TASK_WORD_ORDER][boundary_id] = word_order
+    for verse_id, boundary_id in heuristic_budget.degraded[TASK_WORD_ORDER]:
+        data[verse_id]["heuristics_degraded"][TASK_WORD_ORDER].append(
+            boundary_id
+        )
+
     return data
 
 
-def get_sentences(
-    verse_id: int, annotator_ids: List[int] = None,
-) -> Dict[int, Dict[int, Token]]:
-    """Get sentences (a list of tokens) that end on the specific line
+def iter_verse_data(
+    verse_ids: List[int],
+    annotator_ids: List[int] = None,
+    tasks: List[str] = None,
+    chunk_size: int = 10,
+) -> Iterator[dict]:
+    """Iterate over Verse Data
+
+    Generator version of `get_verse_data()`, which computes the data in
+    chunks of verses, so that only a single chunk is held in memory at a time.
 
     Parameters
     ----------
-    verse_id : int
-        Verse ID
-    annotator_id : List[int]
-        Annotator IDs
+    verse_ids : List[int]
+        List of verse IDs
+    annotator_ids : List[int], optional
+        List of user IDs of annotators
+        If None, annotations by all the users will be fetched.
+        The default is None.
+    tasks : List[str], optional
+        Task categories to fetch (see `get_verse_data()`)
+        If None, all the task categories are fetched.
+        The default is None.
+    chunk_size : int, optional
+        Number of verses computed together.
+        The default is 10.
+
+    Yields
+    ------
+    dict
+        Verse data of a single verse
+    """
+    verse_ids = list(verse_ids)
+    for idx in range(0, len(verse_ids), chunk_size):
+        chunk_verse_ids = verse_ids[idx:idx + chunk_size]
+        chunk_data = get_verse_data(chunk_verse_ids, annotator_ids, tasks)
+        for verse_id in chunk_verse_ids:
+            if verse_id in chunk_data:
+                yield chunk_data[verse_id]
+
+
+def is_verse_data_degraded(verses: Iterable[dict]) -> bool:
+    """Check if a heuristic of any of the verses was degraded
+
+    Degraded heuristics (see `HeuristicBudget`) are recomputed on a later
+    request, so such data should neither be cached nor validated.
+
+    Parameters
+    ----------
+    verses : Iterable[dict]
+        Verse data objects, e.g. values of the output of `get_verse_data()`
 
     Returns
     -------
-    Dict[int, Dict[int, Token]]
-        Dictionary
-        * `Boundary.id`s (also corresponding to sentences) as keys
-        * Dictionary of (token_id, tokens) in the sentences as values
+    bool
+        True, if any of the verses has a degraded heuristic
     """
-    sentences = {}
+    return any(
+        boundary_ids
+        for verse in verses
+        for boundary_ids in verse["heuristics_degraded"].values()
+    )
 
-    sentence_boundary_task_active = Task.query.filter(
-        Task.category == TASK_SENTENCE_BOUNDARY,
-        Task.is_deleted == False  # noqa
-    ).one_or_none()
-    word_order_task_active = Task.query.filter(
-        Task.category == TASK_WORD_ORDER,
-        Task.is_deleted == False  # noqa
-    ).one_or_none()
 
-    boundary_annotator_ids = (
-        annotator_ids
-        if sentence_boundary_task_active
-        else [AUTO_ANNOTATION_USER_ID]
-    )
-    token_annotator_ids = (
-        annotator_ids
-        if word_order_task_active
-        else [AUTO_ANNOTATION_USER_ID]
-    )
+def get_verse_delta(
+    verse_id: int,
+    annotator_ids: List[int] = None,
+    since: dt.datetime = None,
+    tasks: List[str] = None,
+) -> dict:
+    """Get the task sections of a verse that changed since a version
 
-    # get first token from the chapter the verse_id belongs to
-    verse = Verse.query.get(verse_id)
+    A task section is considered changed if any of its rows have been
+    updated, or a submit has been recorded for a task of that category,
+    after `since`. A change in sentence boundaries affects every other
+    section, and therefore results in the entire verse data being returned.
 
-    chapter_id = verse.chapter_id
-    chapter_first_verse = Verse.query.filter(
-        Verse.chapter_id == chapter_id
-    ).order_by(Verse.id).first()
-    chapter_first_line = Line.query.filter(
-        Line.verse_id == chapter_first_verse.id
-    ).order_by(Line.id).first()
-    chapter_first_token = Token.query.filter(
-        Token.line_id == chapter_first_line.id
-    ).order_by(Token.id).first()
-
-    verse_first_token = Token.query.filter(
-        Token.line.has(Line.verse_id == verse_id)
-    ).order_by(Token.id).first()
-
-    # boundaries present in the current verse
-    boundaries = Boundary.query.filter(
-        Boundary.verse_id == verse_id,
-        Boundary.annotator_id.in_(boundary_annotator_ids),
-    ).order_by(Boundary.token_id).all()
+    Parameters
+    ----------
+    verse_id : int
+        Verse ID
+    annotator_ids : List[int], optional
+        List of user IDs of annotators
+        The default is None.
+    since : datetime, optional
+        Version of the verse data available with the client
+        (`version` field of the verse data or of an earlier delta)
+        If None, the entire verse data is returned.
+        The default is None.
+    tasks : List[str], optional
+        Task categories of interest.
+        If None, all the task categories are considered.
+        The default is None.
 
-    if not boundaries:
-        return sentences
+    Returns
+    -------
+    dict
+        Delta, containing
+        * `verse_id`
+        * `since` and `version`: versions before and after the delta
+        * `full`: whether `data` is the entire verse data
+        * `tasks`: changed task categories
+        * `data`: changed sections of the verse data (along with their
+          heuristics, progress and version)
+    """
+    annotator_ids = annotator_ids or []
+    tasks = set(TASK_CATEGORY_LIST if tasks is None else tasks)
+    task_table_models = {
+        TASK_SENTENCE_BOUNDARY: Boundary,
+        TASK_WORD_ORDER: WordOrder,
+        TASK_TOKEN_TEXT_ANNOTATION: TokenTextAnnotation,
+        TASK_TOKEN_CLASSIFICATION: TokenClassification,
+        TASK_TOKEN_GRAPH: TokenGraph,
+        TASK_TOKEN_CONNECTION: TokenConnection,
+        TASK_SENTENCE_CLASSIFICATION: SentenceClassification,
+        TASK_SENTENCE_GRAPH: SentenceGraph
+    }
 
-    # previous boundary, which serves as the starting point
-    # of the first boundary in the current line
-    previous_boundary = Boundary.query.filter(
-        Boundary.verse_id < verse_id,
-        Boundary.annotator_id.in_(boundary_annotator_ids),
-    ).order_by(Boundary.token_id.desc()).first()
+    # ----------------------------------------------------------------------- #
+    # latest update of every task table and of the submits
 
-    previous_boundary_token_id = (
-        previous_boundary.token_id
-        if (
-            previous_boundary is not None and
-            previous_boundary.verse_id >= chapter_first_verse.id
+    boundary_id_query = db.session.query(Boundary.id).filter(
+        Boundary.verse_id == verse_id
+    )
+    latest_update_queries = []
+    for category, model in task_table_models.items():
+        if model is Boundary:
+            criteria = [Boundary.verse_id == verse_id]
+        elif model is SentenceGraph:
+            criteria = [SentenceGraph.src_boundary_id.in_(boundary_id_query)]
+        else:
+            criteria = [model.boundary_id.in_(boundary_id_query)]
+        latest_update_queries.append(
+            db.session.query(func.max(model.updated_at)).filter(
+                *criteria,
+                model.annotator_id.in_(annotator_ids)
+            ).scalar_subquery()
         )
-        else chapter_first_token.id - 1
+    latest_update_queries.append(
+        db.session.query(func.max(SubmitLog.updated_at)).filter(
+            SubmitLog.verse_id == verse_id,
+            SubmitLog.annotator_id.in_(annotator_ids)
+        ).scalar_subquery()
     )
+    latest_updates = db.session.query(*latest_update_queries).one()
+
+    versions = [_update for _update in latest_updates if _update is not None]
+    version = max(versions) if versions else since
+
     # ----------------------------------------------------------------------- #
+    # changed task categories
 
-    extra_tokens = Token.query.filter(
-        Token.line.has(Line.verse_id == verse_id),
-        Token.annotator_id.in_(token_annotator_ids)
-    ).all()
-    sentences["extra"] = {
-        token.id: {
-            "id": token.id,
-            "inner_id": token.inner_id,
-            "line_id": token.line_id,
-            "verse_id": verse_id,
-            "text": token.text,
-            "lemma": token.lemma,
-            "analysis": token.analysis,
-            "annotator_id": token.annotator_id
+    if since is None:
+        changed = set(TASK_CATEGORY_LIST)
+    else:
+        changed = {
+            category
+            for category, latest_update in zip(
+                task_table_models, latest_updates
+            )
+            if latest_update is not None and latest_update > since
         }
-        for token in extra_tokens
+        submit_query = db.session.query(Task.category).join(
+            SubmitLog
+        ).filter(
+            SubmitLog.verse_id == verse_id,
+            SubmitLog.annotator_id.in_(annotator_ids),
+            SubmitLog.updated_at > since
+        ).distinct()
+        changed.update(category for category, in submit_query.all())
+
+    full = TASK_SENTENCE_BOUNDARY in changed
+    if full:
+        changed = set(TASK_CATEGORY_LIST)
+    else:
+        # token graph heuristic depends on the word order
+        if TASK_WORD_ORDER in changed:
+            changed.add(TASK_TOKEN_GRAPH)
+        changed.intersection_update(tasks)
+
+    delta = {
+        "verse_id": verse_id,
+        "since": since.isoformat() if since is not None else None,
+        "version": version.isoformat() if version is not None else None,
+        "full": full,
+        "tasks": [
+            category
+            for category in TASK_CATEGORY_LIST
+            if category in changed
+        ],
+        "data": {}
     }
+    if not full and not changed:
+        return delta
+
+    verse_data = get_verse_data(
+        [verse_id], annotator_ids, tasks=changed
+    ).get(verse_id)
+    if verse_data is None:
+        return delta
+
+    verse_data["version"] = delta["version"]
+    if full:
+        delta["data"] = verse_data
+    else:
+        delta["data"] = {
+            **{
+                category: verse_data[category]
+                for category in delta["tasks"]
+            },
+            "heuristics": {
+                category: verse_data["heuristics"][category]
+                for category in delta["tasks"]
+                if category in verse_data["heuristics"]
+            },
+            "heuristics_degraded": {
+                category: verse_data["heuristics_degraded"][category]
+                for category in delta["tasks"]
+                if category in verse_data["heuristics_degraded"]
+            },
+            "progress": verse_data["progress"],
+            "revisions": verse_data["revisions"],
+            "version": verse_data["version"]
+        }
+    return delta
 
-    # ----------------------------------------------------------------------- #
-    # TODO: If too many tokens, emit error? / consider first token of verse?
 
+def get_boundary_rows(
+    model,
+    boundary_ids: List[int],
+    annotator_ids: List[int],
+    boundary_column: str = "boundary_id",
+    order_by: list = None,
+) -> Dict[int, list]:
+    """Get annotation rows of several boundaries using a single query
+
+    Parameters
+    ----------
+    model : db.Model
+        Annotation model (e.g. `TokenGraph`)
+    boundary_ids : List[int]
+        Boundary IDs
+    annotator_ids : List[int]
+        Annotator IDs
+    boundary_column : str, optional
+        Name of the column referring to the boundary.
+        The default is "boundary_id".
+    order_by : list, optional
+        Order of rows within a boundary.
+        If None, rows are ordered by their ID.
+        The default is None.
+
+    Returns
+    -------
+    Dict[int, list]
+        Rows grouped by the value of `boundary_column`
+    """
+    boundary_attribute = getattr(model, boundary_column)
+    order_by = order_by or [model.id]
+    query = model.query.filter(
+        boundary_attribute.in_(boundary_ids),
+        model.annotator_id.in_(annotator_ids)
+    ).order_by(*order_by)
+
+    rows = defaultdict(list)
+    for row in query.all():
+        rows[getattr(row, boundary_column)].append(row)
+    return rows
+
+
+def get_chapter_sentences(
+    chapter_id: int,
+    annotator_ids: List[int] = None,
+    verse_ids: List[int] = None,
+) -> Dict[int, Dict[int, Dict[int, Token]]]:
+    """Get sentences of all the verses from a chapter
+
+    Tokens and boundaries of the chapter are loaded once and split into
+    sentences with a single sweep over the boundaries ordered by token.
+
+    Parameters
+    ----------
+    chapter_id : int
+        Chapter ID
+    annotator_ids : List[int]
+        Annotator IDs
+    verse_ids : List[int], optional
+        If provided, only the sentences of these verses are resolved.
+        The default is None.
+
+    Returns
+    -------
+    Dict[int, Dict[int, Dict[int, Token]]]
+        Dictionary
+        * `Verse.id`s as keys
+        * Sentences of the verse (as returned by `get_sentences()`) as values
+    """
+    annotator_ids = annotator_ids or []
+    chapter_sentences = {}
+
+    sentence_boundary_task_active = TASK_REGISTRY.is_active(
+        TASK_SENTENCE_BOUNDARY
+    )
+    word_order_task_active = TASK_REGISTRY.is_active(TASK_WORD_ORDER)
+
+    boundary_annotator_ids = (
+        annotator_ids
+        if sentence_boundary_task_active
+        else [AUTO_ANNOTATION_USER_ID]
+    )
+    token_annotator_ids = (
+        annotator_ids
+        if word_order_task_active
+        else [AUTO_ANNOTATION_USER_ID]
+    )
+
+    chapter_verse_ids = [
+        verse_id
+        for verse_id, in db.session.query(Verse.id).filter(
+            Verse.chapter_id == chapter_id
+        ).order_by(Verse.id).all()
+    ]
+    if not chapter_verse_ids:
+        return chapter_sentences
+
+    required_verse_ids = set(
+        chapter_verse_ids if verse_ids is None else verse_ids
+    ).intersection(chapter_verse_ids)
+
+    chapter_first_verse_id = chapter_verse_ids[0]
+    chapter_last_verse_id = chapter_verse_ids[-1]
+    chapter_first_token = Token.query.join(Line).filter(
+        Line.verse_id == chapter_first_verse_id
+    ).order_by(Line.id, Token.id).first()
+
+    # ----------------------------------------------------------------------- #
+    # boundaries
+
+    # NOTE: boundaries from verses that do not belong to the chapter, but
+    # have an ID within the range of the chapter, can still act as the
+    # previous boundary of a verse
+    boundaries = Boundary.query.filter(
+        Boundary.verse_id >= chapter_first_verse_id,
+        Boundary.verse_id <= chapter_last_verse_id,
+        Boundary.annotator_id.in_(boundary_annotator_ids),
+    ).order_by(Boundary.token_id, Boundary.id).all()
+
+    # last boundary before the chapter
+    # NOTE: it never acts as a starting point, but it may have a higher
+    # token_id than the boundaries from the chapter (e.g. custom tokens)
+    outside_boundary = Boundary.query.filter(
+        Boundary.verse_id < chapter_first_verse_id,
+        Boundary.annotator_id.in_(boundary_annotator_ids),
+    ).order_by(Boundary.token_id.desc()).first()
+    outside_boundary_token_id = (
+        outside_boundary.token_id
+        if outside_boundary is not None
+        else None
+    )
+
+    verse_boundaries = defaultdict(list)
+    for boundary in boundaries:
+        if boundary.verse_id in required_verse_ids:
+            verse_boundaries[boundary.verse_id].append(boundary)
+
+    if not verse_boundaries:
+        return chapter_sentences
+
+    # previous boundary, which serves as the starting point
+    # of the first boundary in each verse
+    fallback_token_id = chapter_first_token.id - 1
+    verse_last_token_id = {}
     for boundary in boundaries:
-        tokens = Token.query.filter(
-            Token.id > previous_boundary_token_id,
-            Token.id <= boundary.token_id
-        ).order_by(Token.id).all()
+        verse_last_token_id[boundary.verse_id] = boundary.token_id
+
+    verse_start_token_id = {}
+    previous_token_id = None
+    for verse_id in sorted(verse_last_token_id):
+        if verse_id in verse_boundaries:
+            if (
+                previous_token_id is None or (
+                    outside_boundary_token_id is not None and
+                    outside_boundary_token_id > previous_token_id
+                )
+            ):
+                verse_start_token_id[verse_id] = fallback_token_id
+            else:
+                verse_start_token_id[verse_id] = previous_token_id
+        if verse_id in verse_last_token_id:
+            previous_token_id = max(
+                filter(None, [previous_token_id, verse_last_token_id[verse_id]])
+            )
+
+    # ----------------------------------------------------------------------- #
+    # tokens
 
-        sentences[boundary.id] = {
+    start_token_id = min(verse_start_token_id.values())
+    end_token_id = max(
+        boundary.token_id
+        for _boundaries in verse_boundaries.values()
+        for boundary in _boundaries
+    )
+    tokens = Token.query.filter(
+        Token.id > start_token_id,
+        Token.id <= end_token_id
+    ).order_by(Token.id).all()
+    token_ids = [token.id for token in tokens]
+
+    extra_tokens = defaultdict(list)
+    extra_token_query = db.session.query(Token, Line.verse_id).join(
+        Line
+    ).filter(
+        Line.verse_id.in_(verse_boundaries),
+        Token.annotator_id.in_(token_annotator_ids)
+    ).order_by(Token.id)
+    for token, verse_id in extra_token_query.all():
+        extra_tokens[verse_id].append(token)
+
+    # ----------------------------------------------------------------------- #
+    # TODO: If too many tokens, emit error? / consider first token of verse?
+
+    for verse_id, _boundaries in verse_boundaries.items():
+        sentences = {}
+        sentences["extra"] = {
             token.id: {
                 "id": token.id,
                 "inner_id": token.inner_id,
-                "sentence_id": boundary.id,
-                "boundary_id": boundary.id,
-                "order": token.order,
+                "line_id": token.line_id,
+                "verse_id": verse_id,
                 "text": token.text,
                 "lemma": token.lemma,
                 "analysis": token.analysis,
                 "annotator_id": token.annotator_id
             }
-            for token in tokens
+            for token in extra_tokens[verse_id]
         }
-        previous_boundary_token_id = boundary.token_id
 
-    return sentences
+        previous_boundary_token_id = verse_start_token_id[verse_id]
+        for boundary in _boundaries:
+            start_idx = bisect_right(token_ids, previous_boundary_token_id)
+            end_idx = bisect_right(token_ids, boundary.token_id)
+            sentences[boundary.id] = {
+                token.id: {
+                    "id": token.id,
+                    "inner_id": token.inner_id,
+                    "sentence_id": boundary.id,
+                    "boundary_id": boundary.id,
+                    "order": token.order,
+                    "text": token.text,
+                    "lemma": token.lemma,
+                    "analysis": token.analysis,
+                    "annotator_id": token.annotator_id
+                }
+                for token in tokens[start_idx:end_idx]
+            }
+            previous_boundary_token_id = boundary.token_id
+
+        chapter_sentences[verse_id] = sentences
+
+    return chapter_sentences
+
+
+def get_sentences(
+    verse_id: int, annotator_ids: List[int] = None,
+) -> Dict[int, Dict[int, Token]]:
+    """Get sentences (a list of tokens) that end on the specific line
+
+    Parameters
+    ----------
+    verse_id : int
+        Verse ID
+    annotator_id : List[int]
+        Annotator IDs
+
+    Returns
+    -------
+    Dict[int, Dict[int, Token]]
+        Dictionary
+        * `Boundary.id`s (also corresponding to sentences) as keys
+        * Dictionary of (token_id, tokens) in the sentences as values
+    """
+    verse = Verse.query.get(verse_id)
+    return get_chapter_sentences(
+        verse.chapter_id, annotator_ids, verse_ids=[verse_id]
+    ).get(verse_id, {})
+
+
+def get_verse_fingerprint(
+    verse_ids: List[int],
+    annotator_ids: List[int] = None,
+) -> str:
+    """Get a fingerprint of the data of a list of verses
+
+    The fingerprint is a digest of (count, max(id), max(updated_at))
+    aggregates over tokens, boundaries, annotation tables, submits and
+    precomputed heuristic suggestions of the verses, along with the state of
+    tasks and token relation labels, and the heuristic configuration.
+    It changes whenever the output of `get_verse_data()` may change, and is
+    considerably cheaper to compute.
+
+    Parameters
+    ----------
+    verse_ids : List[int]
+        List of verse IDs
+        (contiguous, e.g. a single verse or a window of a chapter)
+    annotator_ids : List[int], optional
+        List of user IDs of annotators
+        The default is None.
+
+    Returns
+    -------
+    str
+        Fingerprint
+    """
+    annotator_ids = annotator_ids or []
+    verse_ids = list(verse_ids)
+    boundary_annotator_ids = annotator_ids + [AUTO_ANNOTATION_USER_ID]
+
+    boundary_id_query = db.session.query(Boundary.id).filter(
+        Boundary.verse_id.in_(verse_ids)
+    )
+
+    def aggregate(model, *criteria):
+        columns = [func.count(model.id), func.max(model.id)]
+        if hasattr(model, "updated_at"):
+            columns.append(func.max(model.updated_at))
+        return [
+            db.session.query(column).filter(*criteria).scalar_subquery()
+            for column in columns
+        ]
+
+    aggregates = []
+    aggregates.extend(aggregate(
+        Token,
+        Token.line_id.in_(
+            db.session.query(Line.id).filter(Line.verse_id.in_(verse_ids))
+        )
+    ))
+    aggregates.extend(aggregate(
+        Boundary,
+        Boundary.verse_id.in_(verse_ids),
+        Boundary.annotator_id.in_(boundary_annotator_ids)
+    ))
+    # first sentence of a verse starts after the previous boundary
+    aggregates.append(
+        db.session.query(func.max(Boundary.token_id)).filter(
+            Boundary.verse_id < min(verse_ids, default=0),
+            Boundary.annotator_id.in_(boundary_annotator_ids)
+        ).scalar_subquery()
+    )
+    for model in [
+        WordOrder,
+        TokenTextAnnotation,
+        TokenClassification,
+        TokenGraph,
+        TokenConnection,
+        SentenceClassification,
+    ]:
+        aggregates.extend(aggregate(
+            model,
+            model.boundary_id.in_(boundary_id_query),
+            model.annotator_id.in_(annotator_ids)
+        ))
+    aggregates.extend(aggregate(
+        SentenceGraph,
+        SentenceGraph.src_boundary_id.in_(boundary_id_query),
+        SentenceGraph.annotator_id.in_(annotator_ids)
+    ))
+    aggregates.extend(aggregate(
+        SubmitLog,
+        SubmitLog.verse_id.in_(verse_ids),
+        SubmitLog.annotator_id.in_(annotator_ids)
+    ))
+    aggregates.extend(aggregate(
+        HeuristicSuggestion,
+        HeuristicSuggestion.boundary_id.in_(boundary_id_query),
+        HeuristicSuggestion.version == HEURISTIC_VERSION
+    ))
+    aggregates.extend(aggregate(
+        TokenRelationLabel,
+        TokenRelationLabel.is_deleted == False  # noqa
+    ))
+
+    fingerprint = [
+        tuple(verse_ids),
+        tuple(annotator_ids),
+        tuple(db.session.query(*aggregates).one()),
+        tuple(
+            db.session.query(
+                Task.id, Task.order, Task.is_deleted
+            ).order_by(Task.id).all()
+        ),
+        get_heuristic_fingerprint(),
+    ]
+    return hashlib.sha1(repr(fingerprint).encode()).hexdigest()
+
+
+###############################################################################
+# Heuristic Suggestions
+
+
+def get_heuristic_inputs(
+    chapter_id: int,
+    annotator_id: int
+) -> Dict[str, Dict[int, Dict[int, Dict]]]:
+    """Inputs of the heuristics for the sentences of a chapter
+
+    Mirrors the heuristic inputs of `get_verse_data()`, as seen by the
+    annotator who marked the boundaries.
+
+    Parameters
+    ----------
+    chapter_id : int
+        Chapter ID
+    annotator_id : int
+        Annotator ID (of the boundaries)
+
+    Returns
+    -------
+    Dict[str, Dict[int, Dict[int, Dict]]]
+        Dictionary
+        * Task categories (word order and token graph) as keys
+        * Dictionary of (boundary_id, token_list) as values
+    """
+    chapter_sentences = get_chapter_sentences(chapter_id, [annotator_id])
+    # NOTE: "extra" tokens (added after the last boundary) are not a sentence
+    sentences = {
+        boundary_id: sentence_tokens
+        for verse_sentences in chapter_sentences.values()
+        for boundary_id, sentence_tokens in verse_sentences.items()
+        if boundary_id != "extra"
+    }
+    word_orders = get_boundary_rows(
+        WordOrder, list(sentences), [annotator_id],
+        order_by=[WordOrder.order, WordOrder.id]
+    )
+
+    inputs = {
+        TASK_WORD_ORDER: {},
+        TASK_TOKEN_GRAPH: {},
+    }
+    for boundary_id, sentence_tokens in sentences.items():
+        annotated_word_order = [
+            word_order.token_id for word_order in word_orders[boundary_id]
+        ]
+        if annotated_word_order:
+            display_word_order = annotated_word_order
+        else:
+            display_word_order = list(sentence_tokens)
+            inputs[TASK_WORD_ORDER][boundary_id] = sentence_tokens
+
+        inputs[TASK_TOKEN_GRAPH][boundary_id] = {
+            _token_id: sentence_tokens[_token_id]
+            for _token_id in display_word_order
+            if _token_id in sentence_tokens
+        }
+
+    return {
+        category: category_inputs
+        for category, category_inputs in inputs.items()
+        if TASK_REGISTRY.is_active(category)
+    }
+
+
+def get_heuristic_suggestions(boundary_ids: List[int]) -> Dict[str, Any]:
+    """Precomputed heuristic suggestions of the current heuristic version
+
+    Parameters
+    ----------
+    boundary_ids : List[int]
+        Boundary IDs
+
+    Returns
+    -------
+    Dict[str, Any]
+        Suggestions, keyed by the heuristic cache key
+        (see `utils.heuristic.get_heuristic_key()`)
+    """
+    if not boundary_ids:
+        return {}
+    suggestion_query = db.session.query(
+        HeuristicSuggestion.input_key, HeuristicSuggestion.data
+    ).filter(
+        HeuristicSuggestion.boundary_id.in_(boundary_ids),
+        HeuristicSuggestion.version == HEURISTIC_VERSION
+    )
+    return {
+        input_key: data
+        for input_key, data in suggestion_query.all()
+    }
+
+
+def invalidate_heuristic_suggestions(boundary_ids: List[int]) -> int:
+    """Delete heuristic suggestions of the boundaries
+
+    NOTE: Does not commit, the change is committed with the annotation.
+
+    Parameters
+    ----------
+    boundary_ids : List[int]
+        Boundary IDs
+
+    Returns
+    -------
+    int
+        Number of deleted suggestions
+    """
+    if not boundary_ids:
+        return 0
+    return HeuristicSuggestion.query.filter(
+        HeuristicSuggestion.boundary_id.in_(boundary_ids)
+    ).delete(synchronize_session=False)
 
 
 ###############################################################################
 # Progress
 
+def join_task_list(task_ids: List[int]) -> str:
+    return ",".join(str(task_id) for task_id in sorted(set(task_ids)))
+
+
+def split_task_list(task_list: str) -> List[int]:
+    return [int(task_id) for task_id in task_list.split(",") if task_id]
+
+
+def update_verse_progress(submits: List[Dict[str, Any]]) -> int:
+    """Add submits to the progress rollup (`VerseProgress`)
+
+    Changes are added to the session, but not committed.
+
+    Parameters
+    ----------
+    submits : List[Dict[str, Any]]
+        Submits, with the keys verse_id, annotator_id, task_id and
+        (optionally) updated_at
+
+    Returns
+    -------
+    int
+        Number of (annotator, verse) pairs updated
+    """
+    if not submits:
+        return 0
+
+    verse_ids = {submit["verse_id"] for submit in submits}
+    annotator_ids = {submit["annotator_id"] for submit in submits}
+    progress = {
+        (verse_progress.annotator_id, verse_progress.verse_id): verse_progress
+        for verse_progress in VerseProgress.query.filter(
+            VerseProgress.verse_id.in_(verse_ids),
+            VerseProgress.annotator_id.in_(annotator_ids)
+        ).all()
+    }
+
+    now = dt.datetime.utcnow()
+    updated = set()
+    for submit in submits:
+        key = (submit["annotator_id"], submit["verse_id"])
+        updated_at = submit.get("updated_at") or now
+        verse_progress = progress.get(key)
+        if verse_progress is None:
+            verse_progress = VerseProgress(
+                annotator_id=submit["annotator_id"],
+                verse_id=submit["verse_id"],
+                task_list="",
+                first_update_at=updated_at,
+            )
+            db.session.add(verse_progress)
+            progress[key] = verse_progress
+        elif not verse_progress.task_list:
+            # created by `claim_verse_revision()`, first submit
+            verse_progress.first_update_at = updated_at
+
+        task_ids = split_task_list(verse_progress.task_list)
+        task_ids.append(submit["task_id"])
+        verse_progress.task_list = join_task_list(task_ids)
+        verse_progress.task_count = len(split_task_list(
+            verse_progress.task_list
+        ))
+        verse_progress.last_update_at = max(
+            verse_progress.last_update_at or updated_at, updated_at
+        )
+        updated.add(key)
+    return len(updated)
+
+
+def get_verse_revision(verse_id: int, annotator_id: int) -> int:
+    """Current revision of the annotations of a verse by an annotator
+
+    Parameters
+    ----------
+    verse_id : int
+        Verse ID
+    annotator_id : int
+        Annotator ID
+
+    Returns
+    -------
+    int
+        Revision (0, if the annotator has not submitted for the verse)
+    """
+    return db.session.query(VerseProgress.revision).filter(
+        VerseProgress.verse_id == verse_id,
+        VerseProgress.annotator_id == annotator_id
+    ).scalar() or 0
+
+
+def claim_verse_revision(
+    verse_id: int,
+    annotator_id: int,
+    revision: int = None
+) -> Tuple[bool, Optional[int]]:
+    """Claim the next revision of the annotations of a verse by an annotator
+
+    The revision (`VerseProgress.revision`) is incremented with a conditional
+    UPDATE, which succeeds only if it still matches the revision that the
+    client has seen, so of the concurrent submits based on the same revision,
+    only the first one succeeds.
+    The change is added to the session, but not committed.
+
+    Parameters
+    ----------
+    verse_id : int
+        Verse ID
+    annotator_id : int
+        Annotator ID
+    revision : int, optional
+        Revision seen by the client
+        If None, the revision is incremented without any check.
+        The default is None.
+
+    Returns
+    -------
+    Tuple[bool, Optional[int]]
+        Whether the revision was claimed, and
+        the claimed revision (or the current revision, if it was not claimed)
+    """
+    criteria = [
+        VerseProgress.verse_id == verse_id,
+        VerseProgress.annotator_id == annotator_id,
+    ]
+    revision_query = db.session.query(VerseProgress.revision).filter(*criteria)
+
+    update_criteria = criteria[:]
+    if revision is not None:
+        update_criteria.append(VerseProgress.revision == revision)
+    updated = VerseProgress.query.filter(*update_criteria).update(
+        {VerseProgress.revision: VerseProgress.revision + 1},
+        synchronize_session="fetch"
+    )
+    if updated:
+        return True, revision_query.scalar()
+
+    current_revision = revision_query.scalar()
+    if current_revision is not None or revision not in [None, 0]:
+        return False, current_revision or 0
+
+    # first submit for the verse by the annotator
+    savepoint = db.session.begin_nested()
+    try:
+        db.session.add(VerseProgress(
+            verse_id=verse_id,
+            annotator_id=annotator_id,
+            task_list="",
+            revision=1,
+        ))
+        savepoint.commit()
+    except IntegrityError:
+        savepoint.rollback()
+        current_revision = revision_query.scalar()
+        if current_revision is None:
+            # not due to a concurrent submit (e.g. invalid verse ID)
+            raise
+        # a concurrent submit has created it first
+        if revision is not None:
+            return False, current_revision
+        return claim_verse_revision(verse_id, annotator_id)
+    return True, 1
+
+
+def backfill_verse_progress() -> int:
+    """Rebuild the progress rollup (`VerseProgress`) from SubmitLog
+
+    Returns
+    -------
+    int
+        Number of (annotator, verse) pairs
+    """
+    submit_query = db.session.query(
+        SubmitLog.annotator_id,
+        SubmitLog.verse_id,
+        SubmitLog.task_id,
+        func.min(
+            func.coalesce(SubmitLog.first_submit_at, SubmitLog.updated_at)
+        ),
+        func.max(SubmitLog.updated_at),
+    ).group_by(
+        SubmitLog.annotator_id, SubmitLog.verse_id, SubmitLog.task_id
+    )
+
+    progress = {}
+    for (
+        annotator_id, verse_id, task_id, first_update_at, last_update_at
+    ) in submit_query.all():
+        key = (annotator_id, verse_id)
+        if key not in progress:
+            progress[key] = {
+                "annotator_id": annotator_id,
+                "verse_id": verse_id,
+                "task_ids": [],
+                "first_update_at": first_update_at,
+                "last_update_at": last_update_at,
+            }
+        verse_progress = progress[key]
+        verse_progress["task_ids"].append(task_id)
+        verse_progress["first_update_at"] = min(
+            verse_progress["first_update_at"], first_update_at
+        )
+        verse_progress["last_update_at"] = max(
+            verse_progress["last_update_at"], last_update_at
+        )
+
+    # NOTE: revisions are retained, so that clients are not forced to reload
+    revisions = dict(
+        ((annotator_id, verse_id), revision)
+        for annotator_id, verse_id, revision in db.session.query(
+            VerseProgress.annotator_id,
+            VerseProgress.verse_id,
+            VerseProgress.revision
+        ).all()
+    )
+
+    VerseProgress.query.delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(VerseProgress, [
+        {
+            "annotator_id": verse_progress["annotator_id"],
+            "verse_id": verse_progress["verse_id"],
+            "task_list": join_task_list(verse_progress["task_ids"]),
+            "task_count": len(set(verse_progress["task_ids"])),
+            "first_update_at": verse_progress["first_update_at"],
+            "last_update_at": verse_progress["last_update_at"],
+            "revision": revisions.get(key, 0),
+        }
+        for key, verse_progress in progress.items()
+    ])
+    db.session.commit()
+    return len(progress)
+
+
 def get_annotation_progress(annotator_ids: List[int] = None) -> Any:
     fetch_all_users = annotator_ids is None
     # ----------------------------------------------------------------------- #
     # progress query
-    # one entry per user per verse
-    progress_query = SubmitLog.query.with_entities(
-        SubmitLog.annotator_id,
+    # one entry per user per verse (from the `VerseProgress` rollup)
+    # NOTE: submits of deleted tasks are left out of task_list and
+    # task_count, but not out of first_update_at and last_update_at
+    progress_query = VerseProgress.query.with_entities(
+        VerseProgress.annotator_id,
         Verse.chapter_id,
-        SubmitLog.verse_id,
-        func.group_concat(SubmitLog.task_id.distinct()).label("task_list"),
-        # NOTE: task_count isn't really required if there's another processing
-        # phase. (`task_count = len(task_list.split(","))`)
-        # processing is currently done on the JS side,
-        # making task_count further unnecessary
-        func.count(SubmitLog.task_id.distinct()).label("task_count"),
-        func.min(SubmitLog.updated_at).label("first_update_at"),
-        func.max(SubmitLog.updated_at).label("last_update_at"),
+        VerseProgress.verse_id,
+        VerseProgress.task_list,
+        VerseProgress.first_update_at,
+        VerseProgress.last_update_at,
     ).filter(
-        True if fetch_all_users else SubmitLog.annotator_id.in_(annotator_ids),
-        Task.is_deleted == False  # noqa
+        True if fetch_all_users else VerseProgress.annotator_id.in_(
+            annotator_ids
+        ),
     ).join(
-        Task, Verse
-    ).group_by(
-        SubmitLog.annotator_id, SubmitLog.verse_id
+        Verse
     ).order_by(
-        SubmitLog.annotator_id, SubmitLog.verse_id, SubmitLog.task_id,
+        VerseProgress.annotator_id, VerseProgress.verse_id
     )
+    active_task_ids = {
+        task_id
+        for task_id, task in TASK_REGISTRY.tasks.items()
+        if not task["is_deleted"]
+    }
     # ----------------------------------------------------------------------- #
     # progress record
     progress_record = defaultdict(lambda: defaultdict(list))
     for row in progress_query.all():
         (
             annotator_id, chapter_id, verse_id,
-            task_list, task_count,
+            task_list,
             first_update_at, last_update_at
         ) = row
+        task_ids = [
+            task_id
+            for task_id in split_task_list(task_list)
+            if task_id in active_task_ids
+        ]
+        if not task_ids:
+            continue
         progress_record[annotator_id][chapter_id].append(
             {
                 "verse_id": verse_id,
-                "task_list": task_list,
-                "task_count": task_count,
+                "task_list": join_task_list(task_ids),
+                # NOTE: task_count isn't really required if there's another
+                # processing phase. (`task_count = len(task_list.split(","))`)
+                # processing is currently done on the JS side,
+                # making task_count further unnecessary
+                "task_count": len(task_ids),
                 "first_update_at": first_update_at,
                 "last_update_at": last_update_at
             }
@@ -1092,12 +2289,12 @@ def get_annotation_progress(annotator_ids: List[int] = None) -> Any:
     # ----------------------------------------------------------------------- #
     # task detail
     task_detail = {
-        task.id: {
-            "title": task.title,
-            "short": task.short,
-            "category": task.category,
+        task_id: {
+            "title": task["title"],
+            "short": task["short"],
+            "category": task["category"],
         }
-        for task in Task.query.all()
+        for task_id, task in TASK_REGISTRY.tasks.items()
     }
     # ----------------------------------------------------------------------- #
     # user detail
@@ -1135,6 +2332,182 @@ def get_annotation_progress(annotator_ids: List[int] = None) -> Any:
     }
 
 
+###############################################################################
+# Submit Log Compaction
+
+
+def compact_submit_logs(
+    before: dt.datetime,
+    archive_path: str,
+    chunk_size: int = 1000
+) -> Dict[str, int]:
+    """Collapse old submit logs into one row per (annotator, verse, task)
+
+    Of every (annotator, verse, task) with more than one submit log older
+    than `before`, the latest row is kept (with the total `submit_count`,
+    the earliest `first_submit_at` and the latest `updated_at`), and the
+    other rows are deleted.
+    Every row that is changed or deleted is appended to the archive
+    (gzip compressed JSON lines) in its original form.
+
+    The rows are processed in chunks, ordered by (annotator, verse, task),
+    and every chunk is committed before its rows are archived, so the memory
+    use does not depend on the size of the table, and the archive contains
+    only the rows whose changes have been committed.
+
+    Parameters
+    ----------
+    before : dt.datetime
+        Only the submit logs updated before this time are compacted.
+    archive_path : str
+        Path of the archive file (`.jsonl.gz`)
+    chunk_size : int, optional
+        Number of rows fetched (and compacted) at once.
+        The default is 1000.
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of archived rows, deleted rows and compacted groups
+    """
+    # NOTE: a chunk must hold at least two rows of a group to make progress
+    chunk_size = max(chunk_size, 2)
+    order_columns = [
+        SubmitLog.annotator_id,
+        SubmitLog.verse_id,
+        SubmitLog.task_id,
+        SubmitLog.id,
+    ]
+    log_query = db.session.query(
+        SubmitLog.id,
+        SubmitLog.annotator_id,
+        SubmitLog.verse_id,
+        SubmitLog.task_id,
+        SubmitLog.submit_count,
+        SubmitLog.first_submit_at,
+        SubmitLog.updated_at,
+    ).filter(
+        SubmitLog.updated_at < before
+    ).order_by(*order_columns)
+
+    def get_group_key(row) -> tuple:
+        return (row.annotator_id, row.verse_id, row.task_id)
+
+    def get_row_key(row) -> tuple:
+        return (*get_group_key(row), row.id)
+
+    result = {
+        "archived": 0,
+        "deleted": 0,
+        "compacted": 0,
+    }
+    archive = None
+    # keyset of the next chunk: (row key, whether the row is included)
+    start = None
+    last_group_key = None
+    try:
+        while True:
+            # NOTE: a kept row fetched again has been archived already
+            carried_id = None
+            if start is not None and start[1]:
+                carried_id = start[0][-1]
+            chunk_query = log_query
+            if start is not None:
+                start_key, inclusive = start
+                row_key = tuple_(*order_columns)
+                chunk_query = chunk_query.filter(
+                    row_key >= tuple_(*start_key)
+                    if inclusive
+                    else row_key > tuple_(*start_key)
+                )
+            rows = chunk_query.limit(chunk_size).all()
+            if not rows:
+                break
+
+            groups = [
+                list(group_rows)
+                for _, group_rows in groupby(rows, key=get_group_key)
+            ]
+            if len(rows) < chunk_size:
+                start = None
+            elif len(groups) > 1:
+                # the last group may continue in the next chunk
+                groups.pop()
+                start = (get_row_key(groups[-1][-1]), False)
+            else:
+                # a single group fills the chunk, its kept row is fetched
+                # again (with the compacted values) with the next chunk
+                start = (get_row_key(rows[-1]), True)
+
+            groups = [
+                group_rows for group_rows in groups if len(group_rows) > 1
+            ]
+            compacted_rows = []
+            deleted_ids = []
+            for group_rows in groups:
+                compacted_rows.append({
+                    "id": group_rows[-1].id,
+                    "submit_count": sum(
+                        row.submit_count or 1 for row in group_rows
+                    ),
+                    "first_submit_at": min(
+                        row.first_submit_at or row.updated_at
+                        for row in group_rows
+                    ),
+                    "updated_at": max(row.updated_at for row in group_rows),
+                })
+                deleted_ids.extend(row.id for row in group_rows[:-1])
+
+            if groups:
+                db.session.bulk_update_mappings(SubmitLog, compacted_rows)
+                SubmitLog.query.filter(
+                    SubmitLog.id.in_(deleted_ids)
+                ).delete(synchronize_session=False)
+                db.session.commit()
+
+                archived_rows = [
+                    row
+                    for group_rows in groups
+                    for row in group_rows
+                    if row.id != carried_id
+                ]
+                if archive is None:
+                    archive = gzip.open(archive_path, "at", encoding="utf-8")
+                for row in archived_rows:
+                    archive.write(json.dumps({
+                        "id": row.id,
+                        "annotator_id": row.annotator_id,
+                        "verse_id": row.verse_id,
+                        "task_id": row.task_id,
+                        "submit_count": row.submit_count,
+                        "first_submit_at": (
+                            row.first_submit_at.isoformat()
+                            if row.first_submit_at else None
+                        ),
+                        "updated_at": row.updated_at.isoformat(),
+                    }) + "\n")
+                archive.flush()
+
+                result["archived"] += len(archived_rows)
+                result["deleted"] += len(deleted_ids)
+                result["compacted"] += sum(
+                    get_group_key(group_rows[0]) != last_group_key
+                    for group_rows in groups
+                )
+                last_group_key = get_group_key(groups[-1][0])
+
+            if start is None:
+                break
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if archive is not None:
+            archive.close()
+
+    return result
+
+
 ###############################################################################
 # Clone Annotations
 
@@ -1188,11 +2561,9 @@ def clone_user_annotations(
         )
 
     clone_tasks = {
-        task.id: task.category
-        for task in Task.query.filter(
-            True if task_ids is None else Task.id.in_(task_ids),
-            Task.is_deleted == False,  # noqa
-        ).all()
+        task_id: task["category"]
+        for task_id, task in sorted(TASK_REGISTRY.active_tasks.items())
+        if task_ids is None or task_id in task_ids
     }
 
     # We maintain a `boundary_id_map`, a map of old boundary ids to the
@@ -8,8 +8,140 @@ Collection of Heuristics
 
 ###############################################################################
 
+import json
 import random
-from typing import Dict, List
+import hashlib
+import time
+import operator
+from collections import Counter, defaultdict
+from functools import reduce
+from typing import Any, Callable, Dict, Hashable, List
+
+from utils.cache import LRUCache
+
+###############################################################################
+# NOTE: bump HEURISTIC_VERSION whenever a heuristic changes its output,
+# since it is a part of the cache key of the memoized heuristics
+
+HEURISTIC_VERSION = 1
+HEURISTIC_CACHE = LRUCache(maxsize=4096)
+
+###############################################################################
+# Cost Limits
+# NOTE: the limits apply only to the heuristics computed while serving a
+# request; precomputed and cached results are always used
+
+HEURISTIC_LIMITS = {
+    "max_tokens": None,
+    "time_budget": None,
+}
+HEURISTIC_STATS = Counter()
+
+
+def set_heuristic_limits(max_tokens: int = None, time_budget: float = None):
+    """Set the per-sentence token cap and the time budget (in seconds)
+
+    None disables the respective limit.
+    """
+    HEURISTIC_LIMITS["max_tokens"] = max_tokens
+    HEURISTIC_LIMITS["time_budget"] = time_budget
+
+
+def has_heuristic_limits() -> bool:
+    """Whether the heuristics computed in a request may be degraded"""
+    return bool(
+        HEURISTIC_LIMITS["max_tokens"] or
+        HEURISTIC_LIMITS["time_budget"] is not None
+    )
+
+
+def get_heuristic_stats() -> Dict[str, int]:
+    return {
+        **HEURISTIC_LIMITS,
+        "computed": HEURISTIC_STATS["computed"],
+        "capped": HEURISTIC_STATS["capped"],
+        "skipped": HEURISTIC_STATS["skipped"],
+        "overruns": HEURISTIC_STATS["overruns"],
+    }
+
+
+class HeuristicBudget:
+    """Token cap and wall-clock budget of a single request
+
+    Sentences with more tokens than the cap, and every sentence after the
+    time budget has been spent, get a degraded result (see `run()`).
+    Degraded results are never cached, and are recorded in `degraded`
+    (heuristic name: list of keys) so that they can be flagged.
+    """
+
+    def __init__(self, max_tokens: int = None, time_budget: float = None):
+        self.max_tokens = (
+            HEURISTIC_LIMITS["max_tokens"]
+            if max_tokens is None else max_tokens
+        )
+        self.time_budget = (
+            HEURISTIC_LIMITS["time_budget"]
+            if time_budget is None else time_budget
+        )
+        self.spent = 0.0
+        self.overrun = False
+        self.degraded = defaultdict(list)
+
+    def allows(self, token_list: Dict[int, Dict]) -> bool:
+        if self.max_tokens and len(token_list) > self.max_tokens:
+            HEURISTIC_STATS["capped"] += 1
+            return False
+        if self.time_budget is not None and self.spent >= self.time_budget:
+            HEURISTIC_STATS["skipped"] += 1
+            return False
+        return True
+
+    def run(
+        self,
+        name: str,
+        key: Hashable,
+        token_list: Dict[int, Dict],
+        heuristic: Callable[[Dict[int, Dict]], Any],
+        fallback: Callable[[Dict[int, Dict]], Any]
+    ) -> Any:
+        """Run a heuristic within the budget
+
+        Parameters
+        ----------
+        name : str
+            Name of the heuristic
+        key : Hashable
+            Identifier of the sentence, recorded if the result is degraded
+        token_list : Dict[int, Dict]
+            Tokens, as passed to the heuristic
+        heuristic : Callable[[Dict[int, Dict]], Any]
+            Heuristic
+        fallback : Callable[[Dict[int, Dict]], Any]
+            Degraded result, used if the budget does not allow the heuristic
+
+        Returns
+        -------
+        Any
+            Result of the heuristic or the fallback
+        """
+        if not self.allows(token_list):
+            self.degraded[name].append(key)
+            return fallback(token_list)
+
+        start_time = time.perf_counter()
+        result = heuristic(token_list)
+        self.spent += time.perf_counter() - start_time
+        HEURISTIC_STATS["computed"] += 1
+        if (
+            self.time_budget is not None and not self.overrun and
+            self.spent > self.time_budget
+        ):
+            self.overrun = True
+            HEURISTIC_STATS["overruns"] += 1
+        return result
+
+    def is_degraded(self, name: str, key: Hashable) -> bool:
+        return key in self.degraded.get(name, [])
 
 ###############################################################################
 # NOTE: token_list contains dictionary of (token_id, token_details)
@@ -42,68 +174,127 @@ def get_word_order_random(token_list: Dict[int, Dict]) -> List[int]:
     return token_ids
 
 
-def get_word_order_heuristic(token_list: Dict[int, Dict]) -> List[int]:
-    """Heuristic to get word order"""
-
-    CASE_ORDER = ["Voc", "Loc", "Nom", "Dat", "Abl", "Ins", "Acc"]
-    SAME_CASE_UPOS_ORDER = ["PRON", "ADJ", "NUM", "NOUN"]
-    UPOS_START_ORDER = ["INTJ"]
-    UPOS_END_ORDER = ["ADP", "ADV", "PART", "VERB"]
-
-    upos_start_order = []
-    upos_end_order = []
-    case_order = []
-    used = set()
-    unused = set(token_list)
-
-    for case in CASE_ORDER:
-        _same_case = []
-        for token_id, token in token_list.items():
-            if not isinstance(token["analysis"], dict):
-                continue
-
-            if token["analysis"].get("feats", {}).get("Case") == case:
-                _same_case.append(token_id)
-
-        # for token_id in _same_case:
-        #     token = token_list[token_id]
-        #     if token["analysis"].get("upos") not in SAME_CASE_UPOS_ORDER:
-        #         case_order.append(token_id)
-
-        for upos in SAME_CASE_UPOS_ORDER:
-            for token_id in _same_case:
-                token = token_list[token_id]
-                if token["analysis"].get("upos") == upos:
-                    case_order.append(token_id)
-                    unused.remove(token_id)
-                    used.add(token_id)
-
-    for upos in UPOS_START_ORDER + UPOS_END_ORDER:
-        for token_id, token in token_list.items():
-            if token_id in used:
-                continue
-            if token["analysis"].get("upos") == upos:
-                if upos in UPOS_START_ORDER:
-                    upos_start_order.append(token_id)
-                else:
-                    upos_end_order.append(token_id)
-                unused.remove(token_id)
-                used.add(token_id)
-
-    word_order = []
-    word_order.extend(upos_start_order)
-    word_order.extend(case_order)
-
-    for token_id, token in token_list.items():
-        if token_id in unused:
-            word_order.append(token_id)
-            unused.remove(token_id)
-            used.add(token_id)
+# NOTE: Word order priority table
+# * tokens with an UPOS in `upos_start_order` come first,
+# * followed by the tokens with a case in `case_order` and an UPOS in
+#   `same_case_upos_order` (ordered by case, and then by UPOS),
+# * followed by the remaining tokens (in their original order),
+# * followed by the tokens with an UPOS in `upos_end_order`.
+# Ties are broken by the original order of the tokens.
+# The table can be overridden through `set_word_order_priority()`.
+
+DEFAULT_WORD_ORDER_PRIORITY = {
+    "case_order": ["Voc", "Loc", "Nom", "Dat", "Abl", "Ins", "Acc"],
+    "same_case_upos_order": ["PRON", "ADJ", "NUM", "NOUN"],
+    "upos_start_order": ["INTJ"],
+    "upos_end_order": ["ADP", "ADV", "PART", "VERB"],
+}
+
+WORD_ORDER_GROUP_START = 0
+WORD_ORDER_GROUP_CASE = 1
+WORD_ORDER_GROUP_REST = 2
+WORD_ORDER_GROUP_END = 3
+
+
+class WordOrderPriority:
+    """Word order priority table compiled into a sort key
+
+    Parameters
+    ----------
+    table : Dict[str, List[str]]
+        Priority table (see `DEFAULT_WORD_ORDER_PRIORITY`)
+    """
+
+    def __init__(self, table: Dict[str, List[str]]):
+        self.table = table
+
+        def rank(key: str) -> Dict[str, int]:
+            return {value: idx for idx, value in enumerate(table[key])}
+
+        self.case_rank = rank("case_order")
+        self.same_case_upos_rank = rank("same_case_upos_order")
+        self.upos_start_rank = rank("upos_start_order")
+        self.upos_end_rank = rank("upos_end_order")
+        self.hash = hashlib.sha1(
+            json.dumps(table, sort_keys=True).encode()
+        ).hexdigest()
+
+    def key(self, analysis: Any) -> tuple:
+        """Sort key of a token (to be used with a stable sort)"""
+        if not isinstance(analysis, dict):
+            return (WORD_ORDER_GROUP_REST, 0, 0)
+
+        upos = analysis.get("upos")
+        case = analysis.get("feats", {}).get("Case")
+        if case in self.case_rank and upos in self.same_case_upos_rank:
+            return (
+                WORD_ORDER_GROUP_CASE,
+                self.case_rank[case],
+                self.same_case_upos_rank[upos]
+            )
+        if upos in self.upos_start_rank:
+            return (WORD_ORDER_GROUP_START, self.upos_start_rank[upos], 0)
+        if upos in self.upos_end_rank:
+            return (WORD_ORDER_GROUP_END, self.upos_end_rank[upos], 0)
+        return (WORD_ORDER_GROUP_REST, 0, 0)
+
+
+WORD_ORDER_PRIORITY = WordOrderPriority(DEFAULT_WORD_ORDER_PRIORITY)
+
+
+def set_word_order_priority(table: Dict[str, List[str]] = None):
+    """Replace word order priority table (None restores the default)"""
+    global WORD_ORDER_PRIORITY
+    WORD_ORDER_PRIORITY = WordOrderPriority(
+        DEFAULT_WORD_ORDER_PRIORITY if table is None else table
+    )
 
-    word_order.extend(upos_end_order)
-    assert set(token_list) == set(word_order)
 
-    return word_order
+def get_word_order_heuristic(token_list: Dict[int, Dict]) -> List[int]:
+    """Heuristic to get word order"""
+    priority = WORD_ORDER_PRIORITY
+    return sorted(
+        token_list,
+        key=lambda token_id: priority.key(token_list[token_id]["analysis"])
+    )
+
+
+def get_word_order_batch(
+    sentences: Dict[Hashable, Dict[int, Dict]],
+    heuristic: Callable[[Dict[int, Dict]], List[int]] = None,
+    budget: HeuristicBudget = None
+) -> Dict[Hashable, List[int]]:
+    """Word order of a batch of sentences
+
+    Parameters
+    ----------
+    sentences : Dict[Hashable, Dict[int, Dict]]
+        Sentences (token lists), keyed by an identifier (e.g. boundary ID)
+    heuristic : Callable[[Dict[int, Dict]], List[int]], optional
+        Word order heuristic.
+        If None, `get_word_order()` is used.
+        The default is None.
+    budget : HeuristicBudget, optional
+        Cost limits.
+        Sentences outside the budget keep their original (token) order.
+        If None, there are no limits.
+        The default is None.
+
+    Returns
+    -------
+    Dict[Hashable, List[int]]
+        Word order of every sentence, keyed by the same identifiers
+    """
+    heuristic = heuristic or get_word_order
+    if budget is None:
+        return {
+            key: heuristic(token_list)
+            for key, token_list in sentences.items()
+        }
+    return {
+        key: budget.run("word_order", key, token_list, heuristic, list)
+        for key, token_list in sentences.items()
+    }
 
 ###############################################################################
 
@@ -113,118 +304,405 @@ def get_lemma(text: str) -> str:
     return text
 
 
+###############################################################################
+# NOTE: Rules are lists of conditions on the source and destination tokens.
+# Each condition is a tuple (key, operator, value), where key is a
+# (dot-separated) path in the token analysis, e.g. "feats.Case".
+# The rules can be overridden through `set_token_graph_rules()`.
+
+DEFAULT_TOKEN_GRAPH_RULES = [
+    {
+        "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "!=", "Pass")],
+        "dst_condition": [("feats.Case", "==", "Nom"), ("upos", "==", "NOUN")],
+        "relation_label": ["KARTA"]
+    },
+    {
+        "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "==", "Pass")],
+        "dst_condition": [("feats.Case", "==", "Ins"), ("upos", "==", "NOUN")],
+        "relation_label": ["KARTA"]
+    },
+    {
+        "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "!=", "Pass")],
+        "dst_condition": [("feats.Case", "==", "Acc"), ("upos", "==", "NOUN")],
+        "relation_label": ["KARMA"]
+    },
+    {
+        "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "==", "Pass")],
+        "dst_condition": [("feats.Case", "==", "Nom"), ("upos", "==", "NOUN")],
+        "relation_label": ["KARMA"]
+    },
+    {
+        "src_condition": [("upos", "==", "VERB")],
+        "dst_condition": [("feats.Case", "==", "Dat"), ("upos", "==", "NOUN")],
+        "relation_label": ["SAMPRADANA"]
+    },
+    {
+        "src_condition": [("upos", "==", "VERB")],
+        "dst_condition": [("feats.Case", "==", "Abl"), ("upos", "==", "NOUN")],
+        "relation_label": ["APADANA"]
+    },
+    {
+        "src_condition": [("upos", "==", "VERB")],
+        "dst_condition": [("feats.Case", "==", "Loc"), ("upos", "==", "NOUN")],
+        "relation_label": [""]
+    }
+]
+
+CONDITION_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
 ###############################################################################
 
 
+class CompiledRuleSet:
+    """Token graph rules compiled into predicates over analysis fields
+
+    Every key used in any of the conditions is an index field.
+    Tokens with identical values of the index fields are placed in the same
+    bucket, and the predicates are evaluated once per bucket instead of
+    once per token pair.
+
+    Parameters
+    ----------
+    rules : List[dict]
+        Token graph rules (see `DEFAULT_TOKEN_GRAPH_RULES`)
+    """
+
+    def __init__(self, rules: List[dict]):
+        self.rules = rules
+        self.fields = []
+        self.compiled = []
+
+        for rule in rules:
+            compiled_rule = {}
+            for condition_type in ["src", "dst"]:
+                conditions = []
+                for (_key, _operator, _value) in rule[
+                    f"{condition_type}_condition"
+                ]:
+                    if _operator not in CONDITION_OPERATORS:
+                        raise ValueError(f"Invalid operator: '{_operator}'")
+                    if _key not in self.fields:
+                        self.fields.append(_key)
+                    conditions.append((
+                        self.fields.index(_key),
+                        CONDITION_OPERATORS[_operator],
+                        _value
+                    ))
+                compiled_rule[condition_type] = self.compile(conditions)
+            compiled_rule["relation_label"] = (
+                rule["relation_label"][0] if rule["relation_label"] else None
+            )
+            self.compiled.append(compiled_rule)
+
+        self.paths = [_key.split(".") for _key in self.fields]
+        self.hash = hashlib.sha1(
+            json.dumps(rules, sort_keys=True).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def compile(conditions: List[tuple]) -> Callable[[tuple], bool]:
+        def predicate(values: tuple) -> bool:
+            return all(
+                _operator(values[_index], _value)
+                for (_index, _operator, _value) in conditions
+            )
+        return predicate
+
+    def extract(self, analysis: dict) -> tuple:
+        """Values of the index fields (missing values are `{}`)"""
+        return tuple(
+            reduce(lambda d, k: d.get(k, {}), path, analysis)
+            for path in self.paths
+        )
+
+
+TOKEN_GRAPH_RULESET = CompiledRuleSet(DEFAULT_TOKEN_GRAPH_RULES)
+
+
+def set_token_graph_rules(rules: List[dict] = None):
+    """Replace token graph rules (None restores the default rules)"""
+    global TOKEN_GRAPH_RULESET
+    TOKEN_GRAPH_RULESET = CompiledRuleSet(
+        DEFAULT_TOKEN_GRAPH_RULES if rules is None else rules
+    )
+
+
 def get_token_graph(
     token_list: Dict[int, Dict],
     boundary_id: int,
     relation_map: Dict[str, int]
 ) -> List[int]:
-    """Heuristic to get token graph"""
-    from functools import reduce
+    """Heuristic to get token graph
 
-    relations = []
+    Relations are ordered by the destination token, the source token and the
+    rule, in that order.
+    """
+    ruleset = TOKEN_GRAPH_RULESET
 
     # ----------------------------------------------------------------------- #
+    # bucket tokens by the values of the index fields
 
-    rules = [
-        {
-            "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "!=", "Pass")],
-            "dst_condition": [("feats.Case", "==", "Nom"), ("upos", "==", "NOUN")],
-            "relation_label": ["KARTA"]
-        },
-        {
-            "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "==", "Pass")],
-            "dst_condition": [("feats.Case", "==", "Ins"), ("upos", "==", "NOUN")],
-            "relation_label": ["KARTA"]
-        },
-        {
-            "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "!=", "Pass")],
-            "dst_condition": [("feats.Case", "==", "Acc"), ("upos", "==", "NOUN")],
-            "relation_label": ["KARMA"]
-        },
-        {
-            "src_condition": [("upos", "==", "VERB"), ("feats.Voice", "==", "Pass")],
-            "dst_condition": [("feats.Case", "==", "Nom"), ("upos", "==", "NOUN")],
-            "relation_label": ["KARMA"]
-        },
-        {
-            "src_condition": [("upos", "==", "VERB")],
-            "dst_condition": [("feats.Case", "==", "Dat"), ("upos", "==", "NOUN")],
-            "relation_label": ["SAMPRADANA"]
-        },
-        {
-            "src_condition": [("upos", "==", "VERB")],
-            "dst_condition": [("feats.Case", "==", "Abl"), ("upos", "==", "NOUN")],
-            "relation_label": ["APADANA"]
-        },
-        {
-            "src_condition": [("upos", "==", "VERB")],
-            "dst_condition": [("feats.Case", "==", "Loc"), ("upos", "==", "NOUN")],
-            "relation_label": [""]
-        }
-    ]
+    token_ids = []
+    buckets = {}
+    for token_id, token in token_list.items():
+        if not isinstance(token["analysis"], dict):
+            continue
+        values = ruleset.extract(token["analysis"])
+        bucket_key = json.dumps(values, sort_keys=True, default=str)
+        if bucket_key not in buckets:
+            buckets[bucket_key] = (values, [])
+        buckets[bucket_key][1].append(len(token_ids))
+        token_ids.append(token_id)
 
     # ----------------------------------------------------------------------- #
-
-    def check_rule(_rule, _src_token, _dst_token):
-        tokens = {
-            "src": _src_token,
-            "dst": _dst_token
-        }
-        conditions = []
-        for condition_type in ["src", "dst"]:
-            _conditions = _rule[f"{condition_type}_condition"]
-            _token = tokens[condition_type]
-            for (_key, _operator, _value) in _conditions:
-                key = reduce(
-                    lambda d, k: d.get(k, {}),
-                    _key.split("."),
-                    _token["analysis"]
-                )
-                if _operator == "==":
-                    conditions.append(key == _value)
-                if _operator == "!=":
-                    conditions.append(key != _value)
-        return all(conditions)
+    # candidate pairs from the matching buckets
+
+    matches = []
+    for rule_idx, rule in enumerate(ruleset.compiled):
+        src_indices = [
+            _index
+            for values, indices in buckets.values() if rule["src"](values)
+            for _index in indices
+        ]
+        if not src_indices:
+            continue
+        dst_indices = [
+            _index
+            for values, indices in buckets.values() if rule["dst"](values)
+            for _index in indices
+        ]
+        matches.extend(
+            (dst_idx, src_idx, rule_idx)
+            for dst_idx in dst_indices
+            for src_idx in src_indices
+            if src_idx != dst_idx
+        )
+    matches.sort()
 
     # ----------------------------------------------------------------------- #
 
-    src_token_list = list(token_list.items())
-    dst_token_list = list(token_list.items())
+    relations = []
+    for dst_idx, src_idx, rule_idx in matches:
+        relation_label = ruleset.compiled[rule_idx]["relation_label"]
+        relation_id = None
+        if relation_label is not None:
+            relation_id = relation_map.get(relation_label)
+
+        relations.append({
+            "boundary_id": boundary_id,
+            "src_id": token_ids[src_idx],
+            "label_id": relation_id,
+            "dst_id": token_ids[dst_idx]
+        })
+
+    return relations
 
-    token_proximity = {
-        (src_id, dst_id): src_idx - dst_idx
-        for src_idx, src_id in enumerate(token_list)
-        for dst_idx, dst_id in enumerate(token_list)
-        if src_id != dst_id
+###############################################################################
+# Memoized Heuristics
+# NOTE: Heuristic results depend only on the tokens (IDs and analyses) and the
+# relation label map, so they are cached by a hash of those.
+
+
+def get_heuristic_key(
+    name: str,
+    token_list: Dict[int, Dict],
+    *extra: Any
+) -> str:
+    """Content hash identifying the input of a heuristic
+
+    Parameters
+    ----------
+    name : str
+        Name of the heuristic
+    token_list : Dict[int, Dict]
+        Tokens, as passed to the heuristic
+    *extra : Any
+        Any other (JSON serializable) input to the heuristic
+
+    Returns
+    -------
+    str
+        Cache key
+    """
+    content = [
+        name,
+        HEURISTIC_VERSION,
+        [
+            [token_id, token.get("analysis")]
+            for token_id, token in token_list.items()
+        ],
+        extra
+    ]
+    return hashlib.sha1(
+        json.dumps(content, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_word_order_key(token_list: Dict[int, Dict]) -> str:
+    """Cache key of the word order heuristic"""
+    return get_heuristic_key(
+        "word_order", token_list, WORD_ORDER_PRIORITY.hash
+    )
+
+
+def get_token_graph_key(
+    token_list: Dict[int, Dict],
+    relation_map: Dict[str, int]
+) -> str:
+    """Cache key of the token graph heuristic"""
+    return get_heuristic_key(
+        "token_graph", token_list, sorted(relation_map.items()),
+        TOKEN_GRAPH_RULESET.hash
+    )
+
+
+def get_heuristic_fingerprint() -> str:
+    """Identifier of the current heuristic configuration
+
+    Changes with `HEURISTIC_VERSION` (also the version of the precomputed
+    suggestions), the word order priority table and the token graph rules.
+    """
+    return ":".join([
+        str(HEURISTIC_VERSION),
+        WORD_ORDER_PRIORITY.hash,
+        TOKEN_GRAPH_RULESET.hash
+    ])
+
+
+def get_word_order_batch_cached(
+    sentences: Dict[Hashable, Dict[int, Dict]],
+    precomputed: Dict[str, List[int]] = None,
+    budget: HeuristicBudget = None
+) -> Dict[Hashable, List[int]]:
+    """Memoized `get_word_order_batch()`
+
+    Parameters
+    ----------
+    sentences : Dict[Hashable, Dict[int, Dict]]
+        Sentences (token lists), keyed by an identifier (e.g. boundary ID)
+    precomputed : Dict[str, List[int]], optional
+        Precomputed word orders, keyed by the cache key.
+        These are looked up before the cache.
+        The default is None.
+    budget : HeuristicBudget, optional
+        Cost limits of the word orders that are computed.
+        The default is None.
+
+    Returns
+    -------
+    Dict[Hashable, List[int]]
+        Word order of every sentence, keyed by the same identifiers
+    """
+    precomputed = precomputed or {}
+    keys = {
+        key: get_word_order_key(token_list)
+        for key, token_list in sentences.items()
+    }
+    word_orders = {}
+    missing = {}
+    for key, token_list in sentences.items():
+        word_order = precomputed.get(keys[key])
+        if word_order is None:
+            word_order = HEURISTIC_CACHE.get(keys[key])
+        if word_order is None:
+            missing[key] = token_list
+        else:
+            word_orders[key] = word_order
+
+    for key, word_order in get_word_order_batch(
+        missing, budget=budget
+    ).items():
+        if budget is None or not budget.is_degraded("word_order", key):
+            HEURISTIC_CACHE.set(keys[key], word_order)
+        word_orders[key] = word_order
+
+    return {
+        key: list(word_orders[key])
+        for key in sentences
     }
 
-    for dst_idx, (dst_id, dst_token) in enumerate(dst_token_list):
-        for src_idx, (src_id, src_token) in enumerate(src_token_list):
-            if src_id == dst_id:
-                continue
-
-            if (
-                not isinstance(src_token["analysis"], dict) or
-                not isinstance(dst_token["analysis"], dict)
-            ):
-                continue
-
-            for rule in rules:
-                if check_rule(rule, src_token, dst_token):
-                    relation_id = None
-                    if rule["relation_label"]:
-                        relation_id = relation_map.get(rule["relation_label"][0])
-
-                    relations.append({
-                        "boundary_id": boundary_id,
-                        "src_id": src_id,
-                        "label_id": relation_id,
-                        "dst_id": dst_id
-                    })
 
-    return relations
+def get_token_graph_cached(
+    token_list: Dict[int, Dict],
+    boundary_id: int,
+    relation_map: Dict[str, int],
+    precomputed: Dict[str, List[dict]] = None,
+    budget: HeuristicBudget = None
+) -> List[dict]:
+    """Memoized `get_token_graph()`
+
+    The cached relations are independent of the boundary,
+    `boundary_id` is filled in on every call.
+    Precomputed relations (keyed by the cache key) are looked up before the
+    cache.
+    Sentences outside the `budget` (if any) get no relations.
+    """
+    key = get_token_graph_key(token_list, relation_map)
+    relations = (precomputed or {}).get(key)
+    if relations is None:
+        relations = HEURISTIC_CACHE.get(key)
+    if relations is None:
+        def heuristic(_token_list):
+            return get_token_graph(_token_list, None, relation_map)
+
+        if budget is None:
+            relations = heuristic(token_list)
+        else:
+            relations = budget.run(
+                "token_graph", boundary_id, token_list,
+                heuristic, lambda _: []
+            )
+        if budget is None or not budget.is_degraded(
+            "token_graph", boundary_id
+        ):
+            HEURISTIC_CACHE.set(key, relations)
+    return [
+        {**relation, "boundary_id": boundary_id}
+        for relation in relations
+    ]
+
+###############################################################################
+# Batch Jobs
+# NOTE: used by the offline scripts (`misc/python/precompute_heuristics.py`,
+# `misc/python/pre_annotate.py`), which run the heuristics in worker processes
+
+
+def configure_heuristics(heuristic_config: Dict[str, Any]):
+    """Apply heuristic settings (`heuristic` section of the configuration)"""
+    set_token_graph_rules(heuristic_config.get("token_graph_rules"))
+    set_word_order_priority(heuristic_config.get("word_order_priority"))
+    set_heuristic_limits(
+        max_tokens=heuristic_config.get("max_tokens"),
+        time_budget=heuristic_config.get("time_budget")
+    )
+
+
+def run_heuristic_job(job: tuple) -> tuple:
+    """Run a single heuristic job
+
+    Parameters
+    ----------
+    job : tuple
+        (boundary_id, heuristic name, token_list, relation_map), where the
+        heuristic name is either "word_order" or "token_graph"
+
+    Returns
+    -------
+    tuple
+        (boundary_id, heuristic name, cache key, result)
+    """
+    boundary_id, name, token_list, relation_map = job
+    if name == "word_order":
+        key = get_word_order_key(token_list)
+        result = get_word_order(token_list)
+    elif name == "token_graph":
+        key = get_token_graph_key(token_list, relation_map)
+        result = get_token_graph(token_list, None, relation_map)
+    else:
+        raise ValueError(f"Invalid heuristic: '{name}'")
+    return boundary_id, name, key, result
 
 ###############################################################################
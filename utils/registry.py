@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Task and Ontology Registry
+
+Tasks and labels change only through admin actions, but are read on almost
+every request. The registry loads them once and serves them from memory
+until it is invalidated (`perform_action()` and the admin model views
+invalidate it after every task or label update).
+
+NOTE: The registry is per-process. Changes made through another worker
+process are detected by `validate()` (called once per request), which
+compares a cheap stamp of the task and label tables with the one taken
+when the registry was loaded.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import threading
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import func
+
+from models_sqla import db, Task
+from models_sqla import (
+    TokenLabel,
+    TokenRelationLabel,
+    SentenceLabel,
+    SentenceRelationLabel,
+)
+from constants import (
+    TASK_TOKEN_CLASSIFICATION,
+    TASK_TOKEN_GRAPH,
+    TASK_SENTENCE_CLASSIFICATION,
+    TASK_SENTENCE_GRAPH,
+)
+
+###############################################################################
+
+LABEL_MODELS = {
+    "token_labels": TokenLabel,
+    "token_relation_labels": TokenRelationLabel,
+    "sentence_labels": SentenceLabel,
+    "sentence_relation_labels": SentenceRelationLabel,
+}
+
+# task category: (label name, label object name)
+LABEL_TASK_CATEGORIES = {
+    TASK_TOKEN_CLASSIFICATION: ("token", "token_labels"),
+    TASK_TOKEN_GRAPH: ("token_relation", "token_relation_labels"),
+    TASK_SENTENCE_CLASSIFICATION: ("sentence", "sentence_labels"),
+    TASK_SENTENCE_GRAPH: ("sentence_relation", "sentence_relation_labels"),
+}
+
+###############################################################################
+
+
+class TaskRegistry:
+    """In-process registry of tasks and labels
+
+    Loaded lazily (requires an application context) on the first access,
+    and rebuilt on the first access after `invalidate()`.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.loads = 0
+        self._data = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+            self.version += 1
+
+    def get_stamp(self) -> tuple:
+        """(count, max(id), max(updated_at)) of the task and label tables"""
+        aggregates = [
+            db.session.query(column).scalar_subquery()
+            for model in [Task, *LABEL_MODELS.values()]
+            for column in [
+                func.count(model.id),
+                func.max(model.id),
+                func.max(model.updated_at)
+            ]
+        ]
+        return tuple(db.session.query(*aggregates).one())
+
+    def validate(self):
+        """Invalidate the registry if the tasks or labels have changed
+
+        e.g. through another worker process
+        """
+        if self._data is None:
+            return
+        if self.get_stamp() != self._stamp:
+            self.invalidate()
+
+    def load(self) -> Dict[str, Any]:
+        all_tasks = {
+            task.id: {
+                "id": task.id,
+                "category": task.category,
+                "title": task.title,
+                "short": task.short,
+                "help": task.help,
+                "order": task.order,
+                "is_deleted": task.is_deleted
+            }
+            for task in Task.query.order_by(Task.order).all()
+        }
+        active_tasks = {
+            task_id: task for
+            task_id, task in all_tasks.items()
+            if not task["is_deleted"]
+        }
+        active_task_ids = list(active_tasks)
+        if active_task_ids:
+            first_task = active_task_ids[0]
+            next_task = dict(
+                zip(
+                    active_task_ids,
+                    active_task_ids[1:] + [active_task_ids[0]]
+                )
+            )
+        else:
+            first_task = None
+            next_task = {}
+
+        # NOTE: first task of each category (by ID), irrespective of status
+        category_task_ids = {}
+        for task_id in sorted(all_tasks):
+            category_task_ids.setdefault(all_tasks[task_id]["category"], task_id)
+
+        labels = {
+            object_name: _model.query.filter(
+                _model.is_deleted == False  # noqa # '== False' is required
+            ).with_entities(
+                _model.id,
+                _model.task_id,
+                _model.label,
+                _model.description
+            ).order_by(_model.label).all()
+            for object_name, _model in LABEL_MODELS.items()
+        }
+
+        admin_labels = []
+        for task_id in sorted(all_tasks):
+            task = all_tasks[task_id]
+            if task["category"] in LABEL_TASK_CATEGORIES:
+                _name, _object_name = LABEL_TASK_CATEGORIES[task["category"]]
+                admin_labels.append({
+                    "task_id": task["id"],
+                    "name": _name,
+                    "title": task["title"],
+                    "object_name": _object_name
+                })
+
+        return {
+            "tasks": all_tasks,
+            "active_ids": active_task_ids,
+            "active_tasks": active_tasks,
+            "active_categories": {
+                task["category"] for task in active_tasks.values()
+            },
+            "category_task_ids": category_task_ids,
+            "first_task": first_task,
+            "next_task": next_task,
+            "labels": labels,
+            "admin_labels": admin_labels,
+            "token_relation_map": {
+                label: label_id
+                for label_id, _, label, _ in labels["token_relation_labels"]
+            },
+        }
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._data is None:
+                # NOTE: the stamp is taken first, so that a change made
+                # during the load only causes an extra reload
+                self._stamp = self.get_stamp()
+                self._data = self.load()
+                self.loads += 1
+            return self._data
+
+    # ----------------------------------------------------------------------- #
+
+    @property
+    def tasks(self) -> Dict[int, dict]:
+        return self.data["tasks"]
+
+    @property
+    def active_tasks(self) -> Dict[int, dict]:
+        return self.data["active_tasks"]
+
+    @property
+    def active_ids(self) -> List[int]:
+        return self.data["active_ids"]
+
+    @property
+    def active_categories(self) -> Set[str]:
+        return self.data["active_categories"]
+
+    @property
+    def first_task(self) -> int:
+        return self.data["first_task"]
+
+    @property
+    def next_task(self) -> Dict[int, int]:
+        return self.data["next_task"]
+
+    @property
+    def labels(self) -> Dict[str, list]:
+        return self.data["labels"]
+
+    @property
+    def admin_labels(self) -> List[dict]:
+        return self.data["admin_labels"]
+
+    @property
+    def token_relation_map(self) -> Dict[str, int]:
+        return self.data["token_relation_map"]
+
+    def is_active(self, category: str) -> bool:
+        return category in self.data["active_categories"]
+
+    def task_id(self, category: str) -> int:
+        """ID of the first task of a category (None if there is none)"""
+        return self.data["category_task_ids"].get(category)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "version": self.version,
+            "loads": self.loads,
+            "loaded": self._data is not None,
+        }
+
+
+###############################################################################
+
+TASK_REGISTRY = TaskRegistry()
+
+###############################################################################
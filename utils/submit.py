@@ -0,0 +1,937 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Task Submission Handlers
+
+A handler applies a single task submission (the payload of a task update
+action) to the current database session, *without* committing it, so that
+the caller decides on the transaction boundaries:
+`/api` commits every submission on its own, while `/api/batch` applies
+several submissions (each in a savepoint) and commits them together.
+
+A submission based on an outdated revision of the annotations of its verse
+by the annotator is rejected (`StaleSubmission`), and a submission that
+changes the annotations claims the next revision.
+
+Note: Functions are usable only in an application context.
+
+@author: Hrishikesh Terdalkar
+"""
+
+###############################################################################
+
+import re
+import json
+import time
+import datetime as dt
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy.exc import DBAPIError
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+
+from models_sqla import db, SubmitLog
+from models_sqla import (
+    Boundary,
+    WordOrder,
+    TokenTextAnnotation,
+    TokenClassification,
+    TokenGraph,
+    TokenConnection,
+    SentenceClassification,
+    SentenceGraph,
+)
+from constants import (
+    TASK_SENTENCE_BOUNDARY,
+    TASK_WORD_ORDER,
+    TASK_TOKEN_TEXT_ANNOTATION,
+    TASK_TOKEN_CLASSIFICATION,
+    TASK_TOKEN_GRAPH,
+    TASK_TOKEN_CONNECTION,
+    TASK_SENTENCE_CLASSIFICATION,
+    TASK_SENTENCE_GRAPH,
+    TASK_UPDATE_ACTIONS,
+)
+from utils.database import (
+    claim_verse_revision, get_verse_revision,
+    invalidate_heuristic_suggestions, update_verse_progress,
+)
+
+###############################################################################
+
+# dialects supporting `INSERT ... ON CONFLICT DO UPDATE`
+UPSERT_DIALECTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+# messages (lowercase) of the errors due to lock contention, after which the
+# entire transaction can be retried (SQLite, MySQL, PostgreSQL)
+LOCK_ERROR_MESSAGES = [
+    "database is locked",
+    "deadlock found",
+    "lock wait timeout exceeded",
+    "deadlock detected",
+    "could not serialize access",
+]
+
+# contention counters (`/api/metrics`)
+SUBMIT_STATS = Counter()
+
+###############################################################################
+
+
+class StageTimer:
+    """Wall-clock time (in milliseconds) of the stages of a request
+
+    Timing a stage is a no-op unless the timer is enabled.
+    Repeated stages accumulate.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = (time.perf_counter() - start_time) * 1000
+            self.timings[name] = round(
+                self.timings.get(name, 0) + duration, 3
+            )
+
+
+class InvalidSubmission(ValueError):
+    """Submitted data is missing or malformed"""
+
+
+class StaleSubmission(InvalidSubmission):
+    """Submission based on an outdated revision of the verse annotations"""
+
+    def __init__(self, verse_id: int, revision: int):
+        super().__init__(
+            "Annotations of this verse were changed elsewhere "
+            "(e.g. in another tab). "
+            "Please review the latest annotations and submit again."
+        )
+        self.verse_id = verse_id
+        self.revision = revision
+
+
+def load_json(form: Mapping, key: str, default: str = None) -> Any:
+    """Load a JSON field of a submission
+
+    Fields of a form are JSON strings, whereas the items of a batch
+    (`/api/batch`) may contain the decoded values as well.
+    """
+    value = form.get(key, default)
+    if value is None:
+        raise InvalidSubmission(f"Missing field: '{key}'")
+    if isinstance(value, (str, bytes)):
+        return json.loads(value)
+    return value
+
+
+def get_submission_ids(form: Mapping) -> (int, int):
+    """(task_id, verse_id) of a submission"""
+    try:
+        return int(form["task_id"]), int(form["verse_id"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidSubmission("Invalid task or verse ID.")
+
+
+def get_submission_revision(form: Mapping) -> Optional[int]:
+    """Revision of the verse annotations that a submission is based on
+
+    Submissions without a revision are not checked for conflicts.
+    """
+    revision = form.get("revision")
+    if revision is None or revision == "":
+        return None
+    try:
+        return int(revision)
+    except (TypeError, ValueError):
+        raise InvalidSubmission("Invalid revision.")
+
+
+def get_boundary_changes(
+    existing_tokens: List[int],
+    submitted_tokens: List[int]
+) -> Tuple[List[int], List[int], bool]:
+    """Boundary markers of a verse affected by a change
+
+    A boundary marker denotes the sentence ending at its token and starting
+    after the previous boundary marker, so a retained boundary marker is
+    affected only if the boundary marker before it has changed.
+
+    Parameters
+    ----------
+    existing_tokens : List[int]
+        Token IDs of the existing boundary markers of the verse
+    submitted_tokens : List[int]
+        Token IDs of the submitted boundary markers of the verse
+
+    Returns
+    -------
+    Tuple[List[int], List[int], bool]
+        Token IDs of the boundary markers to be deleted,
+        token IDs of the boundary markers to be created,
+        and whether the last boundary marker of the verse has changed
+        (which affects the first boundary marker after the verse)
+    """
+    existing_tokens = sorted(set(existing_tokens))
+    submitted_tokens = sorted(set(submitted_tokens))
+    existing_previous = dict(
+        zip(existing_tokens, [None] + existing_tokens[:-1])
+    )
+    submitted_previous = dict(
+        zip(submitted_tokens, [None] + submitted_tokens[:-1])
+    )
+
+    stale_tokens = [
+        token_id
+        for token_id in existing_tokens
+        if submitted_previous.get(token_id, -1) != existing_previous[token_id]
+    ]
+    new_tokens = [
+        token_id
+        for token_id in submitted_tokens
+        if existing_previous.get(token_id, -1) != submitted_previous[token_id]
+    ]
+    last_changed = existing_tokens[-1:] != submitted_tokens[-1:]
+    return stale_tokens, new_tokens, last_changed
+
+###############################################################################
+# Diff and Upsert
+# NOTE: Annotations are soft-deleted (`is_deleted`), so that every submission
+# is reduced to inserts and updates, which are applied as upserts on the
+# natural key of the annotation (the unique index of the model)
+
+
+def upsert_rows(
+    model: db.Model,
+    rows: List[Dict[str, Any]],
+    index_columns: List[str],
+    update_columns: List[str]
+) -> int:
+    """Insert rows, updating the ones that already exist
+
+    Uses `INSERT ... ON CONFLICT DO UPDATE` (SQLite, PostgreSQL) or
+    `INSERT ... ON DUPLICATE KEY UPDATE` (MySQL), and falls back to
+    an update (or insert) per row for any other database.
+
+    Parameters
+    ----------
+    model : db.Model
+        Model
+    rows : List[Dict[str, Any]]
+        Rows, all of which must have the same columns
+    index_columns : List[str]
+        Columns of a unique index of the model
+    update_columns : List[str]
+        Columns to update if a row already exists
+
+    Returns
+    -------
+    int
+        Number of rows
+    """
+    if not rows:
+        return 0
+
+    table = model.__table__
+    dialect = db.engine.dialect.name
+    if dialect in UPSERT_DIALECTS:
+        stmt = UPSERT_DIALECTS[dialect](table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_columns,
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+    elif dialect == "mysql":
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update({
+            column: stmt.inserted[column] for column in update_columns
+        })
+    else:
+        for row in rows:
+            result = db.session.execute(
+                table.update().where(*[
+                    table.c[column] == row[column]
+                    for column in index_columns
+                ]).values({column: row[column] for column in update_columns})
+            )
+            if not result.rowcount:
+                db.session.execute(table.insert().values(row))
+        return len(rows)
+
+    db.session.execute(stmt, rows)
+    return len(rows)
+
+
+def sync_annotations(
+    model: db.Model,
+    scope: List[Any],
+    fixed: Dict[str, Any],
+    key_columns: List[str],
+    value_columns: List[str],
+    submitted: Dict[tuple, Dict[str, Any]]
+) -> int:
+    """Bring the annotations of a model in line with a submission
+
+    Existing annotations (in `scope`) are loaded with a single query and
+    compared with the submitted ones, on the natural key (`fixed` columns
+    and `key_columns`).
+    Only the differences are written,
+    * submitted annotations that do not exist are inserted
+    * existing annotations whose values differ, or which are deleted,
+      are updated (and restored)
+    * existing annotations that are not submitted are (soft) deleted,
+      unless they are deleted already
+
+    Parameters
+    ----------
+    model : db.Model
+        Annotation model (with an `is_deleted` column)
+    scope : List[Any]
+        Filters (in addition to `fixed`) selecting the existing annotations
+        that the submission replaces
+    fixed : Dict[str, Any]
+        Column values common to all the annotations (e.g. task_id and
+        annotator_id)
+    key_columns : List[str]
+        Remaining columns of the natural key
+    value_columns : List[str]
+        Columns that may change for the same key
+    submitted : Dict[tuple, Dict[str, Any]]
+        Submitted annotations, keyed by the values of `key_columns`,
+        with the values of `value_columns`
+
+    Returns
+    -------
+    int
+        Number of changed annotations
+    """
+    columns = key_columns + value_columns
+    existing_query = db.session.query(
+        *[getattr(model, column) for column in columns],
+        model.is_deleted
+    ).filter(
+        *[
+            getattr(model, column) == value
+            for column, value in fixed.items()
+        ],
+        *scope
+    )
+
+    updated_at = dt.datetime.utcnow()
+    changes = []
+    existing_keys = set()
+    for row in existing_query.all():
+        key = tuple(getattr(row, column) for column in key_columns)
+        existing_keys.add(key)
+        values = submitted.get(key)
+        if values is None:
+            if not row.is_deleted:
+                changes.append({
+                    **fixed,
+                    **{column: getattr(row, column) for column in columns},
+                    "is_deleted": True,
+                    "updated_at": updated_at,
+                })
+        elif row.is_deleted or any(
+            getattr(row, column) != values[column]
+            for column in value_columns
+        ):
+            changes.append({
+                **fixed,
+                **dict(zip(key_columns, key)),
+                **{column: values[column] for column in value_columns},
+                "is_deleted": False,
+                "updated_at": updated_at,
+            })
+
+    for key, values in submitted.items():
+        if key in existing_keys:
+            continue
+        changes.append({
+            **fixed,
+            **dict(zip(key_columns, key)),
+            **{column: values[column] for column in value_columns},
+            "is_deleted": False,
+            "updated_at": updated_at,
+        })
+
+    return upsert_rows(
+        model,
+        changes,
+        index_columns=list(fixed) + key_columns,
+        update_columns=value_columns + ["is_deleted", "updated_at"]
+    )
+
+###############################################################################
+# Handlers
+# NOTE: Every handler returns True if there are any changes to be saved
+
+
+def update_sentence_boundary(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    try:
+        boundaries = form["boundaries"]
+        if not isinstance(boundaries, str):
+            boundaries = ",".join(str(b) for b in boundaries)
+        boundary_tokens = [
+            int(b.strip())
+            for b in boundaries.split(",")
+            if b.strip()
+        ]
+    except (KeyError, TypeError, ValueError):
+        raise InvalidSubmission("Invalid boundaries.")
+
+    # NOTE: A sentence boundary task should always be "present"
+    # (even if inactive), since very other task is tied to boundary_id
+    # NOTE: We do not check with task_id because, only single sentence
+    # boundary task is supported
+    # TODO: Perhaps remove `task_id` column from Boundary table altogether
+    existing_boundaries = {
+        _boundary.token_id: _boundary
+        for _boundary in Boundary.query.filter(
+            Boundary.verse_id == verse_id,
+            Boundary.annotator_id == annotator_id
+        ).all()
+    }
+    if set(existing_boundaries) == set(boundary_tokens):
+        return False
+
+    # Only the boundaries whose sentence (token range) has changed are
+    # deleted and re-created, every other boundary keeps its annotations
+    # WordOrder of a deleted boundary also gets deleted as (CASCADE)
+    # TokenClassification also gets deleted as (CASCADE)
+    # TokenGraph also gets deleted as (CASCADE)
+    # TokenConnection also gets deleted as (CASCADE)
+    # SentenceClassification also gets deleted as (CASCADE)
+    # SentenceGraph also gets deleted as (CASCADE)
+    stale_tokens, new_tokens, last_changed = get_boundary_changes(
+        list(existing_boundaries), boundary_tokens
+    )
+    stale_boundaries = [
+        existing_boundaries[token_id] for token_id in stale_tokens
+    ]
+    if stale_boundaries:
+        Boundary.query.filter(
+            Boundary.id.in_([_boundary.id for _boundary in stale_boundaries])
+        ).delete(synchronize_session=False)
+
+    # the sentence of the first boundary marker after the current verse
+    # changes with the last boundary marker of the current verse
+    next_boundary = None
+    if last_changed:
+        next_boundary = Boundary.query.filter(
+            Boundary.verse_id > verse_id,
+            Boundary.annotator_id == annotator_id,
+        ).order_by(Boundary.token_id).first()
+
+    # NOTE: We do not check with task_id because, currently, only
+    # single token order task is supported (as there needs to be a
+    # link between this and boundary task)
+    # NOTE: If for some reason we need multiple token order tasks,
+    # all of them would require to be deleted anyway as the boundary
+    # gets changed, so we might never need to check with task_id here
+    # heuristic suggestions of the affected boundaries are stale
+    invalidate_heuristic_suggestions([
+        _boundary.id
+        for _boundary in stale_boundaries + [next_boundary]
+        if _boundary is not None
+    ])
+
+    if next_boundary:
+        word_order_of_next_boundary_query = WordOrder.query.filter(
+            WordOrder.boundary_id == next_boundary.id,
+            WordOrder.annotator_id == annotator_id
+        )
+        word_order_of_next_boundary_query.delete(
+            synchronize_session=False
+        )
+
+    # add new boundary markers
+    objects_to_update = []
+    for boundary_token in new_tokens:
+        boundary = Boundary()
+        boundary.task_id = task_id
+        boundary.verse_id = verse_id
+        boundary.token_id = boundary_token
+        boundary.annotator_id = annotator_id
+        objects_to_update.append(boundary)
+
+    if objects_to_update:
+        db.session.bulk_save_objects(objects_to_update)
+    return True
+
+
+def update_word_order(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    word_order = load_json(form, "word_order")
+
+    word_order_order = {}
+    boundary_ids = []
+
+    for dom_boundary_id, dom_token_ids in word_order.items():
+        m1 = re.match(r'boundary-([0-9]+)$', dom_boundary_id)
+        if not m1:
+            raise InvalidSubmission("Invalid boundary ID.")
+        boundary_id = int(m1.group(1))
+        boundary_ids.append(boundary_id)
+
+        _order = []
+        for dom_token_id in dom_token_ids:
+            m2 = re.match(r'token-button-([0-9]+)$', dom_token_id)
+            if m2:
+                _order.append(int(m2.group(1)))
+        word_order_order[boundary_id] = _order
+
+    # NOTE: only the boundaries whose word order differs are rewritten
+    existing_word_order_query = db.session.query(
+        WordOrder.boundary_id, WordOrder.token_id, WordOrder.order
+    ).filter(
+        WordOrder.task_id == task_id,
+        WordOrder.boundary_id.in_(boundary_ids),
+        WordOrder.annotator_id == annotator_id
+    )
+    existing_word_order = defaultdict(set)
+    for boundary_id, token_id, order in existing_word_order_query.all():
+        existing_word_order[boundary_id].add((token_id, order))
+
+    changed_boundary_ids = [
+        boundary_id
+        for boundary_id, token_ids in word_order_order.items()
+        if existing_word_order[boundary_id] != set(
+            (token_id, order_id)
+            for order_id, token_id in enumerate(token_ids, start=1)
+        )
+    ]
+    if not changed_boundary_ids:
+        return False
+
+    deleted_count = WordOrder.query.filter(
+        WordOrder.task_id == task_id,
+        WordOrder.boundary_id.in_(changed_boundary_ids),
+        WordOrder.annotator_id == annotator_id
+    ).delete(synchronize_session=False)
+    # token graph suggestions depend on the word order
+    invalidate_heuristic_suggestions(changed_boundary_ids)
+
+    objects_to_update = []
+    for boundary_id in changed_boundary_ids:
+        token_ids = word_order_order[boundary_id]
+        for order_id, token_id in enumerate(token_ids, start=1):
+            _word_order = WordOrder()
+            _word_order.task_id = task_id
+            _word_order.boundary_id = boundary_id
+            _word_order.token_id = token_id
+            _word_order.order = order_id
+            _word_order.annotator_id = annotator_id
+            objects_to_update.append(_word_order)
+
+    if objects_to_update:
+        db.session.bulk_save_objects(objects_to_update)
+    return bool(deleted_count or objects_to_update)
+
+
+def update_token_text_annotation(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    text_annotation_data = load_json(form, "text_annotation_data")
+
+    try:
+        text_annotation_data = {
+            (int(k.split('-')[-1]),): {
+                "boundary_id": int(v["boundary_id"]),
+                "text": v["text_annotation"]
+            }
+            for k, v in text_annotation_data.items()
+            if re.match(r'token-text-annotation-input-[0-9]+-([0-9]+)$', k)
+        }
+    except Exception:
+        raise InvalidSubmission("Invalid data.")
+
+    return sync_annotations(
+        TokenTextAnnotation,
+        scope=[
+            TokenTextAnnotation.boundary.has(Boundary.verse_id == verse_id)
+        ],
+        fixed={"task_id": task_id, "annotator_id": annotator_id},
+        key_columns=["token_id"],
+        value_columns=["boundary_id", "text"],
+        submitted=text_annotation_data
+    ) > 0
+
+
+def update_token_classification(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    token_classification_data = load_json(form, "token_classification_data")
+
+    try:
+        token_classification_data = {
+            (int(k.split('-')[-1]),): {
+                "boundary_id": int(v["boundary_id"]),
+                "label_id": int(v["label_id"])
+            }
+            for k, v in token_classification_data.items()
+            if re.match(r'token-class-selector-[0-9]+-([0-9]+)$', k)
+        }
+    except Exception:
+        raise InvalidSubmission("Invalid data.")
+
+    return sync_annotations(
+        TokenClassification,
+        scope=[
+            TokenClassification.boundary.has(Boundary.verse_id == verse_id)
+        ],
+        fixed={"task_id": task_id, "annotator_id": annotator_id},
+        key_columns=["token_id"],
+        value_columns=["boundary_id", "label_id"],
+        submitted=token_classification_data
+    ) > 0
+
+
+def update_token_graph(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    token_graph_data = load_json(form, "token_graph_data", "[]")
+
+    # NOTE: we use find existing (src_id, dst_id) 2-tuples,
+    # and not (src_id, label_id, dst_id) 3-tuples in order to allow change
+    # of label type without violating unique constraint.
+    # so, if a triple (s, l1, d) exists and we want to make it (s, l2, d),
+    # we need to be able to find (s, l1, d) as "existing"
+    # otherwise, we have to remove the "unique" constraint on src_id, dst_id
+    # and include label_id in it too.
+
+    try:
+        # validate token_graph_data: List[Dict]
+        # keys: boundary_id, src_id, label_id, dst_id
+        # values: strings? cast int()
+        token_graph_data = {
+            (
+                int(tokrel["src_id"]),
+                # int(tokrel["label_id"]),
+                int(tokrel["dst_id"])
+            ): {
+                "boundary_id": int(tokrel["boundary_id"]),
+                "label_id": int(tokrel["label_id"])
+            }
+            for tokrel in token_graph_data
+        }
+    except Exception:
+        raise InvalidSubmission("Invalid data.")
+
+    return sync_annotations(
+        TokenGraph,
+        scope=[TokenGraph.boundary.has(Boundary.verse_id == verse_id)],
+        fixed={"task_id": task_id, "annotator_id": annotator_id},
+        key_columns=["src_id", "dst_id"],
+        value_columns=["boundary_id", "label_id"],
+        submitted=token_graph_data
+    ) > 0
+
+
+def update_token_connection(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    token_connection_data = load_json(form, "token_connection_data", "[]")
+    context_data = load_json(form, "context_data", "[]")
+
+    try:
+        # validate token_connection_data: List[Dict]
+        # keys: boundary_id, src_id, dst_id
+        # values: strings? cast int()
+        token_connection_data = {
+            (
+                int(tokcon["src_id"]),
+                int(tokcon["dst_id"])
+            ): {
+                "boundary_id": int(tokcon["boundary_id"])
+            }
+            for tokcon in token_connection_data
+        }
+        context_data = [int(boundary_id) for boundary_id in context_data]
+    except Exception:
+        raise InvalidSubmission("Invalid data.")
+
+    # TODO: do we really need to check boundary_id?
+    # when would it be different when src_id and dst_id are same?
+    # only if we change convention?
+    return sync_annotations(
+        TokenConnection,
+        scope=[TokenConnection.boundary_id.in_(context_data)],
+        fixed={"task_id": task_id, "annotator_id": annotator_id},
+        key_columns=["src_id", "dst_id"],
+        value_columns=["boundary_id"],
+        submitted=token_connection_data
+    ) > 0
+
+
+def update_sentence_classification(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    sentence_classification_data = load_json(
+        form, "sentence_classification_data", "[]"
+    )
+    try:
+        # validate sentence_classification_data: List[Dict]
+        # keys: boundary_id, label_id
+        # values: strings? cast int()
+        sentence_classification_data = {
+            (int(sentclf["boundary_id"]),): {
+                "label_id": int(sentclf["label_id"])
+            }
+            for sentclf in sentence_classification_data
+        }
+    except Exception:
+        raise InvalidSubmission("Invalid data.")
+
+    return sync_annotations(
+        SentenceClassification,
+        scope=[
+            SentenceClassification.boundary.has(Boundary.verse_id == verse_id)
+        ],
+        fixed={"task_id": task_id, "annotator_id": annotator_id},
+        key_columns=["boundary_id"],
+        value_columns=["label_id"],
+        submitted=sentence_classification_data
+    ) > 0
+
+
+def update_sentence_graph(
+    form: Mapping,
+    annotator_id: int,
+    task_id: int,
+    verse_id: int
+) -> bool:
+    sentence_graph_data = load_json(form, "sentence_graph_data", "[]")
+    context_data = load_json(form, "context_data", "[]")
+
+    try:
+        # validate sentence_graph_data: List[Dict]
+        # keys:
+        # src_boundary_id, src_token_id,
+        # dst_boundary_id, dst_token_id
+        # label_id, relation_type (0, 1, 2, 3)
+        # values: strings? cast int()
+        sentence_graph_data = {
+            (
+                int(sentrel["src_boundary_id"]),
+                int(sentrel["src_token_id"]),
+                int(sentrel["dst_boundary_id"]),
+                int(sentrel["dst_token_id"]),
+                int(sentrel["relation_type"])
+            ): {
+                "label_id": int(sentrel["label_id"])
+            }
+            for sentrel in sentence_graph_data
+        }
+        context_data = [int(boundary_id) for boundary_id in context_data]
+    except Exception:
+        raise InvalidSubmission("Invalid data.")
+
+    # TODO: Re-examine if the conditions are proper
+    return sync_annotations(
+        SentenceGraph,
+        scope=[
+            SentenceGraph.src_boundary_id.in_(context_data),
+            SentenceGraph.dst_boundary_id.in_(context_data),
+        ],
+        fixed={"task_id": task_id, "annotator_id": annotator_id},
+        key_columns=[
+            "src_boundary_id", "src_token_id",
+            "dst_boundary_id", "dst_token_id",
+            "relation_type"
+        ],
+        value_columns=["label_id"],
+        submitted=sentence_graph_data
+    ) > 0
+
+###############################################################################
+# Contention
+
+
+def is_lock_error(error: Exception) -> bool:
+    """Whether an error is due to lock contention between transactions"""
+    if not isinstance(error, DBAPIError):
+        return False
+    message = str(error.orig).lower()
+    return any(_message in message for _message in LOCK_ERROR_MESSAGES)
+
+
+def retry_on_lock(work: Callable[[], Any], retries: int, delay: float) -> Any:
+    """Run a unit of work, retrying it if it fails due to lock contention
+
+    The session is rolled back before every retry, so the unit of work must
+    apply (and commit) all of its changes on its own.
+    The delay (in seconds) doubles after every retry.
+    """
+    attempt = 0
+    while True:
+        try:
+            return work()
+        except DBAPIError as e:
+            db.session.rollback()
+            if not is_lock_error(e):
+                raise
+            if attempt >= retries:
+                SUBMIT_STATS["lock_failures"] += 1
+                raise
+            SUBMIT_STATS["lock_retries"] += 1
+            time.sleep(delay * 2 ** attempt)
+            attempt += 1
+
+
+def get_submit_stats() -> Dict[str, int]:
+    return {
+        "conflicts": SUBMIT_STATS["conflicts"],
+        "lock_retries": SUBMIT_STATS["lock_retries"],
+        "lock_failures": SUBMIT_STATS["lock_failures"],
+    }
+
+###############################################################################
+
+SUBMIT_HANDLERS: Dict[str, Callable[[Mapping, int, int, int], bool]] = {
+    TASK_UPDATE_ACTIONS[TASK_SENTENCE_BOUNDARY]: update_sentence_boundary,
+    TASK_UPDATE_ACTIONS[TASK_WORD_ORDER]: update_word_order,
+    TASK_UPDATE_ACTIONS[TASK_TOKEN_TEXT_ANNOTATION]: update_token_text_annotation,
+    TASK_UPDATE_ACTIONS[TASK_TOKEN_CLASSIFICATION]: update_token_classification,
+    TASK_UPDATE_ACTIONS[TASK_TOKEN_GRAPH]: update_token_graph,
+    TASK_UPDATE_ACTIONS[TASK_TOKEN_CONNECTION]: update_token_connection,
+    TASK_UPDATE_ACTIONS[TASK_SENTENCE_CLASSIFICATION]: update_sentence_classification,
+    TASK_UPDATE_ACTIONS[TASK_SENTENCE_GRAPH]: update_sentence_graph,
+}
+
+
+def apply_submission(action: str, form: Mapping, annotator_id: int) -> dict:
+    """Apply a task submission to the current session (without commit)
+
+    Parameters
+    ----------
+    action : str
+        Task update action
+    form : Mapping
+        Submitted data (request form or an item of a batch)
+    annotator_id : int
+        Annotator ID
+
+    Returns
+    -------
+    dict
+        task_id, verse_id of the submission,
+        `revision`, the revision of the verse annotations
+        (incremented only if any changes were applied), and
+        `changes`, which is True if any changes were applied
+
+    Raises
+    ------
+    StaleSubmission
+        If the submission is based on an outdated revision
+    InvalidSubmission
+        If the action is not a task update action,
+        or the submitted data is invalid
+    """
+    if action not in SUBMIT_HANDLERS:
+        raise InvalidSubmission(f"Invalid action. ({action})")
+    task_id, verse_id = get_submission_ids(form)
+    seen_revision = get_submission_revision(form)
+    revision = get_verse_revision(verse_id, annotator_id)
+    if seen_revision is not None and seen_revision != revision:
+        SUBMIT_STATS["conflicts"] += 1
+        raise StaleSubmission(verse_id, revision)
+    try:
+        changes = SUBMIT_HANDLERS[action](
+            form, annotator_id, task_id, verse_id
+        )
+    except json.JSONDecodeError as e:
+        raise InvalidSubmission("Invalid data.") from e
+
+    # NOTE: the revision is claimed only if there are changes, in the same
+    # transaction, and the claim fails if a concurrent submit has claimed it
+    # since the check above, in which case the changes are rolled back
+    if changes:
+        claimed, revision = claim_verse_revision(
+            verse_id, annotator_id, seen_revision
+        )
+        if not claimed:
+            SUBMIT_STATS["conflicts"] += 1
+            raise StaleSubmission(verse_id, revision)
+    return {
+        "task_id": task_id,
+        "verse_id": verse_id,
+        "revision": revision,
+        "changes": changes,
+    }
+
+###############################################################################
+
+
+def record_submits(submits: List[Dict[str, Any]]) -> int:
+    """Record Submits
+
+    Submit logs (and the progress rollup) are added to the session, and are
+    committed along with the submitted annotations.
+
+    Parameters
+    ----------
+    submits : List[Dict[str, Any]]
+        Submits, with the keys verse_id, annotator_id and task_id
+
+    Returns
+    -------
+    int
+        Number of recorded submits
+    """
+    if not submits:
+        return 0
+    submitted_at = dt.datetime.utcnow()
+    submit_logs = [
+        {
+            "verse_id": submit["verse_id"],
+            "annotator_id": submit["annotator_id"],
+            "task_id": submit["task_id"],
+            "updated_at": submitted_at,
+            "first_submit_at": submitted_at,
+        }
+        for submit in submits
+    ]
+    db.session.bulk_insert_mappings(SubmitLog, submit_logs)
+    update_verse_progress(submit_logs)
+    return len(submit_logs)